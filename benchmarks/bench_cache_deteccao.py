@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do cache de detecções
+Compara detectar_data + detectar_conta sem cache, com o cache anterior (chave
+MD5 de texto|contexto em um dict) e com o CacheLRU (chave = tupla da entrada),
+em lotes no formato de uma árvore de extratos: muitos arquivos por pasta e
+parte dos nomes repetida entre pastas
+
+Uso:
+    python benchmarks/bench_cache_deteccao.py [--arquivos 20000] [--pastas 200] [--passadas 3] [--max 50000]
+
+Cada cenário processa o lote --passadas vezes (como reprocessamentos da mesma
+pasta pela API) com um cache vazio no início; a primeira passada mede o custo
+das falhas e as seguintes o ganho dos acertos.
+"""
+
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'utils'))
+from cache_lru import CacheLRU
+from regras_deteccao import MotorDeteccao, REGRAS_DATA, REGRAS_CONTA
+from bench_detectar_conta import gerar_nomes, MESES
+
+
+def gerar_lote(arquivos: int, pastas: int, semente: int = 7):
+    """[(nome, pasta)] com os arquivos distribuídos em pastas ANO/MES de clientes"""
+    rnd = random.Random(semente)
+    diretorios = [f"/dados/extratos/CLIENTE_{rnd.randint(1, 40):03d}/{rnd.randint(2020, 2025)}/{rnd.choice(MESES)}"
+                  for _ in range(pastas)]
+    nomes = gerar_nomes(arquivos // 2, semente)
+    # Metade dos arquivos repete nomes já vistos (mesmo extrato em pastas diferentes)
+    nomes += [rnd.choice(nomes) for _ in range(arquivos - len(nomes))]
+    rnd.shuffle(nomes)
+    return [(nome, rnd.choice(diretorios)) for nome in nomes]
+
+
+class CacheMD5:
+    """Esquema anterior: dict sem ordem de uso, chave MD5 de texto|contexto"""
+
+    def __init__(self, motor, max_entradas):
+        self.motor = motor
+        self.max_entradas = max_entradas
+        self.cache = {}
+        self.acertos = self.falhas = 0
+
+    @staticmethod
+    def chave(texto, contexto):
+        return hashlib.md5(f"{texto}|{contexto}".encode()).hexdigest()
+
+    def detectar(self, tipo, chave, detectar, *args):
+        cached = self.cache.get(chave)
+        if cached and tipo in cached:
+            self.acertos += 1
+            return cached[tipo]
+        self.falhas += 1
+        resultado = detectar(*args)
+        if chave not in self.cache and len(self.cache) >= self.max_entradas:
+            del self.cache[next(iter(self.cache))]
+        self.cache.setdefault(chave, {})[tipo] = resultado
+        return resultado
+
+    def analisar(self, nome, pasta):
+        self.detectar('data', self.chave(nome, pasta), self.motor.detectar_data, nome, pasta)
+        self.detectar('conta', self.chave(nome, 'conta'), self.motor.detectar_conta, nome)
+
+
+def medir(analisar, lote, passadas):
+    tempos = []
+    for _ in range(passadas):
+        inicio = time.perf_counter()
+        for nome, pasta in lote:
+            analisar(nome, pasta)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cache de detecções")
+    parser.add_argument('--arquivos', type=int, default=20000)
+    parser.add_argument('--pastas', type=int, default=200)
+    parser.add_argument('--passadas', type=int, default=3)
+    parser.add_argument('--max', type=int, default=50000, help="Limite de entradas dos caches")
+    args = parser.parse_args()
+
+    lote = gerar_lote(args.arquivos, args.pastas)
+    print(f"Lote: {len(lote)} arquivos, {len(set(n for n, _ in lote))} nomes distintos, "
+          f"{len(set(lote))} pares nome/pasta distintos; cache máx. {args.max} entradas")
+
+    sem_cache = MotorDeteccao('bench', REGRAS_DATA, REGRAS_CONTA)
+
+    md5 = CacheMD5(sem_cache, args.max)
+
+    lru = CacheLRU(args.max)
+    com_lru = MotorDeteccao('bench', REGRAS_DATA, REGRAS_CONTA, lru)
+
+    cenarios = [
+        ('sem cache', lambda n, p: (sem_cache.detectar_data(n, p), sem_cache.detectar_conta(n)), lambda: ''),
+        ('md5 + dict', md5.analisar, lambda: f"{md5.acertos / (md5.acertos + md5.falhas):.0%} acertos"),
+        ('CacheLRU', lambda n, p: (com_lru.detectar_data(n, p), com_lru.detectar_conta(n)),
+         lambda: f"{lru.obter_estatisticas()['taxa_acerto']:.0%} acertos, "
+                 f"{lru.stats['removidos']} removidos"),
+    ]
+
+    por_arquivo = lambda t: t / len(lote) * 1e6
+    print(f"{'µs/arquivo':<12} " + ' '.join(f"{f'passada {i + 1}':>11}" for i in range(args.passadas)))
+    for rotulo, analisar, resumo in cenarios:
+        tempos = medir(analisar, lote, args.passadas)
+        print(f"{rotulo:<12} " + ' '.join(f"{por_arquivo(t):>11.2f}" for t in tempos) + f"   {resumo()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da detecção de conta por nome de arquivo
+Compara a busca sequencial usada por detectar_conta (um search por padrão, em
+ordem de prioridade) com uma regex única com todos os padrões fundidos
+(alternativas nomeadas + resolução de prioridade), e confere que os resultados
+são idênticos
+
+Uso:
+    python benchmarks/bench_detectar_conta.py [PASTA] [--nomes 50000] [--repeticoes 3]
+
+Com PASTA, usa os nomes reais dos PDF/OFX encontrados (repetidos até --nomes);
+sem ela, gera nomes no formato dos extratos reais.
+"""
+
+import os
+import sys
+import time
+import random
+import re
+import argparse
+from pathlib import Path
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'utils'))
+from regras_deteccao import MOTOR_LOCAL, MOTOR_SUPER
+
+MESES = ['JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO', 'JULHO',
+         'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO']
+ABREV = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
+
+
+def gerar_nomes(quantidade: int, semente: int = 42):
+    """Nomes no formato dos extratos reais (com e sem conta identificável)"""
+    rnd = random.Random(semente)
+
+    def conta():
+        return f"{rnd.randint(1000, 99999999)}-{rnd.choice('0123456789X')}"
+
+    modelos = [
+        lambda: f"{conta()} {rnd.choice(MESES)} {rnd.randint(2020, 2025)}",
+        lambda: f"{conta()} {rnd.choice(ABREV)}",
+        lambda: f"{rnd.choice(ABREV)} {conta()}",
+        lambda: f"EXT {conta()} {rnd.choice(ABREV)} {rnd.randint(2020, 2025)}",
+        lambda: f"EXT {rnd.choice(MESES)} {conta()}",
+        lambda: f"CAIXA {rnd.choice(ABREV)} {rnd.randint(100, 999)}-{rnd.randint(0, 9)}",
+        lambda: f"Extrato{rnd.randint(10 ** 9, 10 ** 10)}",
+        lambda: f"Extrato {rnd.randint(1000, 999999)} {rnd.randint(1, 12):02d}-{rnd.randint(2020, 2025)}",
+        lambda: f"GFI{rnd.randint(10 ** 8, 10 ** 9)}",
+        lambda: f"Banco {rnd.randint(100, 99999)}-{rnd.randint(0, 9)} extrato {rnd.choice(ABREV)}",
+        lambda: f"scan {rnd.randint(1000, 99999)}- {rnd.choice('0123456789X')} {rnd.randint(2020, 2025)}",
+        lambda: f"comprovante_{rnd.randint(2020, 2025)}{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}",
+        lambda: f"{rnd.randint(10 ** 20, 10 ** 21 - 1)}",
+        lambda: f"375{rnd.randint(10 ** 12, 10 ** 13 - 1)}",
+        lambda: f"{rnd.randint(2020, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} relatorio",
+        lambda: f"IMG_{rnd.randint(2020, 2025)}{rnd.randint(1, 12):02d}01_{rnd.randint(100000, 999999)}",
+        lambda: f"extrato conta corrente {rnd.choice(MESES).lower()}",
+        lambda: f"Documento sem numero {rnd.choice(['final', 'copia', 'v2'])}",
+    ]
+    return [rnd.choice(modelos)() + rnd.choice(['.pdf', '.ofx']) for _ in range(quantidade)]
+
+
+def nomes_da_pasta(pasta: str, quantidade: int):
+    nomes = sorted(p.name for p in Path(pasta).rglob('*') if p.suffix.lower() in ('.pdf', '.ofx'))
+    if not nomes:
+        raise SystemExit(f"Nenhum PDF/OFX em {pasta}")
+    return (nomes * (quantidade // len(nomes) + 1))[:quantidade]
+
+
+def buscar_sequencial(padroes, texto):
+    """Um search por padrão até o primeiro que encontrar (como MotorDeteccao.detectar_conta)"""
+    for nome, padrao in padroes:
+        match = padrao.search(texto)
+        if match:
+            return nome, match.groups()
+    return None
+
+
+class BuscaFundida:
+    """Todos os padrões em uma alternância única, com resolução de prioridade
+
+    A busca acha a alternativa mais à esquerda; se não for a de maior
+    prioridade, continua após aquela posição só com as alternativas anteriores.
+    """
+
+    def __init__(self, padroes):
+        self.nomes = [nome for nome, _ in padroes]
+        alternativas, self.grupos, grupo = [], [], 0
+        for i, (_, padrao) in enumerate(padroes):
+            alternativas.append(f'(?P<_p{i}>{padrao.pattern})')
+            self.grupos.append((grupo + 1, padrao.groups))
+            grupo += 1 + padrao.groups
+        self.prefixos = [None] + [re.compile('|'.join(alternativas[:k]), re.IGNORECASE)
+                                  for k in range(1, len(alternativas) + 1)]
+
+    def buscar(self, texto):
+        melhor, restantes, inicio = None, len(self.nomes), 0
+        while restantes:
+            match = self.prefixos[restantes].search(texto, inicio)
+            if match is None:
+                break
+            melhor, restantes, inicio = match, int(match.lastgroup[2:]), match.start() + 1
+        if melhor is None:
+            return None
+        indice = int(melhor.lastgroup[2:])
+        primeiro, quantidade = self.grupos[indice]
+        return self.nomes[indice], melhor.groups()[primeiro:primeiro + quantidade]
+
+
+def medir(funcao, nomes, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for nome in nomes:
+            funcao(nome)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def comparar(rotulo, motor, nomes, repeticoes):
+    # Regras de conta do motor, já em ordem de prioridade
+    padroes = [(regra.nome, padrao) for regra, padrao in motor.regras_conta]
+    fundida = BuscaFundida(padroes)
+
+    divergentes = [n for n in nomes if buscar_sequencial(padroes, n) != fundida.buscar(n)]
+
+    sequencial = medir(lambda n: buscar_sequencial(padroes, n), nomes, repeticoes)
+    fundido = medir(fundida.buscar, nomes, repeticoes)
+    por_nome = lambda t: t / len(nomes) * 1e6
+
+    print(f"{rotulo:<8} {len(padroes):>8} {por_nome(sequencial):>14.2f} {por_nome(fundido):>12.2f} "
+          f"{fundido / sequencial:>10.2f}x {len(divergentes):>12}")
+    for nome in divergentes[:5]:
+        print(f"  divergente: {nome}")
+    return not divergentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de detectar_conta")
+    parser.add_argument('pasta', nargs='?')
+    parser.add_argument('--nomes', type=int, default=50000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    nomes = nomes_da_pasta(args.pasta, args.nomes) if args.pasta else gerar_nomes(args.nomes)
+    nomes = [n.upper() for n in nomes]  # detectar_conta busca no texto em maiúsculas
+    print(f"Nomes: {len(nomes)} ({len(set(nomes))} distintos)")
+
+    print(f"{'µs/nome':<8} {'padrões':>8} {'sequencial':>14} {'fundido':>12} "
+          f"{'fundido/seq':>11} {'divergentes':>12}")
+    identicos = comparar('local', MOTOR_LOCAL, nomes, args.repeticoes)
+    identicos &= comparar('super', MOTOR_SUPER, nomes, args.repeticoes)
+    return 0 if identicos else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da detecção de data por nome e pasta
+Compara a varredura de "nome pasta" inteiro a cada arquivo (implementação
+anterior) com a varredura só do nome somada às pistas de data memorizadas por
+pasta, e confere que os resultados são idênticos
+
+Uso:
+    python benchmarks/bench_detectar_data.py [--arquivos 50000] [--pastas 100] [--profundidade 6] [--repeticoes 3]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'utils'))
+from regras_deteccao import (MotorDeteccao, REGRAS_DATA, REGRAS_DATA_SUPER, REGRAS_CONTA, MESES_NOMES,
+                             _MESES_POR_NOME, _ANO_4DIGITOS)
+from bench_detectar_conta import gerar_nomes, MESES
+
+
+def gerar_lote(arquivos: int, pastas: int, profundidade: int, semente: int = 11):
+    """[(nome, pasta)] em pastas .../CLIENTE/ANO/MES abaixo de 'profundidade' níveis"""
+    rnd = random.Random(semente)
+    base = '/'.join(['/home/usuario'] + [f"nivel_{i}" for i in range(profundidade)])
+    diretorios = [f"{base}/Cliente {rnd.randint(1, 40)}/{rnd.randint(2020, 2025)}/{rnd.choice(MESES)}"
+                  for _ in range(pastas)]
+    return [(nome, rnd.choice(diretorios)) for nome in gerar_nomes(arquivos, semente)]
+
+
+def detectar_concatenado(motor, texto, caminho_completo):
+    """Implementação anterior: todos os padrões sobre "nome pasta" a cada arquivo"""
+    texto_completo = f"{texto} {caminho_completo}".upper()
+    mes = ano = None
+    for padrao in _MESES_POR_NOME:
+        match = padrao.search(texto_completo)
+        if match:
+            mes = MESES_NOMES.get(match.group(1).upper())
+            if mes:
+                break
+    match = _ANO_4DIGITOS.search(texto_completo)
+    if match:
+        ano = match.group(1)
+    for regra, padrao in motor.regras_data:
+        if mes and ano:
+            break
+        match = padrao.search(texto_completo)
+        if match:
+            if not ano:
+                ano = match.group(regra.grupo_ano)
+                if len(ano) == 2:
+                    ano = f"20{ano}"
+            if not mes:
+                mes_candidato = match.group(regra.grupo_mes).zfill(2)
+                if 1 <= int(mes_candidato) <= 12:
+                    mes = mes_candidato
+    return motor._validar_data(mes, ano)
+
+
+def medir(funcao, lote, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for nome, pasta in lote:
+            funcao(nome, pasta)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de detectar_data")
+    parser.add_argument('--arquivos', type=int, default=50000)
+    parser.add_argument('--pastas', type=int, default=100)
+    parser.add_argument('--profundidade', type=int, default=6)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    lote = gerar_lote(args.arquivos, args.pastas, args.profundidade)
+    print(f"Arquivos: {len(lote)} em {len(set(p for _, p in lote))} pastas (ex.: {lote[0][1]})")
+    print(f"{'µs/arquivo':<10} {'concatenado':>12} {'memorizado':>11} {'ganho':>8} {'divergentes':>12}")
+
+    identicos = True
+    for rotulo, regras in (('local', REGRAS_DATA), ('super', REGRAS_DATA_SUPER)):
+        motor = MotorDeteccao(rotulo, regras, REGRAS_CONTA)  # sem cache de resultados
+
+        divergentes = [(n, p) for n, p in lote if detectar_concatenado(motor, n, p) != motor.detectar_data(n, p)]
+        concatenado = medir(lambda n, p: detectar_concatenado(motor, n, p), lote, args.repeticoes)
+        memorizado = medir(motor.detectar_data, lote, args.repeticoes)
+        por_arquivo = lambda t: t / len(lote) * 1e6
+
+        print(f"{rotulo:<10} {por_arquivo(concatenado):>12.2f} {por_arquivo(memorizado):>11.2f} "
+              f"{concatenado / memorizado:>7.2f}x {len(divergentes):>12}")
+        for nome, pasta in divergentes[:5]:
+            print(f"  divergente: {nome} | {pasta}")
+        identicos &= not divergentes
+    return 0 if identicos else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
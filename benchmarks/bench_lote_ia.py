@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do modo em lote da detecção de extratos
+Compara requisições, tempo e concordância com a detecção individual (um arquivo
+por requisição) para diferentes tamanhos de lote
+
+Uso:
+    GEMINI_API_KEY=... python benchmarks/bench_lote_ia.py PASTA [--amostra 40] [--tamanhos 5,10,20]
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from renomer_ia_v4 import RenomerIA
+
+CAMPOS = ('banco', 'conta', 'mes', 'ano')
+
+
+def concordancia(referencia, resultados):
+    """Percentual de campos iguais aos da detecção individual"""
+    iguais = total = 0
+    for ref, res in zip(referencia, resultados):
+        for campo in CAMPOS:
+            total += 1
+            if (ref or {}).get(campo) == (res or {}).get(campo):
+                iguais += 1
+    return 100.0 * iguais / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de detecção em lote")
+    parser.add_argument('pasta')
+    parser.add_argument('--amostra', type=int, default=40)
+    parser.add_argument('--tamanhos', default='5,10,20')
+    parser.add_argument('--rpm', type=float, default=15)
+    args = parser.parse_args()
+
+    api_key = os.environ.get('GEMINI_API_KEY')
+    if not api_key:
+        print("Defina GEMINI_API_KEY")
+        return 1
+
+    renomer = RenomerIA(api_key, requisicoes_por_minuto=args.rpm)
+    if not renomer.model:
+        print("IA não configurada")
+        return 1
+
+    arquivos = sorted(p for p in Path(args.pasta).rglob('*') if p.suffix.lower() in ('.pdf', '.ofx'))
+    arquivos = arquivos[:args.amostra]
+    itens = [(a.name, renomer._ler_conteudo_extrato(a)) for a in arquivos]
+    print(f"Amostra: {len(itens)} arquivos")
+
+    inicio, usadas = time.time(), renomer.limitador.usadas_hoje
+    referencia = [renomer.detectar_extrato_com_ia(*item) for item in itens]
+    print(f"{'lote':>6} {'requisições':>12} {'tempo (s)':>10} {'detectados':>11} {'concordância':>13}")
+    print(f"{1:>6} {renomer.limitador.usadas_hoje - usadas:>12} {time.time() - inicio:>10.1f} "
+          f"{sum(1 for r in referencia if r):>11} {'100.0%':>13}")
+
+    for tamanho in (int(t) for t in args.tamanhos.split(',')):
+        inicio, usadas = time.time(), renomer.limitador.usadas_hoje
+        resultados = []
+        for i in range(0, len(itens), tamanho):
+            resultados.extend(renomer.detectar_extratos_em_lote(itens[i:i + tamanho]))
+        print(f"{tamanho:>6} {renomer.limitador.usadas_hoje - usadas:>12} {time.time() - inicio:>10.1f} "
+              f"{sum(1 for r in resultados if r):>11} {concordancia(referencia, resultados):>12.1f}%")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -102,7 +102,10 @@ GEMINI_MODEL = "gemini-1.5-flash"  # Modelo do Gemini a ser usado
 USAR_GEMINI = True  # Se True, usa Gemini quando disponível; se False, usa apenas análise local
 GEMINI_FALLBACK = True  # Se True, usa análise local quando Gemini falhar
 GEMINI_CACHE_ENABLED = True  # Se True, mantém cache das análises do Gemini
+GEMINI_CACHE_ARQUIVO = os.path.join(BASE_DIR, "dados", "cache_gemini.db")  # Cache persistente por conteúdo do arquivo
+GEMINI_CACHE_MAX_MB = 50  # Tamanho máximo do cache; as análises menos usadas são removidas primeiro
 GEMINI_MIN_CONFIDENCE = 70  # Confiança mínima para aceitar resultado do Gemini (0-100)
+GEMINI_USO_ARQUIVO = os.path.join(BASE_DIR, "dados", "uso_gemini.db")  # Requisições usadas por dia (cota diária entre execuções)
 
 # Configurações de Segurança
 CRIAR_BACKUP_ANTES_MOVER = False  # Se True, cria backup antes de mover arquivos
@@ -121,6 +124,34 @@ IGNORAR_ARQUIVOS_OCULTOS = True
 PROCESSAR_SUBDIRETORIOS = True
 LIMITE_TAMANHO_ARQUIVO_MB = 100  # Ignora arquivos maiores que este limite (0 = sem limite)
 
+# Histórico de Execuções (SQLite)
+BANCO_EXECUCOES_ATIVO = False  # Se True, registra execuções em banco SQLite para retomada e consultas
+BANCO_EXECUCOES_ARQUIVO = os.path.join(BASE_DIR, "dados", "renomer_execucoes.db")
+
+# Varredura Incremental
+SNAPSHOT_DIRETORIO = os.path.join(BASE_DIR, "dados", "snapshots")  # Snapshots das pastas de origem (fora da árvore varrida)
+
+# Extração de Texto de PDFs (pool de processos)
+EXTRACAO_PROCESSOS = None  # Processos de extração (None = número de CPUs)
+EXTRACAO_TIMEOUT_S = 20  # Tempo máximo por arquivo; PDFs que excederem são registrados e ignorados
+EXTRACAO_LIMITE_CPU_S = 15  # Limite de CPU por arquivo (apenas Linux/macOS)
+
+# Jobs da API (organização em segundo plano)
+JOBS_BANCO_ARQUIVO = os.path.join(BASE_DIR, "dados", "renomer_jobs.db")  # Estado e resultados parciais dos jobs
+JOBS_MAX_SIMULTANEOS = 2  # Jobs executados ao mesmo tempo
+JOBS_MAX_PENDENTES = 50  # Jobs aguardando execução; acima disso a API responde 503
+JOBS_VALIDADE_S = 60  # Jobs ativos sem renovação por este tempo são retomados (ex.: após reinício)
+
+# Caches da API
+API_ORGANIZADORES_MAX = 32  # Organizadores (pares origem/destino) mantidos em memória
+API_ORGANIZADORES_TTL_S = 1800  # Organizadores sem uso por este tempo são descartados
+CACHE_DETECCAO_MAX = 50000  # Detecções (data/conta por nome) em cache, compartilhadas entre organizadores
+
+# Limite de requisições da API (janela deslizante por IP)
+API_RATE_LIMIT_POR_MINUTO = 60
+API_RATE_LIMIT_BACKEND = 'memoria'  # 'memoria' (por processo) ou 'sqlite' (compartilhado entre workers)
+API_RATE_LIMIT_ARQUIVO = os.path.join(BASE_DIR, "dados", "rate_limit.db")
+
 # Configurações de Validação
 VALIDAR_ESTRUTURA_OFX = False  # Se True, valida se arquivos OFX são válidos
 VALIDAR_ESTRUTURA_PDF = False  # Se True, valida se arquivos PDF são válidos
@@ -7,6 +7,7 @@ Com modo extratos bancários e modo genérico
 """
 
 import os
+import sys
 import shutil
 import time
 from pathlib import Path
@@ -16,6 +17,10 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, scrolledtext
 import json
 
+# Adiciona o diretório utils ao path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'utils'))
+from log_progresso import LogProgresso
+
 try:
     import google.generativeai as genai
     GEMINI_DISPONIVEL = True
@@ -23,79 +28,6 @@ except:
     GEMINI_DISPONIVEL = False
 
 
-class LogProgresso:
-    """Gerencia log de progresso para retomada"""
-
-    def __init__(self, pasta_origem):
-        self.pasta_origem = Path(pasta_origem)
-        self.arquivo_log = self.pasta_origem / '.renomer_progress.json'
-        self.dados = self.carregar()
-
-    def carregar(self):
-        """Carrega log existente"""
-        if self.arquivo_log.exists():
-            try:
-                with open(self.arquivo_log, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {'processados': [], 'erros': [], 'iniciado_em': None, 'ultima_atualizacao': None}
-        return {'processados': [], 'erros': [], 'iniciado_em': None, 'ultima_atualizacao': None}
-
-    def salvar(self):
-        """Salva log atual"""
-        try:
-            self.dados['ultima_atualizacao'] = datetime.now().isoformat()
-            with open(self.arquivo_log, 'w', encoding='utf-8') as f:
-                json.dump(self.dados, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Erro ao salvar log: {e}")
-
-    def iniciar(self):
-        """Marca início do processamento"""
-        if not self.dados['iniciado_em']:
-            self.dados['iniciado_em'] = datetime.now().isoformat()
-            self.salvar()
-
-    def arquivo_processado(self, caminho):
-        """Verifica se arquivo já foi processado"""
-        caminho_str = str(caminho)
-        return caminho_str in self.dados['processados'] or caminho_str in [e['arquivo'] for e in self.dados['erros']]
-
-    def adicionar_sucesso(self, caminho, info):
-        """Registra arquivo processado com sucesso"""
-        self.dados['processados'].append({
-            'arquivo': str(caminho),
-            'novo_nome': info['novo_nome'],
-            'pasta_destino': info.get('pasta_destino'),
-            'processado_em': datetime.now().isoformat()
-        })
-        self.salvar()
-
-    def adicionar_erro(self, caminho, erro):
-        """Registra erro no processamento"""
-        self.dados['erros'].append({
-            'arquivo': str(caminho),
-            'erro': str(erro),
-            'processado_em': datetime.now().isoformat()
-        })
-        self.salvar()
-
-    def obter_estatisticas(self):
-        """Retorna estatísticas do log"""
-        return {
-            'total_processados': len(self.dados['processados']),
-            'total_erros': len(self.dados['erros']),
-            'iniciado_em': self.dados.get('iniciado_em'),
-            'ultima_atualizacao': self.dados.get('ultima_atualizacao')
-        }
-
-    def limpar(self):
-        """Limpa o log"""
-        if self.arquivo_log.exists():
-            self.arquivo_log.unlink()
-        self.dados = {'processados': [], 'erros': [], 'iniciado_em': None, 'ultima_atualizacao': None}
-
-
 class RenomerIA:
     """Organizador com IA"""
 
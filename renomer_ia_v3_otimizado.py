@@ -6,6 +6,7 @@ Organizador com IA, Threading e Performance Melhorada
 """
 
 import os
+import sys
 import shutil
 import time
 from pathlib import Path
@@ -17,6 +18,10 @@ import json
 import threading
 import queue
 
+# Adiciona o diretório utils ao path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'utils'))
+from log_progresso import LogProgresso
+
 try:
     import google.generativeai as genai
     GEMINI_DISPONIVEL = True
@@ -24,70 +29,6 @@ except:
     GEMINI_DISPONIVEL = False
 
 
-class LogProgresso:
-    """Gerencia log de progresso"""
-
-    def __init__(self, pasta_origem):
-        self.pasta_origem = Path(pasta_origem)
-        self.arquivo_log = self.pasta_origem / '.renomer_progress.json'
-        self.dados = self.carregar()
-
-    def carregar(self):
-        if self.arquivo_log.exists():
-            try:
-                with open(self.arquivo_log, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {'processados': [], 'erros': [], 'iniciado_em': None}
-        return {'processados': [], 'erros': [], 'iniciado_em': None}
-
-    def salvar(self):
-        try:
-            self.dados['ultima_atualizacao'] = datetime.now().isoformat()
-            with open(self.arquivo_log, 'w', encoding='utf-8') as f:
-                json.dump(self.dados, f, indent=2, ensure_ascii=False)
-        except:
-            pass
-
-    def iniciar(self):
-        if not self.dados['iniciado_em']:
-            self.dados['iniciado_em'] = datetime.now().isoformat()
-            self.salvar()
-
-    def arquivo_processado(self, caminho):
-        caminho_str = str(caminho)
-        return caminho_str in self.dados['processados'] or \
-               caminho_str in [e['arquivo'] for e in self.dados['erros']]
-
-    def adicionar_sucesso(self, caminho, info):
-        self.dados['processados'].append({
-            'arquivo': str(caminho),
-            'novo_nome': info['novo_nome'],
-            'processado_em': datetime.now().isoformat()
-        })
-        self.salvar()
-
-    def adicionar_erro(self, caminho, erro):
-        self.dados['erros'].append({
-            'arquivo': str(caminho),
-            'erro': str(erro),
-            'processado_em': datetime.now().isoformat()
-        })
-        self.salvar()
-
-    def obter_estatisticas(self):
-        return {
-            'total_processados': len(self.dados['processados']),
-            'total_erros': len(self.dados['erros']),
-            'iniciado_em': self.dados.get('iniciado_em')
-        }
-
-    def limpar(self):
-        if self.arquivo_log.exists():
-            self.arquivo_log.unlink()
-        self.dados = {'processados': [], 'erros': [], 'iniciado_em': None}
-
-
 class RenomerIA:
     """Organizador com IA otimizado"""
 
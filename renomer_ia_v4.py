@@ -7,16 +7,38 @@ Modo Genérico: Renomeia no local com preview
 """
 
 import os
+import sys
 import shutil
-import time
 from pathlib import Path
 from datetime import datetime
 import PyPDF2
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk, scrolledtext
+import re
 import json
 import threading
 import queue
+import multiprocessing
+from collections import deque
+
+# Adiciona os diretórios utils, core e config ao path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'utils'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'core'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config'))
+import config
+from log_progresso import LogProgresso
+from pool_requisicoes import LimitadorTaxa, LimiteDiarioExcedido, executar_em_paralelo, em_segundo_plano, coletar
+from cache_ia import CacheIA
+from organizador_local_avancado import OrganizadorLocalAvancado
+from extracao_pdf import ExtratorPDF
+from descoberta import descobrir_arquivos
+from snapshot_diretorios import SnapshotDiretorios
+
+# tkinter só é necessário para a InterfaceRenomerIA; CLI, API e observador usam apenas a RenomerIA
+try:
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk, scrolledtext
+    TKINTER_DISPONIVEL = True
+except ImportError:
+    TKINTER_DISPONIVEL = False
 
 try:
     import google.generativeai as genai
@@ -25,93 +47,101 @@ except:
     GEMINI_DISPONIVEL = False
 
 
-class LogProgresso:
-    """Gerencia log de progresso"""
+class RenomerIA:
+    """Organizador com IA otimizado"""
 
-    def __init__(self, pasta_origem):
-        self.pasta_origem = Path(pasta_origem)
-        self.arquivo_log = self.pasta_origem / '.renomer_progress.json'
-        self.dados = self.carregar()
+    MODELO = 'gemini-1.5-flash'
 
-    def carregar(self):
-        if self.arquivo_log.exists():
-            try:
-                with open(self.arquivo_log, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {'processados': [], 'erros': [], 'iniciado_em': None}
-        return {'processados': [], 'erros': [], 'iniciado_em': None}
+    # Incrementar ao alterar um prompt invalida as respostas guardadas no cache
+    VERSAO_PROMPT_EXTRATO = 1
+    VERSAO_PROMPT_GENERICO = 1
+    VERSAO_PROMPT_LOTE = 1
 
-    def salvar(self):
-        try:
-            self.dados['ultima_atualizacao'] = datetime.now().isoformat()
-            with open(self.arquivo_log, 'w', encoding='utf-8') as f:
-                json.dump(self.dados, f, indent=2, ensure_ascii=False)
-        except:
-            pass
+    # Trecho do conteúdo enviado por arquivo no modo em lote
+    CHARS_POR_ITEM_LOTE = 600
 
-    def iniciar(self):
-        if not self.dados['iniciado_em']:
-            self.dados['iniciado_em'] = datetime.now().isoformat()
-            self.salvar()
-
-    def arquivo_processado(self, caminho):
-        caminho_str = str(caminho)
-        return caminho_str in self.dados['processados'] or \
-               caminho_str in [e['arquivo'] for e in self.dados['erros']]
-
-    def adicionar_sucesso(self, caminho, info):
-        self.dados['processados'].append({
-            'arquivo': str(caminho),
-            'novo_nome': info['novo_nome'],
-            'processado_em': datetime.now().isoformat()
-        })
-        self.salvar()
-
-    def adicionar_erro(self, caminho, erro):
-        self.dados['erros'].append({
-            'arquivo': str(caminho),
-            'erro': str(erro),
-            'processado_em': datetime.now().isoformat()
-        })
-        self.salvar()
-
-    def obter_estatisticas(self):
-        return {
-            'total_processados': len(self.dados['processados']),
-            'total_erros': len(self.dados['erros']),
-            'iniciado_em': self.dados.get('iniciado_em')
-        }
+    # Cópias simultâneas no estágio final do pipeline de extratos
+    COPIAS_SIMULTANEAS = 4
 
-    def limpar(self):
-        if self.arquivo_log.exists():
-            self.arquivo_log.unlink()
-        self.dados = {'processados': [], 'erros': [], 'iniciado_em': None}
+    # Marca a detecção local ainda não feita (None já significa "abaixo da confiança")
+    NAO_DETECTADO = object()
 
+    # Bancos reconhecidos no nome/pasta do arquivo pela detecção local
+    PADRAO_BANCO = re.compile(r'\b(BANCO DO BRASIL|ITAU|ITAÚ|BRADESCO|SANTANDER|CAIXA|NUBANK|INTER|C6|BTG|BB)\b')
+    BANCOS_NORMALIZADOS = {'BANCO DO BRASIL': 'BB', 'ITAÚ': 'ITAU'}
 
-class RenomerIA:
-    """Organizador com IA otimizado"""
-
-    def __init__(self, api_key=None, delay=1.0):
+    def __init__(self, api_key=None, delay=1.0, requisicoes_por_minuto=None,
+                 requisicoes_por_dia=1500, max_workers=4, cache=None, tamanho_lote=1,
+                 deteccao_local=True, arquivo_uso=getattr(config, 'GEMINI_USO_ARQUIVO', None)):
         self.api_key = api_key
         self.model = None
         self.delay = delay
         self.cancelado = False
+        self.max_workers = max_workers
+        self.cache = cache
+        self.tamanho_lote = tamanho_lote
+
+        # Cascata: detecção local (regex) primeiro; IA apenas abaixo da confiança mínima
+        self.deteccao_local = deteccao_local
+        self.confianca_minima = config.GEMINI_MIN_CONFIDENCE
+        self.motor_local = None
+        self._lock_estagios = threading.Lock()
+        self.estagios = {}
+
+        # PDFs que estouraram o tempo de extração na última execução: (caminho, motivo)
+        self.extracao_problematicos = []
+
+        # Sem RPM explícito, o delay define o intervalo médio entre requisições;
+        # a cota diária é persistida em arquivo_uso para valer entre execuções
+        self.limitador = LimitadorTaxa(requisicoes_por_minuto or 60.0 / max(0.1, delay),
+                                       requisicoes_por_dia, arquivo_uso=arquivo_uso)
 
         if api_key and GEMINI_DISPONIVEL:
             try:
                 genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
+                self.model = genai.GenerativeModel(self.MODELO)
             except:
                 pass
 
     def set_delay(self, delay):
         self.delay = max(0.1, float(delay))
+        self.limitador.configurar(60.0 / self.delay)
+
+    def set_max_workers(self, max_workers):
+        self.max_workers = max(1, int(max_workers))
+
+    def set_tamanho_lote(self, tamanho_lote):
+        """Define quantos extratos vão em cada requisição (1 = um por requisição)"""
+        self.tamanho_lote = max(1, int(tamanho_lote))
 
     def cancelar(self):
         """Cancela processamento"""
         self.cancelado = True
 
+    def _chave_cache(self, caminho, tipo, versao_prompt):
+        """Chave do arquivo no cache (None se o cache estiver desativado)"""
+        if not self.cache:
+            return None
+        try:
+            return CacheIA.gerar_chave(caminho, tipo, versao_prompt, self.MODELO)
+        except OSError:
+            return None
+
+    def _analisar_com_cache(self, caminho, tipo, versao_prompt, analisar):
+        """Executa analisar() apenas se o conteúdo do arquivo não estiver no cache"""
+        chave = self._chave_cache(caminho, tipo, versao_prompt)
+        if not chave:
+            return analisar(), False
+
+        resultado = self.cache.obter(chave)
+        if resultado is not None:
+            return resultado, True
+
+        resultado = analisar()
+        if resultado:
+            self.cache.guardar(chave, resultado)
+        return resultado, False
+
     def ler_pdf(self, caminho, max_chars=2000):
         """Lê PDF de forma otimizada"""
         try:
@@ -150,25 +180,95 @@ Conteúdo: {conteudo[:1500]}
 Apenas JSON, sem markdown."""
 
         try:
-            time.sleep(self.delay)
+            self.limitador.aguardar()
             response = self.model.generate_content(prompt)
             texto = response.text.strip()
 
             if '```' in texto:
                 texto = texto.split('```')[1].replace('json','').strip()
 
-            dados = json.loads(texto)
-            if dados.get('mes') and dados.get('ano'):
-                return {
-                    'banco': dados.get('banco', 'BANCO').upper(),
-                    'conta': dados.get('conta'),
-                    'mes': str(dados['mes']).zfill(2),
-                    'ano': str(dados['ano'])
-                }
+            return self._normalizar_extrato(json.loads(texto))
+        except LimiteDiarioExcedido:
+            raise
         except:
             pass
         return None
 
+    def _normalizar_extrato(self, dados):
+        """Valida e padroniza o JSON de um extrato retornado pela IA"""
+        if isinstance(dados, dict) and dados.get('mes') and dados.get('ano'):
+            return {
+                'banco': (dados.get('banco') or 'BANCO').upper(),
+                'conta': dados.get('conta'),
+                'mes': str(dados['mes']).zfill(2),
+                'ano': str(dados['ano'])
+            }
+        return None
+
+    def detectar_extratos_em_lote(self, itens):
+        """
+        Detecta vários extratos com uma única requisição
+
+        Args:
+            itens: Lista de (nome_arquivo, conteudo)
+
+        Returns:
+            list: Resultados na mesma ordem dos itens (None quando não detectado)
+        """
+        if not self.model or not itens:
+            return [None] * len(itens)
+
+        if len(itens) == 1:
+            return [self.detectar_extrato_com_ia(*itens[0])]
+
+        blocos = []
+        for indice, (nome_arquivo, conteudo) in enumerate(itens):
+            trecho = ' '.join(conteudo[:self.CHARS_POR_ITEM_LOTE].split())
+            blocos.append(f"[{indice}] Nome: {nome_arquivo}\nConteúdo: {trecho}")
+
+        prompt = f"""Analise cada extrato abaixo e retorne um array JSON com um objeto por extrato:
+[{{"indice":0,"banco":"NOME","conta":"12345-6 ou null","mes":"MM","ano":"AAAA"}}]
+
+{chr(10).join(blocos)}
+
+Apenas o array JSON, sem markdown."""
+
+        respostas = None
+        try:
+            self.limitador.aguardar()
+            response = self.model.generate_content(prompt)
+            texto = response.text.strip()
+
+            if '```' in texto:
+                texto = texto.split('```')[1].replace('json','').strip()
+
+            dados = json.loads(texto)
+            if isinstance(dados, list):
+                respostas = {}
+                for item in dados:
+                    if isinstance(item, dict) and str(item.get('indice', '')).isdigit():
+                        respostas[int(item['indice'])] = self._normalizar_extrato(item)
+        except LimiteDiarioExcedido:
+            raise
+        except:
+            pass
+
+        if respostas is None:
+            # Resposta malformada ou truncada: divide o lote ao meio e tenta de novo
+            meio = len(itens) // 2
+            return self.detectar_extratos_em_lote(itens[:meio]) + self.detectar_extratos_em_lote(itens[meio:])
+
+        resultados = [respostas.get(i) for i in range(len(itens))]
+
+        # Itens omitidos na resposta são reenviados em um lote menor
+        faltantes = [i for i in range(len(itens)) if i not in respostas]
+        if faltantes and len(faltantes) < len(itens):
+            refeitos = self.detectar_extratos_em_lote([itens[i] for i in faltantes])
+            for i, resultado in zip(faltantes, refeitos):
+                resultados[i] = resultado
+
+        return resultados
+
     def sugerir_nome_com_ia(self, nome_arquivo, conteudo):
         """Sugere nome com IA"""
         if not self.model:
@@ -183,7 +283,7 @@ Conteúdo: {conteudo[:1500]}
 Apenas JSON, sem markdown."""
 
         try:
-            time.sleep(self.delay)
+            self.limitador.aguardar()
             response = self.model.generate_content(prompt)
             texto = response.text.strip()
 
@@ -196,24 +296,124 @@ Apenas JSON, sem markdown."""
                 'categoria': dados.get('categoria', 'diversos'),
                 'data': dados.get('data')
             }
+        except LimiteDiarioExcedido:
+            raise
         except:
             pass
         return None
 
-    def processar_arquivo_extrato(self, caminho_origem):
-        """Processa extrato"""
+    def _ler_conteudo_extrato(self, caminho):
+        return self.ler_pdf(caminho) if Path(caminho).suffix.lower() == '.pdf' else self.ler_ofx(caminho)
+
+    def detectar_extrato_local(self, arquivo):
+        """Detecta extrato pelas regras locais; retorna None abaixo da confiança mínima"""
+        if not self.motor_local:
+            return None
+
+        arquivo = Path(arquivo)
+        data = self.motor_local.detectar_data(arquivo.name, str(arquivo.parent), str(arquivo))
+        conta = self.motor_local.detectar_conta(arquivo.name)
+        match_banco = self.PADRAO_BANCO.search(f"{arquivo.name} {arquivo.parent.name}".upper())
+        banco = self.BANCOS_NORMALIZADOS.get(match_banco.group(1), match_banco.group(1)) if match_banco else None
+
+        # Mesmos pesos de OrganizadorSuperAvancado.classificar_arquivo
+        confianca = 0
+        if data['encontrado']:
+            confianca += 50
+        if conta['encontrado']:
+            confianca += 40
+        if banco:
+            confianca += 10
+
+        if not data['encontrado'] or confianca < self.confianca_minima:
+            return None
+
+        return {
+            'banco': banco or 'BANCO',
+            'conta': conta['conta'],
+            'mes': data['mes'],
+            'ano': data['ano'],
+            'confianca': confianca
+        }
+
+    def _registrar_estagio(self, estagio):
+        with self._lock_estagios:
+            self.estagios[estagio] = self.estagios.get(estagio, 0) + 1
+
+    def obter_estatisticas_estagios(self):
+        """Quantidade e taxa de acerto de cada estágio da cascata"""
+        with self._lock_estagios:
+            total = sum(self.estagios.values())
+            return {
+                estagio: {'arquivos': qtd, 'taxa': round(100.0 * qtd / total, 1) if total else 0.0}
+                for estagio, qtd in self.estagios.items()
+            }
+
+    def processar_arquivo_extrato(self, caminho_origem, conteudo=None, local=NAO_DETECTADO):
+        """Processa extrato (conteudo: texto já extraído; local: detecção local já feita, se houver)"""
         arquivo = Path(caminho_origem)
-        extensao = arquivo.suffix.lower()
 
-        conteudo = self.ler_pdf(caminho_origem) if extensao == '.pdf' else self.ler_ofx(caminho_origem)
-        resultado = self.detectar_extrato_com_ia(arquivo.name, conteudo)
+        if local is self.NAO_DETECTADO:
+            local = self.detectar_extrato_local(arquivo)
+        if local:
+            return self._montar_info_extrato(arquivo, local, 'local')
+
+        def analisar():
+            texto = conteudo if conteudo is not None else self._ler_conteudo_extrato(caminho_origem)
+            return self.detectar_extrato_com_ia(arquivo.name, texto)
+
+        resultado, do_cache = self._analisar_com_cache(caminho_origem, 'extrato',
+                                                       self.VERSAO_PROMPT_EXTRATO, analisar)
+        return self._montar_info_extrato(arquivo, resultado, 'cache' if do_cache else 'ia')
+
+    def processar_lote_extratos(self, caminhos, conteudos=None, locais=None):
+        """Processa vários extratos com uma requisição (apenas os não resolvidos localmente ou pelo cache)"""
+        conteudos = conteudos or [None] * len(caminhos)
+        locais = locais or [self.NAO_DETECTADO] * len(caminhos)
+        infos = [None] * len(caminhos)
+        pendentes = []
+
+        for i, caminho in enumerate(caminhos):
+            local = locais[i]
+            if local is self.NAO_DETECTADO:
+                local = self.detectar_extrato_local(caminho)
+            if local:
+                infos[i] = self._montar_info_extrato(Path(caminho), local, 'local')
+                continue
+
+            chave = self._chave_cache(caminho, 'extrato_lote', self.VERSAO_PROMPT_LOTE)
+            resultado = self.cache.obter(chave) if chave else None
+            if resultado is not None:
+                infos[i] = self._montar_info_extrato(Path(caminho), resultado, 'cache')
+            else:
+                pendentes.append((i, caminho, chave))
+
+        itens = [
+            (Path(caminho).name, conteudos[i] if conteudos[i] is not None else self._ler_conteudo_extrato(caminho))
+            for i, caminho, _ in pendentes
+        ]
+        resultados = self.detectar_extratos_em_lote(itens)
+
+        for (i, caminho, chave), resultado in zip(pendentes, resultados):
+            if resultado and chave:
+                self.cache.guardar(chave, resultado)
+            infos[i] = self._montar_info_extrato(Path(caminho), resultado, 'ia')
+
+        return infos
+
+    def _montar_info_extrato(self, arquivo, resultado, estagio):
+        """Monta nome e pastas do extrato a partir do resultado do estágio (local, cache ou ia)"""
+        extensao = arquivo.suffix.lower()
 
         if resultado:
             banco, conta, mes, ano = resultado['banco'], resultado['conta'], resultado['mes'], resultado['ano']
         else:
+            estagio = 'padrao'
             banco, conta = "BANCO", None
             mes, ano = f"{datetime.now().month:02d}", str(datetime.now().year)
 
+        self._registrar_estagio(estagio)
+
         conta_str = f"_{conta}" if conta else ""
         novo_nome = f"{ano}-{mes}_{banco}{conta_str}{extensao}"
 
@@ -222,8 +422,12 @@ Apenas JSON, sem markdown."""
             'novo_nome': novo_nome,
             'ano': ano,
             'mes': mes,
+            'banco': banco,
+            'conta': conta,
             'extensao': extensao,
-            'ia_usada': resultado is not None,
+            'ia_usada': estagio in ('ia', 'cache'),
+            'cache_usado': estagio == 'cache',
+            'estagio': estagio,
             'modo': 'extrato'
         }
 
@@ -232,8 +436,11 @@ Apenas JSON, sem markdown."""
         arquivo = Path(caminho_origem)
         extensao = arquivo.suffix.lower()
 
-        conteudo = self.ler_pdf(caminho_origem)
-        resultado = self.sugerir_nome_com_ia(arquivo.name, conteudo)
+        def analisar():
+            return self.sugerir_nome_com_ia(arquivo.name, self.ler_pdf(caminho_origem))
+
+        resultado, do_cache = self._analisar_com_cache(caminho_origem, 'generico',
+                                                       self.VERSAO_PROMPT_GENERICO, analisar)
 
         if resultado:
             nome_sugerido = resultado['nome_sugerido']
@@ -254,12 +461,80 @@ Apenas JSON, sem markdown."""
             'categoria': resultado.get('categoria', 'diversos') if resultado else 'diversos',
             'extensao': extensao,
             'ia_usada': resultado is not None,
+            'cache_usado': do_cache,
             'modo': 'generico'
         }
 
+    def _descobrir_extratos(self, pasta_origem, recursivo=True, snapshot=None):
+        """Percorre a pasta gerando PDFs e OFXs à medida que são encontrados"""
+        for entrada in descobrir_arquivos(pasta_origem, recursivo=recursivo, snapshot=snapshot):
+            yield Path(entrada.path)
+
+    def preparar_deteccao_local(self, pasta_origem=None, pasta_destino=None):
+        """Cria o motor de regras locais da cascata (None se desativado ou pastas inválidas)
+
+        Sem pastas, cria apenas o detector (análise de arquivos avulsos)
+        """
+        self.motor_local = None
+        if self.deteccao_local and pasta_origem is None:
+            self.motor_local = OrganizadorLocalAvancado.somente_deteccao()
+        elif self.deteccao_local:
+            try:
+                self.motor_local = OrganizadorLocalAvancado(str(pasta_origem), str(pasta_destino))
+            except (ValueError, OSError):
+                self.motor_local = None
+
+    def _definir_destino_extrato(self, info, pasta_destino, reservados=None):
+        """Caminho final ANO/MES/nome, com sufixo _N se já existir (ou estiver reservado)"""
+        reservados = reservados if reservados is not None else set()
+        pasta_final = Path(pasta_destino) / info['ano'] / info['mes']
+        destino = pasta_final / info['novo_nome']
+
+        contador = 1
+        while destino in reservados or destino.exists():
+            nome_base = destino.stem
+            destino = pasta_final / f"{nome_base}_{contador}{info['extensao']}"
+            contador += 1
+
+        reservados.add(destino)
+        return destino
+
+    def organizar_arquivo_extrato(self, caminho_origem, pasta_destino):
+        """Classifica e copia um único extrato (usado pelo modo observador)"""
+        info = self.processar_arquivo_extrato(caminho_origem)
+        destino = self._definir_destino_extrato(info, pasta_destino)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(caminho_origem, destino)
+        info['pasta_destino'] = str(destino.parent)
+        info['destino'] = str(destino)
+        return info
+
     def organizar_extratos(self, pasta_origem, pasta_destino, recursivo=True,
-                          retomar=False, progress_queue=None):
-        """Organiza extratos - COPIA para pasta destino organizada"""
+                          retomar=False, progress_queue=None, banco_execucoes=None,
+                          incremental=False, completo=False):
+        """Organiza extratos - COPIA para pasta destino organizada
+
+        Pipeline com filas limitadas entre os estágios:
+        descoberta → leitura (processos) → classificação (threads) → destino → cópia (threads)
+
+        banco_execucoes: BancoExecucoes opcional para histórico e retomada indexada
+        incremental: usa o snapshot da pasta de origem e processa apenas arquivos novos
+            ou alterados desde a última execução (completo=True refaz o snapshot do zero)
+        """
+        resultados, resumo = coletar(self.organizar_extratos_iter(
+            pasta_origem, pasta_destino, recursivo, retomar, progress_queue,
+            banco_execucoes, incremental, completo))
+        if 'erro' not in resumo:
+            resumo['resultados'] = resultados
+        return resumo
+
+    def organizar_extratos_iter(self, pasta_origem, pasta_destino, recursivo=True,
+                                retomar=False, progress_queue=None, banco_execucoes=None,
+                                incremental=False, completo=False):
+        """Como organizar_extratos, mas gera o resultado de cada arquivo ao concluir a cópia
+
+        O resumo (sem 'resultados') é o valor de retorno do gerador.
+        """
         self.cancelado = False
         pasta_origem = Path(pasta_origem)
         pasta_destino = Path(pasta_destino)
@@ -273,124 +548,247 @@ Apenas JSON, sem markdown."""
             log = LogProgresso(pasta_origem)
         log.iniciar()
 
-        # Lista arquivos
-        if recursivo:
-            arquivos = list(pasta_origem.rglob('*.[pP][dD][fF]')) + list(pasta_origem.rglob('*.[oO][fF][xX]'))
-        else:
-            arquivos = list(pasta_origem.glob('*.[pP][dD][fF]')) + list(pasta_origem.glob('*.[oO][fF][xX]'))
-
-        arquivos = list(set(arquivos))
-
-        if not arquivos:
-            return {'erro': 'Nenhum arquivo encontrado'}
-
+        ja_processado = None
         if retomar:
-            arquivos = [a for a in arquivos if not log.arquivo_processado(a)]
-
-        if not arquivos:
-            return {'total': 0, 'processados': 0, 'erros': 0, 'resultados': [],
+            ja_processado = banco_execucoes.arquivo_processado if banco_execucoes else log.arquivo_processado
+
+        snapshot = SnapshotDiretorios(pasta_origem, 'extratos', completo) if incremental else None
+
+        cancelado = lambda: self.cancelado
+        contagem = {'encontrados': 0, 'pendentes': 0}
+
+        def descobrir():
+            for arquivo in self._descobrir_extratos(pasta_origem, recursivo, snapshot):
+                contagem['encontrados'] += 1
+                if ja_processado and ja_processado(arquivo):
+                    continue
+                contagem['pendentes'] += 1
+                yield arquivo
+
+        # Estágio 1: descoberta
+        descobertos = em_segundo_plano(descobrir(), 256, cancelado)
+        primeiro = next(descobertos, None)
+        if primeiro is None:
+            if snapshot:
+                snapshot.salvar()
+                # Pastas inalteradas não são listadas: sem arquivos encontrados, um snapshot
+                # anterior significa "nada novo"; o erro fica para a primeira varredura (ou completa)
+                if not contagem['encontrados'] and snapshot.carregado:
+                    return {'total': 0, 'processados': 0, 'erros': 0,
+                            'mensagem': 'Nenhum arquivo novo desde a última execução'}
+            if not contagem['encontrados']:
+                return {'erro': 'Nenhum arquivo encontrado'}
+            return {'total': 0, 'processados': 0, 'erros': 0,
                     'mensagem': 'Todos já foram processados!'}
 
-        resultados = []
+        execucao_id = None
+        if banco_execucoes:
+            execucao_id = banco_execucoes.iniciar_execucao(pasta_origem, pasta_destino, 'IA_EXTRATOS')
+
+        self.estagios = {}
+        self.preparar_deteccao_local(pasta_origem, pasta_destino)
+
+        estado = {'limite_diario': False}
+
+        def descobertos_com_primeiro():
+            yield primeiro
+            yield from descobertos
+
+        # Estágio 4: destino (serial, reserva nomes ainda não copiados para evitar colisões)
+        def posicionar(classificados):
+            reservados = set()
+            for arquivo, info, erro in classificados:
+                if erro:
+                    if isinstance(erro, LimiteDiarioExcedido):
+                        estado['limite_diario'] = True
+                        self.cancelado = True
+                    yield arquivo, info, None, erro
+                    continue
+
+                yield arquivo, info, self._definir_destino_extrato(info, pasta_destino, reservados), None
+
+        # Estágio 5: cópia
+        def copiar(item):
+            arquivo, _, destino, erro = item
+            if erro:
+                raise erro
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(arquivo, destino)
+            return destino
+
+        # Estágios 2 e 3: leitura e classificação (ver _executar_extratos)
+        classificados = self._executar_extratos(descobertos_com_primeiro())
+        posicionados = em_segundo_plano(posicionar(classificados), self.COPIAS_SIMULTANEAS * 2, cancelado)
+        copiados = executar_em_paralelo(copiar, posicionados, self.COPIAS_SIMULTANEAS, cancelado)
+
         processados = 0
         erros = 0
-        total = len(arquivos)
-
-        for idx, arquivo in enumerate(arquivos, 1):
-            if self.cancelado:
-                break
-
-            try:
-                if progress_queue:
-                    progress_queue.put(('progress', idx, total, arquivo.name))
-
-                info = self.processar_arquivo_extrato(arquivo)
-                pasta_final = pasta_destino / info['ano'] / info['mes']
-
-                pasta_final.mkdir(parents=True, exist_ok=True)
-                destino = pasta_final / info['novo_nome']
-
-                contador = 1
-                while destino.exists():
-                    nome_base = destino.stem
-                    destino = pasta_final / f"{nome_base}_{contador}{info['extensao']}"
-                    contador += 1
-
-                shutil.copy2(arquivo, destino)
-                log.adicionar_sucesso(arquivo, info)
-
-                resultados.append({
-                    'status': 'OK',
-                    'original': info['original'],
-                    'novo': info['novo_nome'],
-                    'pasta': str(pasta_final),
-                    'ia_usada': info['ia_usada']
-                })
-                processados += 1
 
-            except Exception as e:
-                log.adicionar_erro(arquivo, str(e))
-                resultados.append({
+        # Log, banco e progresso ficam nesta thread
+        for idx, ((arquivo, info, _, _), destino, erro) in enumerate(copiados, 1):
+            if progress_queue:
+                # O total cresce enquanto a descoberta ainda está em andamento
+                progress_queue.put(('progress', idx, max(idx, contagem['pendentes']), arquivo.name))
+
+            if erro:
+                # Sem cota, o arquivo não conta como processado: fica para a retomada
+                if not isinstance(erro, LimiteDiarioExcedido):
+                    log.adicionar_erro(arquivo, str(erro))
+                    if banco_execucoes:
+                        banco_execucoes.registrar_arquivo(execucao_id, arquivo, 'ERRO', erro=str(erro),
+                                                          calcular_conteudo=False)
+                erros += 1
+                yield {
                     'status': 'ERRO',
                     'original': arquivo.name,
-                    'erro': str(e)
-                })
-                erros += 1
+                    'caminho_original': str(arquivo),
+                    'erro': str(erro)
+                }
+                continue
+
+            info['pasta_destino'] = str(destino.parent)
+            log.adicionar_sucesso(arquivo, info)
+            if snapshot:
+                snapshot.confirmar(arquivo)
+            if banco_execucoes:
+                banco_execucoes.registrar_arquivo(execucao_id, arquivo, 'OK', info, destino)
+
+            processados += 1
+            yield {
+                'status': 'OK',
+                'original': info['original'],
+                'caminho_original': str(arquivo),
+                'novo': info['novo_nome'],
+                'pasta': str(destino.parent),
+                'ia_usada': info['ia_usada'],
+                'cache_usado': info['cache_usado'],
+                'estagio': info['estagio']
+            }
+
+        if banco_execucoes:
+            banco_execucoes.finalizar_execucao(execucao_id)
+        if snapshot:
+            snapshot.salvar()
 
         return {
-            'total': total,
+            'total': contagem['pendentes'],
             'processados': processados,
             'erros': erros,
-            'resultados': resultados,
             'log_stats': log.obter_estatisticas(),
+            'uso_api': self.limitador.obter_estatisticas(),
+            'cache': self.cache.obter_estatisticas() if self.cache else None,
+            'estagios': self.obter_estatisticas_estagios(),
+            'extracao_problematicos': self.extracao_problematicos,
+            'snapshot': snapshot.obter_estatisticas() if snapshot else None,
+            'limite_diario': estado['limite_diario'],
             'cancelado': self.cancelado
         }
 
+    def _extrair_conteudos(self, arquivos):
+        """
+        Estágio de leitura: extrai o texto dos PDFs não resolvidos localmente em um
+        pool de processos e entrega (arquivo, conteudo, local) por uma fila limitada.
+        conteudo é None quando a leitura fica a cargo do próprio estágio (OFX ou detecção local);
+        local é o resultado de detectar_extrato_local, feito uma única vez por arquivo
+        """
+        # O extrator chama o filtro e entrega os arquivos na mesma ordem de entrada
+        locais = deque()
+
+        def precisa_extrair(arquivo):
+            locais.append(self.detectar_extrato_local(arquivo))
+            return arquivo.suffix.lower() == '.pdf' and not locais[-1]
+
+        def extrair():
+            with ExtratorPDF(config.EXTRACAO_PROCESSOS, config.EXTRACAO_TIMEOUT_S,
+                             config.EXTRACAO_LIMITE_CPU_S) as extrator:
+                self.extracao_problematicos = extrator.problematicos
+                for arquivo, texto, _ in extrator.extrair(arquivos, precisa_extrair):
+                    yield arquivo, texto, locais.popleft()
+
+        self.extracao_problematicos = []
+        return em_segundo_plano(extrair(), max(1, self.max_workers) * 4, lambda: self.cancelado)
+
+    def _executar_extratos(self, arquivos):
+        """Processa extratos no pool, individualmente ou em lotes de tamanho_lote"""
+        itens = self._extrair_conteudos(arquivos)
+
+        if self.tamanho_lote <= 1:
+            for (arquivo, _, _), info, erro in executar_em_paralelo(
+                    lambda item: self.processar_arquivo_extrato(*item), itens,
+                    self.max_workers, lambda: self.cancelado):
+                yield arquivo, info, erro
+            return
+
+        def lotes():
+            lote = []
+            for item in itens:
+                lote.append(item)
+                if len(lote) == self.tamanho_lote:
+                    yield lote
+                    lote = []
+            if lote:
+                yield lote
+
+        def processar_lote(lote):
+            return self.processar_lote_extratos([a for a, _, _ in lote], [c for _, c, _ in lote],
+                                                [l for _, _, l in lote])
+
+        for lote, infos, erro in executar_em_paralelo(processar_lote, lotes(),
+                                                      self.max_workers, lambda: self.cancelado):
+            for (arquivo, _, _), info in zip(lote, infos or [None] * len(lote)):
+                yield arquivo, info, erro
+
     def renomear_genericos(self, arquivos_pdf, progress_queue=None):
         """Renomeia PDFs genéricos - RENOMEIA NO LOCAL"""
-        self.cancelado = False
-
         if not arquivos_pdf:
             return {'erro': 'Nenhum arquivo selecionado'}
 
+        resultados, resumo = coletar(self.renomear_genericos_iter(arquivos_pdf, progress_queue))
+        resumo['resultados'] = resultados
+        return resumo
+
+    def renomear_genericos_iter(self, arquivos_pdf, progress_queue=None):
+        """Gera a sugestão de nome (PREVIEW) de cada PDF assim que fica pronta; retorna o resumo"""
+        self.cancelado = False
+
         arquivos = [Path(f) for f in arquivos_pdf]
         total = len(arquivos)
-        resultados = []
         processados = 0
         erros = 0
 
-        for idx, arquivo in enumerate(arquivos, 1):
-            if self.cancelado:
-                break
+        execucao = executar_em_paralelo(self.processar_arquivo_generico, arquivos,
+                                        self.max_workers, lambda: self.cancelado)
 
-            try:
-                if progress_queue:
-                    progress_queue.put(('progress', idx, total, arquivo.name))
-
-                info = self.processar_arquivo_generico(arquivo)
-
-                resultados.append({
-                    'status': 'PREVIEW',
-                    'original': info['original'],
-                    'caminho_original': str(arquivo),
-                    'novo': info['novo_nome'],
-                    'ia_usada': info['ia_usada']
-                })
-                processados += 1
+        for idx, (arquivo, info, erro) in enumerate(execucao, 1):
+            if progress_queue:
+                progress_queue.put(('progress', idx, total, arquivo.name))
 
-            except Exception as e:
-                resultados.append({
+            if erro:
+                if isinstance(erro, LimiteDiarioExcedido):
+                    self.cancelado = True
+                erros += 1
+                yield {
                     'status': 'ERRO',
                     'original': arquivo.name,
-                    'erro': str(e)
-                })
-                erros += 1
+                    'caminho_original': str(arquivo),
+                    'erro': str(erro)
+                }
+                continue
+
+            processados += 1
+            yield {
+                'status': 'PREVIEW',
+                'original': info['original'],
+                'caminho_original': str(arquivo),
+                'novo': info['novo_nome'],
+                'ia_usada': info['ia_usada'],
+                'cache_usado': info['cache_usado']
+            }
 
         return {
             'total': total,
             'processados': processados,
             'erros': erros,
-            'resultados': resultados,
             'cancelado': self.cancelado
         }
 
@@ -402,35 +800,14 @@ Apenas JSON, sem markdown."""
         erros = 0
 
         for idx, item in enumerate(lista_renomeacoes, 1):
-            try:
-                if progress_queue:
-                    progress_queue.put(('progress', idx, total, item['original']))
-
-                arquivo_original = Path(item['caminho_original'])
-                pasta_original = arquivo_original.parent
-                novo_caminho = pasta_original / item['novo']
-
-                contador = 1
-                while novo_caminho.exists():
-                    nome_base = novo_caminho.stem
-                    novo_caminho = pasta_original / f"{nome_base}_{contador}{arquivo_original.suffix}"
-                    contador += 1
-
-                arquivo_original.rename(novo_caminho)
-
-                resultados.append({
-                    'status': 'OK',
-                    'original': item['original'],
-                    'novo': novo_caminho.name
-                })
-                processados += 1
+            if progress_queue:
+                progress_queue.put(('progress', idx, total, item['original']))
 
-            except Exception as e:
-                resultados.append({
-                    'status': 'ERRO',
-                    'original': item['original'],
-                    'erro': str(e)
-                })
+            resultado = self.aplicar_renomeacao_item(item)
+            resultados.append(resultado)
+            if resultado['status'] == 'OK':
+                processados += 1
+            else:
                 erros += 1
 
         return {
@@ -440,6 +817,34 @@ Apenas JSON, sem markdown."""
             'resultados': resultados
         }
 
+    def aplicar_renomeacao_item(self, item):
+        """Renomeia um arquivo no local, com sufixo _N se o novo nome já existir"""
+        try:
+            arquivo_original = Path(item['caminho_original'])
+            pasta_original = arquivo_original.parent
+            novo_caminho = pasta_original / item['novo']
+
+            contador = 1
+            while novo_caminho.exists():
+                nome_base = novo_caminho.stem
+                novo_caminho = pasta_original / f"{nome_base}_{contador}{arquivo_original.suffix}"
+                contador += 1
+
+            arquivo_original.rename(novo_caminho)
+
+            return {
+                'status': 'OK',
+                'original': item['original'],
+                'novo': novo_caminho.name
+            }
+
+        except Exception as e:
+            return {
+                'status': 'ERRO',
+                'original': item['original'],
+                'erro': str(e)
+            }
+
 
 class InterfaceRenomerIA:
     """Interface gráfica otimizada"""
@@ -455,8 +860,11 @@ class InterfaceRenomerIA:
         self.api_key = tk.StringVar()
         self.recursivo = tk.BooleanVar(value=True)
         self.retomar = tk.BooleanVar(value=False)
+        self.incremental = tk.BooleanVar(value=False)
         self.modo_extrato = tk.BooleanVar(value=True)
         self.delay = tk.DoubleVar(value=1.0)
+        self.max_workers = tk.IntVar(value=4)
+        self.tamanho_lote = tk.IntVar(value=1)
 
         self.processando = False
         self.thread_processamento = None
@@ -489,6 +897,16 @@ class InterfaceRenomerIA:
         ttk.Spinbox(main_frame, from_=0.5, to=5.0, increment=0.5, textvariable=self.delay, width=10).grid(row=linha, column=1, sticky=tk.W, pady=5)
         linha += 1
 
+        # Requisições simultâneas
+        ttk.Label(main_frame, text="Requisições simultâneas:").grid(row=linha, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(main_frame, from_=1, to=16, increment=1, textvariable=self.max_workers, width=10).grid(row=linha, column=1, sticky=tk.W, pady=5)
+        linha += 1
+
+        # Extratos por requisição
+        ttk.Label(main_frame, text="Extratos por requisição:").grid(row=linha, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(main_frame, from_=1, to=30, increment=1, textvariable=self.tamanho_lote, width=10).grid(row=linha, column=1, sticky=tk.W, pady=5)
+        linha += 1
+
         # Status
         self.label_status_ia = ttk.Label(main_frame, text="❌ IA não configurada", foreground="red")
         self.label_status_ia.grid(row=linha, column=0, columnspan=3, pady=5)
@@ -526,6 +944,8 @@ class InterfaceRenomerIA:
         ttk.Checkbutton(self.frame_extratos, text="Buscar em subpastas", variable=self.recursivo).grid(row=linha_ext, column=0, columnspan=2, sticky=tk.W, pady=2)
         linha_ext += 1
         ttk.Checkbutton(self.frame_extratos, text="Retomar processamento", variable=self.retomar).grid(row=linha_ext, column=0, columnspan=2, sticky=tk.W, pady=2)
+        linha_ext += 1
+        ttk.Checkbutton(self.frame_extratos, text="Apenas arquivos novos (incremental)", variable=self.incremental).grid(row=linha_ext, column=0, columnspan=2, sticky=tk.W, pady=2)
 
         # Frame Genérico
         self.frame_generico = ttk.LabelFrame(main_frame, text="Renomeação Genérica", padding="10")
@@ -606,7 +1026,11 @@ class InterfaceRenomerIA:
             return
 
         try:
-            self.renomer = RenomerIA(api_key, self.delay.get())
+            cache = None
+            if config.GEMINI_CACHE_ENABLED:
+                cache = CacheIA(config.GEMINI_CACHE_ARQUIVO, config.GEMINI_CACHE_MAX_MB)
+            self.renomer = RenomerIA(api_key, self.delay.get(), max_workers=self.max_workers.get(),
+                                     cache=cache)
             if self.renomer.model:
                 self.label_status_ia.config(text=f"✅ IA configurada! Delay: {self.delay.get()}s", foreground="green")
                 messagebox.showinfo("Sucesso", "IA configurada!")
@@ -638,9 +1062,8 @@ class InterfaceRenomerIA:
     def selecionar_pasta_genericos(self):
         pasta = filedialog.askdirectory(title="Selecione pasta com PDFs")
         if pasta:
-            pasta_path = Path(pasta)
-            arquivos = list(pasta_path.glob('*.pdf')) + list(pasta_path.glob('*.PDF'))
-            self.arquivos_genericos_selecionados = [str(f) for f in arquivos]
+            arquivos = [entrada.path for entrada in descobrir_arquivos(pasta, ('.pdf',), recursivo=False)]
+            self.arquivos_genericos_selecionados = arquivos
             self.label_arquivos_selecionados.config(text=f"{len(arquivos)} arquivo(s) na pasta")
 
     def processar(self):
@@ -679,6 +1102,8 @@ class InterfaceRenomerIA:
 
         self.progressbar['value'] = 0
         self.renomer.set_delay(self.delay.get())
+        self.renomer.set_max_workers(self.max_workers.get())
+        self.renomer.set_tamanho_lote(self.tamanho_lote.get())
 
         self.thread_processamento = threading.Thread(
             target=self._processar_extratos_thread,
@@ -692,7 +1117,8 @@ class InterfaceRenomerIA:
         try:
             resultado = self.renomer.organizar_extratos(
                 origem, destino, self.recursivo.get(),
-                self.retomar.get(), self.progress_queue
+                self.retomar.get(), self.progress_queue,
+                incremental=self.incremental.get()
             )
             self.progress_queue.put(('done_extratos', resultado))
         except Exception as e:
@@ -710,6 +1136,7 @@ class InterfaceRenomerIA:
 
         self.progressbar['value'] = 0
         self.renomer.set_delay(self.delay.get())
+        self.renomer.set_max_workers(self.max_workers.get())
 
         self.thread_processamento = threading.Thread(
             target=self._processar_genericos_thread,
@@ -816,6 +1243,7 @@ class InterfaceRenomerIA:
             return
 
         com_ia = sum(1 for r in resultado['resultados'] if r.get('ia_usada'))
+        do_cache = sum(1 for r in resultado['resultados'] if r.get('cache_usado'))
 
         self.text_resultado.insert(tk.END, f"{'='*80}\n")
         self.text_resultado.insert(tk.END, f"📊 EXTRATOS ORGANIZADOS\n")
@@ -823,11 +1251,23 @@ class InterfaceRenomerIA:
         self.text_resultado.insert(tk.END, f"Total: {resultado['total']}\n")
         self.text_resultado.insert(tk.END, f"✅ Copiados: {resultado['processados']}\n")
         self.text_resultado.insert(tk.END, f"❌ Erros: {resultado['erros']}\n")
-        self.text_resultado.insert(tk.END, f"🤖 Com IA: {com_ia}\n\n")
-
-        if resultado.get('cancelado'):
+        self.text_resultado.insert(tk.END, f"🤖 Com IA: {com_ia} (💾 do cache: {do_cache})\n")
+        for estagio, dados in resultado.get('estagios', {}).items():
+            self.text_resultado.insert(tk.END, f"   • {estagio}: {dados['arquivos']} ({dados['taxa']}%)\n")
+        self.text_resultado.insert(tk.END, "\n")
+
+        if resultado.get('limite_diario'):
+            self.text_resultado.insert(tk.END, "⚠️ LIMITE DIÁRIO DA API ATINGIDO - use 'Retomar processamento' amanhã\n\n")
+        elif resultado.get('cancelado'):
             self.text_resultado.insert(tk.END, "⚠️ PROCESSAMENTO CANCELADO\n\n")
 
+        problematicos = resultado.get('extracao_problematicos', [])
+        if problematicos:
+            self.text_resultado.insert(tk.END, f"⏱️ PDFs com extração interrompida: {len(problematicos)}\n")
+            for caminho, motivo in problematicos[:10]:
+                self.text_resultado.insert(tk.END, f"   • {Path(caminho).name}: {motivo}\n")
+            self.text_resultado.insert(tk.END, "\n")
+
         for i, r in enumerate(resultado['resultados'][:20], 1):
             if r['status'] == 'OK':
                 ia = "🤖" if r.get('ia_usada') else "📝"
@@ -915,9 +1355,16 @@ class InterfaceRenomerIA:
 
 
 if __name__ == '__main__':
+    # Necessário para o pool de extração de PDFs no executável congelado (Windows)
+    multiprocessing.freeze_support()
+
     if not GEMINI_DISPONIVEL:
         print("AVISO: google-generativeai não instalado")
         print("Instale: pip install google-generativeai")
 
+    if not TKINTER_DISPONIVEL:
+        print("ERRO: tkinter não disponível; use a CLI (src/cli.py) ou a API")
+        sys.exit(1)
+
     app = InterfaceRenomerIA()
     app.executar()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Linha de Comando (sem interface gráfica)
+Executa os mesmos motores das interfaces e grava um JSON por arquivo em stdout
+(NDJSON) à medida que cada um é concluído; logs vão para stderr
+
+Uso:
+    python -m src.cli organize ORIGEM DESTINO [--motor local|ia] [--simular]
+    python -m src.cli analyze CAMINHO... [--motor local|ia]
+    python -m src.cli rename CAMINHO... [--aplicar]
+
+Cada linha tem 'tipo': 'arquivo' (um resultado) ou 'resumo' (a última linha).
+
+Códigos de saída:
+    0  todos os arquivos processados
+    1  um ou mais arquivos com erro
+    2  uso incorreto (argumentos inválidos)
+    3  falha geral (pasta inexistente, IA indisponível, ...)
+    4  execução parcial (cota diária da API esgotada ou interrompida)
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+
+# Adiciona a raiz do projeto e os diretórios utils, core e config ao path
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'utils'))
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'core'))
+sys.path.insert(0, os.path.join(RAIZ, 'config'))
+import config
+from descoberta import descobrir_arquivos, EXTENSOES_EXTRATOS
+from pool_requisicoes import executar_em_paralelo, LimiteDiarioExcedido
+from banco_execucoes import BancoExecucoes
+from organizador_local_avancado import OrganizadorLocalAvancado
+
+SAIDA_OK = 0
+SAIDA_ERROS = 1
+SAIDA_USO = 2
+SAIDA_FALHA = 3
+SAIDA_PARCIAL = 4
+
+logger = logging.getLogger('renomer.cli')
+
+
+class ErroCLI(Exception):
+    """Falha que encerra a execução com uma mensagem e um código de saída"""
+
+    def __init__(self, mensagem, codigo=SAIDA_FALHA):
+        super().__init__(mensagem)
+        self.codigo = codigo
+
+
+def emitir(tipo, dados):
+    """Grava uma linha NDJSON em stdout (descarregada na hora, para uso em pipes)"""
+    linha = json.dumps(dict(dados, tipo=tipo), ensure_ascii=False, default=str)
+    sys.stdout.write(linha + '\n')
+    sys.stdout.flush()
+
+
+def codigo_saida(resumo):
+    """Código de saída a partir do resumo da execução"""
+    if resumo.get('cancelado') or resumo.get('limite_diario'):
+        return SAIDA_PARCIAL
+    return SAIDA_ERROS if resumo.get('erros') else SAIDA_OK
+
+
+def configurar_logging(verboso):
+    """Logs em stderr; sem -v, apenas avisos e erros"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO if verboso else logging.WARNING)
+    logger.propagate = False
+
+
+def silenciar_console(organizador, verboso):
+    """O OrganizadorLocalAvancado registra cada arquivo no console; mantém só o arquivo de log"""
+    if verboso:
+        return
+    for handler in organizador.logger.handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setLevel(logging.WARNING)
+
+
+def listar_arquivos(caminhos, extensoes, recursivo):
+    """Arquivos passados diretamente e os encontrados nas pastas passadas"""
+    for caminho in caminhos:
+        caminho = Path(caminho)
+        if caminho.is_dir():
+            for entrada in descobrir_arquivos(caminho, extensoes, recursivo=recursivo):
+                yield Path(entrada.path)
+        elif caminho.is_file():
+            yield caminho
+        else:
+            raise ErroCLI(f"Caminho não encontrado: {caminho}")
+
+
+def obter_api_key(args):
+    """--api-key, variável GEMINI_API_KEY ou config.GEMINI_API_KEY"""
+    return args.api_key or os.environ.get('GEMINI_API_KEY') or getattr(config, 'GEMINI_API_KEY', None)
+
+
+def criar_renomer(args, exigir_ia):
+    """RenomerIA configurado pela linha de comando (importado sob demanda: depende de PyPDF2/Gemini)"""
+    from renomer_ia_v4 import RenomerIA
+    from cache_ia import CacheIA
+
+    cache = None
+    if getattr(config, 'GEMINI_CACHE_ENABLED', False):
+        cache = CacheIA(config.GEMINI_CACHE_ARQUIVO, config.GEMINI_CACHE_MAX_MB)
+
+    renomer = RenomerIA(obter_api_key(args), args.delay, max_workers=args.workers, cache=cache,
+                        tamanho_lote=getattr(args, 'lote', 1))
+    if exigir_ia and not renomer.model:
+        raise ErroCLI("IA não configurada: informe --api-key ou GEMINI_API_KEY (e instale google-generativeai)")
+    return renomer
+
+
+def abrir_banco(args):
+    """Histórico SQLite, se pedido por --banco ou ativo em config.py"""
+    if args.banco or getattr(config, 'BANCO_EXECUCOES_ATIVO', False):
+        return BancoExecucoes(args.banco or config.BANCO_EXECUCOES_ARQUIVO)
+    return None
+
+
+def transmitir(execucao, interromper=None):
+    """Emite cada resultado do gerador e retorna o resumo (valor de retorno do gerador)
+
+    Em Ctrl+C, interromper() pede o cancelamento ao motor e o gerador é fechado.
+    """
+    try:
+        while True:
+            try:
+                resultado = next(execucao)
+            except StopIteration as fim:
+                return fim.value
+            emitir('arquivo', resultado)
+    except KeyboardInterrupt:
+        if interromper:
+            interromper()
+        execucao.close()
+        return {'cancelado': True}
+
+
+def comando_organize(args):
+    """Organiza a pasta de origem (cópias para o destino)"""
+    banco = abrir_banco(args)
+    try:
+        if args.motor == 'ia':
+            if args.simular:
+                raise ErroCLI("--simular não é suportado com --motor ia", SAIDA_USO)
+            if not Path(args.origem).is_dir():
+                raise ErroCLI(f"Pasta de origem não existe: {args.origem}")
+            renomer = criar_renomer(args, exigir_ia=True)
+            resumo = transmitir(renomer.organizar_extratos_iter(
+                args.origem, args.destino, not args.nao_recursivo, args.retomar,
+                banco_execucoes=banco, incremental=args.incremental, completo=args.completo),
+                renomer.cancelar)
+            if 'erro' in resumo:
+                raise ErroCLI(resumo['erro'])
+        else:
+            try:
+                organizador = OrganizadorLocalAvancado(args.origem, args.destino)
+            except (ValueError, OSError) as e:
+                raise ErroCLI(str(e))
+            silenciar_console(organizador, args.verboso)
+            resumo = transmitir(organizador.organizar_arquivos_iter(
+                args.simular, args.workers, args.retomar, banco, args.processos,
+                args.incremental, args.completo))
+            resumo['total'] = resumo.get('total_arquivos', 0)
+            resumo['processados'] = resumo.get('processados_com_sucesso', 0)
+    finally:
+        if banco:
+            banco.fechar()
+    return resumo
+
+
+def comando_analyze(args):
+    """Detecta conta, mês e ano sem copiar nem renomear"""
+    arquivos = listar_arquivos(args.caminhos, EXTENSOES_EXTRATOS, not args.nao_recursivo)
+
+    if args.motor == 'ia':
+        renomer = criar_renomer(args, exigir_ia=False)
+        renomer.preparar_deteccao_local()
+        analisar = renomer.processar_arquivo_extrato
+        cancelado = lambda: renomer.cancelado
+        campo_caminho = 'caminho_original'
+    else:
+        detector = OrganizadorLocalAvancado.somente_deteccao(logger)
+        analisar = detector.analisar_arquivo
+        cancelado = None
+        campo_caminho = 'arquivo_original'
+
+    def analisados():
+        total = processados = erros = 0
+        limite_diario = False
+        for arquivo, resultado, erro in executar_em_paralelo(analisar, arquivos, args.workers, cancelado):
+            total += 1
+            if erro is None and resultado.get('erro'):
+                erro = resultado['erro']
+            if isinstance(erro, LimiteDiarioExcedido):
+                limite_diario = True
+                renomer.cancelar()
+            if erro:
+                erros += 1
+                yield {campo_caminho: str(arquivo), 'sucesso': False, 'erro': str(erro)}
+                continue
+            processados += 1
+            # Mesmo campo de caminho dos registros do organize com o motor escolhido
+            yield dict(resultado, **{campo_caminho: str(arquivo)}, sucesso=True)
+        return {'total': total, 'processados': processados, 'erros': erros,
+                'limite_diario': limite_diario,
+                'estagios': renomer.obter_estatisticas_estagios() if args.motor == 'ia' else None}
+
+    return transmitir(analisados(), renomer.cancelar if args.motor == 'ia' else None)
+
+
+def comando_rename(args):
+    """Sugere nomes para PDFs genéricos com a IA; --aplicar renomeia no local"""
+    arquivos = list(listar_arquivos(args.caminhos, ('.pdf',), not args.nao_recursivo))
+    if not arquivos:
+        raise ErroCLI("Nenhum PDF encontrado")
+
+    renomer = criar_renomer(args, exigir_ia=True)
+
+    def renomeados():
+        execucao = renomer.renomear_genericos_iter(arquivos)
+        erros_aplicacao = 0
+        while True:
+            try:
+                item = next(execucao)
+            except StopIteration as fim:
+                resumo = fim.value
+                break
+            if args.aplicar and item['status'] == 'PREVIEW':
+                aplicado = renomer.aplicar_renomeacao_item(item)
+                if aplicado['status'] == 'OK':
+                    item = dict(item, status='OK', novo=aplicado['novo'])
+                else:
+                    item = dict(item, status='ERRO', erro=aplicado['erro'])
+                    erros_aplicacao += 1
+            yield item
+
+        resumo['processados'] -= erros_aplicacao
+        resumo['erros'] += erros_aplicacao
+        return resumo
+
+    return transmitir(renomeados(), renomer.cancelar)
+
+
+def criar_parser():
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument('-v', '--verboso', action='store_true', help="Registra cada arquivo em stderr")
+    comum.add_argument('--workers', type=int, default=4, help="Arquivos processados em paralelo")
+    comum.add_argument('--sem-subpastas', dest='nao_recursivo', action='store_true',
+                       help="Não desce em subpastas")
+    comum.add_argument('--api-key', help="Chave do Gemini (padrão: GEMINI_API_KEY ou config.py)")
+    comum.add_argument('--delay', type=float, default=1.0, help="Intervalo médio entre requisições à IA (s)")
+
+    parser = argparse.ArgumentParser(prog='python -m src.cli',
+                                     description="Organizador de extratos sem interface gráfica (saída NDJSON)")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    organize = comandos.add_parser('organize', parents=[comum], help="Copia os extratos para o destino organizado")
+    organize.add_argument('origem')
+    organize.add_argument('destino')
+    organize.add_argument('--motor', choices=['local', 'ia'], default='local',
+                          help="local: regras (CONTA/ANO_MES); ia: cascata local → cache → Gemini (ANO/MES)")
+    organize.add_argument('--simular', action='store_true', help="Não copia arquivos (apenas --motor local)")
+    organize.add_argument('--retomar', action='store_true', help="Ignora arquivos já processados")
+    organize.add_argument('--incremental', action='store_true', help="Apenas arquivos novos desde a última execução")
+    organize.add_argument('--completo', action='store_true', help="Com --incremental, refaz o snapshot do zero")
+    organize.add_argument('--processos', action='store_true', help="Detecção local em processos")
+    organize.add_argument('--lote', type=int, default=1, help="Extratos por requisição à IA")
+    organize.add_argument('--banco', help="Banco SQLite de execuções (padrão: config.py)")
+    organize.set_defaults(executar=comando_organize)
+
+    analyze = comandos.add_parser('analyze', parents=[comum], help="Detecta conta e data sem copiar")
+    analyze.add_argument('caminhos', nargs='+', help="Arquivos ou pastas")
+    analyze.add_argument('--motor', choices=['local', 'ia'], default='local')
+    analyze.set_defaults(executar=comando_analyze)
+
+    rename = comandos.add_parser('rename', parents=[comum], help="Sugere nomes para PDFs genéricos (IA)")
+    rename.add_argument('caminhos', nargs='+', help="PDFs ou pastas")
+    rename.add_argument('--aplicar', action='store_true', help="Renomeia no local (sem isso, apenas prévia)")
+    rename.set_defaults(executar=comando_rename)
+
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    configurar_logging(args.verboso)
+
+    if args.workers < 1:
+        logger.error("--workers deve ser maior que zero")
+        return SAIDA_USO
+
+    try:
+        resumo = args.executar(args)
+    except ErroCLI as e:
+        logger.error(str(e))
+        return e.codigo
+    except BrokenPipeError:
+        # Leitor do pipe encerrou (ex.: head); evita novo erro ao fechar stdout
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return SAIDA_PARCIAL
+    except Exception as e:
+        logger.exception(f"Falha: {e}")
+        return SAIDA_FALHA
+
+    try:
+        emitir('resumo', resumo)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return SAIDA_PARCIAL
+    return codigo_saida(resumo)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
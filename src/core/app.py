@@ -6,7 +6,7 @@ Exposes the organizer functionality as REST API endpoints
 Enhanced with security, validation, and async processing
 """
 
-from flask import Flask, request, jsonify, send_file, g
+from flask import Flask, Request, Response, request, jsonify, send_file, g, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from functools import wraps
@@ -16,19 +16,36 @@ import json
 import tempfile
 import logging
 import hashlib
+import re
+import gzip
 import secrets
+import shutil
+import math
 import time
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
 from logging.handlers import RotatingFileHandler
 
+try:
+    import brotli  # opcional: Content-Encoding br
+except ImportError:
+    brotli = None
+
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Add utils directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utils'))
 from relatorio_manager import relatorio_manager
+from banco_execucoes import BancoExecucoes
+from organizador_local_avancado import OrganizadorLocalAvancado
+from fila_jobs import RepositorioJobs, FilaJobs, FilaCheia, PENDENTE, ATIVOS
+from pool_requisicoes import consumir
+from limite_requisicoes import LimitadorJanelaDeslizante, BackendMemoria, BackendSQLite
+from regras_deteccao import CACHE_DETECCAO, CACHE_DETECCAO_MAX, MOTOR_LOCAL
 
 # Import config
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'config'))
@@ -41,6 +58,10 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max
 app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'ofx'}
+app.config['ANALYZE_BATCH_MAX'] = 5000  # nomes por requisição em /api/analyze/batch
+app.config['ANALYZE_BATCH_UNIT'] = 100  # nomes por unidade de rate limit
+app.config['COMPRESS_MIN_SIZE'] = 1024  # respostas menores não são comprimidas
+app.config['COMPRESS_MIMETYPES'] = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain'}
 
 # CORS com restrições
 CORS(app, resources={
@@ -81,38 +102,38 @@ setup_logging()
 # RATE LIMITING
 # ===========================================
 class RateLimiter:
-    """Simple in-memory rate limiter"""
-    def __init__(self):
-        self.requests = {}  # {ip: [(timestamp, count)]}
-        self.window = 60  # 1 minuto
-        self.max_requests = 60  # 60 requests por minuto
-
-    def is_allowed(self, identifier: str) -> Tuple[bool, Optional[str]]:
-        """Verifica se request é permitido"""
-        now = time.time()
-
-        # Limpa requests antigos
-        if identifier in self.requests:
-            self.requests[identifier] = [
-                (ts, count) for ts, count in self.requests[identifier]
-                if now - ts < self.window
-            ]
-
-        # Conta requests no window
-        request_count = sum(count for _, count in self.requests.get(identifier, []))
-
-        if request_count >= self.max_requests:
-            retry_after = int(self.window - (now - self.requests[identifier][0][0]))
-            return False, f"Rate limit exceeded. Retry after {retry_after} seconds"
-
-        # Adiciona request atual
-        if identifier not in self.requests:
-            self.requests[identifier] = []
-        self.requests[identifier].append((now, 1))
-
-        return True, None
-
-rate_limiter = RateLimiter()
+    """Sliding-window counter rate limiter (O(1) per request, idle keys evicted in background)
+
+    backend: 'memoria' (per process) or 'sqlite' (shared by all workers on the host)
+    """
+    def __init__(self, backend: str = 'memoria', window: int = 60, max_requests: int = 60,
+                 db_path: Optional[str] = None):
+        self.window = window  # segundos
+        self.max_requests = max_requests  # requests por janela
+
+        if backend == 'sqlite':
+            store = BackendSQLite(db_path or os.path.join('dados', 'rate_limit.db'))
+        else:
+            store = BackendMemoria()
+        self.limiter = LimitadorJanelaDeslizante(store, max_requests, window)
+
+    def is_allowed(self, identifier: str, cost: int = 1) -> Tuple[bool, Optional[str]]:
+        """Verifica se request é permitido (cost: unidades consumidas pelo request)"""
+        allowed, retry_after = self.limiter.permitir(identifier, cost)
+        if allowed:
+            return True, None
+        if retry_after is None:
+            return False, f"Request cost ({cost}) exceeds the limit of {self.max_requests} per minute"
+        return False, f"Rate limit exceeded. Retry after {math.ceil(retry_after)} seconds"
+
+    def get_stats(self) -> Dict:
+        return self.limiter.obter_estatisticas()
+
+rate_limiter = RateLimiter(
+    getattr(config, 'API_RATE_LIMIT_BACKEND', 'memoria'),
+    max_requests=getattr(config, 'API_RATE_LIMIT_POR_MINUTO', 60),
+    db_path=getattr(config, 'API_RATE_LIMIT_ARQUIVO', None)
+)
 
 # ===========================================
 # AUTHENTICATION
@@ -153,13 +174,20 @@ def require_api_key(f):
 
     return decorated_function
 
-def rate_limit(f):
-    """Decorator para rate limiting"""
+def rate_limit(f=None, cost: Optional[Callable[[], int]] = None):
+    """Decorator para rate limiting
+
+    cost: função opcional que calcula (no contexto do request) quantas unidades
+    o request consome; padrão 1. Uso: @rate_limit ou @rate_limit(cost=...)
+    """
+    if f is None:
+        return lambda func: rate_limit(func, cost)
+
     @wraps(f)
     def decorated_function(*args, **kwargs):
         identifier = request.remote_addr
 
-        allowed, message = rate_limiter.is_allowed(identifier)
+        allowed, message = rate_limiter.is_allowed(identifier, cost() if cost else 1)
 
         if not allowed:
             app.logger.warning(f"Rate limit excedido para {identifier}")
@@ -182,9 +210,37 @@ def before_request():
     g.request_id = secrets.token_hex(8)
     g.start_time = time.time()
 
+def compress_response(response):
+    """Comprime a resposta com brotli ou gzip conforme o Accept-Encoding do cliente
+
+    Respostas em streaming (SSE, NDJSON gerado sob demanda) e arquivos não são
+    comprimidas: seriam lidas inteiras para a memória.
+    """
+    if (response.direct_passthrough or response.is_streamed or
+            response.status_code < 200 or response.status_code in (204, 304) or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    encodings = request.accept_encodings
+    if brotli is not None and encodings['br']:
+        response.set_data(brotli.compress(data, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif encodings['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
 @app.after_request
 def after_request(response):
-    """Log de request e adiciona headers"""
+    """Log de request, compressão e headers"""
+    response = compress_response(response)
+
     if hasattr(g, 'request_id'):
         response.headers['X-Request-ID'] = g.request_id
 
@@ -216,35 +272,219 @@ def validate_directory(path: str) -> Tuple[bool, Optional[str]]:
 
     return True, normalized
 
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Projeção 'fields=a,b' (nomes de chave simples); None se ausente"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    invalid = [field for field in fields if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', field)]
+    if invalid:
+        raise ValueError(f"Invalid fields: {', '.join(invalid)}")
+    return fields or None
+
 def allowed_file(filename: str) -> bool:
     """Verifica se extensão de arquivo é permitida"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+class HashingUploadFile:
+    """Arquivo temporário que calcula o SHA-256 da parte enquanto o upload é gravado"""
+
+    def __init__(self, directory: Path):
+        self.file = tempfile.NamedTemporaryFile(dir=str(directory), prefix='.upload_', delete=False)
+        self.path = Path(self.file.name)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+class UploadRequest(Request):
+    """Grava as partes de arquivo direto na pasta do upload (g.upload_dir), já com hash"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        directory = getattr(g, 'upload_dir', None)
+        if directory is None or not filename or not allowed_file(filename):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return HashingUploadFile(directory)
+
+app.request_class = UploadRequest
+
+def parse_bool(value, default: bool = False) -> bool:
+    """Interpreta flags de query string/formulário ('1', 'true', 'yes')"""
+    if value is None:
+        return default
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
 # ===========================================
 # GLOBAL ORGANIZER
 # ===========================================
-organizer_cache = {}
+class OrganizerPool:
+    """Organizadores por par origem:destino, limitado por tamanho (LRU) e tempo sem uso (TTL)"""
+
+    def __init__(self, max_size: int = 32, ttl: float = 1800):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._items = OrderedDict()  # chave -> (organizador, último uso)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    def get(self, key: str, create: Callable):
+        """Retorna o organizador da chave, criando-o (fora do lock) se necessário"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            item = self._items.get(key)
+            if item is not None:
+                self._items[key] = (item[0], now)
+                self._items.move_to_end(key)
+                self.stats['hits'] += 1
+                return item[0]
+            self.stats['misses'] += 1
+
+        organizer = create()
+
+        with self._lock:
+            # Outra thread pode ter criado o mesmo organizador enquanto isso
+            item = self._items.get(key)
+            if item is not None:
+                organizer = item[0]
+            self._items[key] = (organizer, now)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.stats['evictions'] += 1
+        return organizer
+
+    def _expire(self, now: float):
+        """Remove organizadores sem uso há mais de ttl (mais antigos primeiro)"""
+        while self._items:
+            key, (_, last_used) = next(iter(self._items.items()))
+            if now - last_used < self.ttl:
+                break
+            del self._items[key]
+            self.stats['expired'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return dict(self.stats, size=len(self._items), max_size=self.max_size, ttl=self.ttl)
+
+organizer_pool = OrganizerPool(
+    getattr(config, 'API_ORGANIZADORES_MAX', 32),
+    getattr(config, 'API_ORGANIZADORES_TTL_S', 1800)
+)
+CACHE_DETECCAO.redimensionar(getattr(config, 'CACHE_DETECCAO_MAX', CACHE_DETECCAO_MAX))
 
 def get_organizer(source_dir: str = None, dest_dir: str = None):
-    """Get or create organizer instance with caching"""
+    """Get or create organizer instance from the bounded pool"""
     try:
-        from organizador_local_avancado import OrganizadorLocalAvancado
-
         source = source_dir or config.DIRETORIO_BASE_PADRAO
         dest = dest_dir or config.DIRETORIO_DESTINO_PADRAO
 
         cache_key = f"{source}:{dest}"
 
-        if cache_key not in organizer_cache:
-            organizer_cache[cache_key] = OrganizadorLocalAvancado(source, dest)
-
-        return organizer_cache[cache_key]
+        return organizer_pool.get(cache_key, lambda: OrganizadorLocalAvancado(source, dest))
 
     except Exception as e:
         app.logger.error(f"Erro ao criar organizador: {str(e)}", exc_info=True)
         raise
 
+_detector = None
+
+def get_detector():
+    """Detector compartilhado para análise de nomes (não depende das pastas configuradas)"""
+    global _detector
+    if _detector is None:
+        _detector = OrganizadorLocalAvancado.somente_deteccao(app.logger)
+    return _detector
+
+_banco = None
+_lock_banco = threading.Lock()
+
+def get_banco() -> BancoExecucoes:
+    """Histórico de arquivos organizados (índice de hashes usado para rejeitar uploads duplicados)"""
+    global _banco
+    with _lock_banco:
+        if _banco is None:
+            _banco = BancoExecucoes(config.BANCO_EXECUCOES_ARQUIVO)
+        return _banco
+
+# ===========================================
+# BACKGROUND JOBS
+# ===========================================
+def organizar_em_job(job, org, **opcoes) -> Dict:
+    """Consome organizar_arquivos_iter registrando o resultado de cada arquivo no job
+
+    O organizador pode ser o do pool, compartilhado com outros jobs: o total e as
+    stats vêm da própria execução, não da instância
+    """
+    def registrar(resultado):
+        job.registrar(resultado['arquivo_original'], resultado, resultado['sucesso'])
+
+    # Em uma retomada, arquivos já registrados no job não são reprocessados
+    return consumir(org.organizar_arquivos_iter(
+        ignorar=job.ja_processado if job.retomado else None,
+        ao_definir_total=job.definir_total,
+        **opcoes
+    ), registrar)
+
+def executar_organizacao(job):
+    """Executa um job de organização, registrando o resultado de cada arquivo"""
+    parametros = job.parametros
+    org = get_organizer(parametros['source_directory'], parametros['destination_directory'])
+    relatorio = organizar_em_job(job, org, modo_teste=parametros['test_mode'])
+
+    app.logger.info(
+        f"Job {job.id} concluído - Sucessos: {relatorio['processados_com_sucesso']}, "
+        f"Erros: {relatorio['erros']}",
+        extra={'request_id': job.id}
+    )
+    return relatorio
+
+def executar_upload(job):
+    """Classifica e move os arquivos de um upload para o destino (hashes já calculados no upload)"""
+    parametros = job.parametros
+    upload_dir = Path(parametros['upload_directory'])
+    test_mode = parametros['test_mode']
+
+    # Organizador próprio: a pasta do upload é única e não deve ocupar o pool
+    org = OrganizadorLocalAvancado(str(upload_dir), parametros['destination_directory'])
+    relatorio = organizar_em_job(
+        job, org,
+        modo_teste=test_mode,
+        banco_execucoes=None if test_mode else get_banco(),
+        mover=True,
+        hashes=parametros['hashes']
+    )
+
+    if test_mode:
+        # Em modo teste nada é movido: sem limpeza a pasta do upload ficaria órfã
+        shutil.rmtree(upload_dir, ignore_errors=True)
+    elif not any(upload_dir.iterdir()):
+        # Arquivos com erro continuam na pasta do upload para inspeção
+        upload_dir.rmdir()
+
+    app.logger.info(
+        f"Job {job.id} (upload) concluído - Sucessos: {relatorio['processados_com_sucesso']}, "
+        f"Erros: {relatorio['erros']}",
+        extra={'request_id': job.id}
+    )
+    return relatorio
+
+fila_jobs = FilaJobs(
+    RepositorioJobs(getattr(config, 'JOBS_BANCO_ARQUIVO', os.path.join('dados', 'renomer_jobs.db'))),
+    {'organize': executar_organizacao, 'upload': executar_upload},
+    max_simultaneos=getattr(config, 'JOBS_MAX_SIMULTANEOS', 2),
+    max_pendentes=getattr(config, 'JOBS_MAX_PENDENTES', 50),
+    validade_s=getattr(config, 'JOBS_VALIDADE_S', 60)
+)
+
 # ===========================================
 # API ENDPOINTS
 # ===========================================
@@ -261,21 +501,26 @@ def home():
         "endpoints": {
             "health": "GET /api/health",
             "organize": "POST /api/organize",
-            "upload": "POST /api/upload",
+            "upload": "POST /api/upload (?organize=true: dedupe by hash + background job)",
             "analyze": "POST /api/analyze",
+            "analyze_batch": "POST /api/analyze/batch",
             "config": "GET/PUT /api/config",
             "report": "POST /api/report",
-            "jobs": "GET /api/jobs/<job_id>"
+            "jobs": "GET /api/jobs/<job_id>",
+            "job_events": "GET /api/jobs/<job_id>/events (SSE)"
         },
         "authentication": "Required: X-API-Key header",
-        "rate_limit": "60 requests per minute"
+        "rate_limit": f"{rate_limiter.max_requests} requests per minute"
     })
 
 @app.route('/api/health', methods=['GET'])
 @rate_limit
 def health():
     """Health check endpoint"""
-    import psutil
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
 
     return jsonify({
         "status": "healthy",
@@ -284,16 +529,22 @@ def health():
         "version": "2.0.0",
         "uptime": time.time() - app.config.get('START_TIME', time.time()),
         "system": {
-            "cpu_percent": psutil.cpu_percent() if 'psutil' in sys.modules else None,
-            "memory_percent": psutil.virtual_memory().percent if 'psutil' in sys.modules else None
-        }
+            "cpu_percent": psutil.cpu_percent() if psutil else None,
+            "memory_percent": psutil.virtual_memory().percent if psutil else None
+        },
+        "cache": {
+            "organizers": organizer_pool.get_stats(),
+            "detection": CACHE_DETECCAO.obter_estatisticas(),
+            "detection_folders": MOTOR_LOCAL.pistas_pastas.obter_estatisticas()
+        },
+        "rate_limit": rate_limiter.get_stats()
     })
 
 @app.route('/api/organize', methods=['POST'])
 @require_api_key
 @rate_limit
 def organize_files():
-    """Organize bank statement files with enhanced security"""
+    """Organize bank statement files in a background job (202 + job id)"""
     try:
         data = request.get_json() or {}
 
@@ -317,36 +568,43 @@ def organize_files():
                 "error": f"Invalid destination directory: {msg}"
             }), 400
 
-        # Log da operação
-        app.logger.info(
-            f"Iniciando organização - Source: {source_dir}, Dest: {dest_dir}, Test: {test_mode}",
-            extra={'request_id': g.request_id}
-        )
-
-        # Cria organizador
-        org = get_organizer(source_dir, dest_dir)
+        # Valida as pastas agora; a organização roda em segundo plano
+        get_organizer(source_dir, dest_dir)
 
-        # Executa organização
-        resultado = org.organizar_arquivos(modo_teste=test_mode)
+        job_id = fila_jobs.enviar('organize', {
+            'source_directory': source_dir,
+            'destination_directory': dest_dir,
+            'test_mode': bool(test_mode)
+        })
 
         app.logger.info(
-            f"Organização concluída - Sucessos: {resultado.get('processados_com_sucesso', 0)}, "
-            f"Erros: {resultado.get('erros', 0)}",
+            f"Job {job_id} enfileirado - Source: {source_dir}, Dest: {dest_dir}, Test: {test_mode}",
             extra={'request_id': g.request_id}
         )
 
-        return jsonify({
+        response = jsonify({
             "success": True,
             "request_id": g.request_id,
-            "total_arquivos": resultado.get('total_arquivos', 0),
-            "processados_com_sucesso": resultado.get('processados_com_sucesso', 0),
-            "erros": resultado.get('erros', 0),
-            "detalhes": resultado.get('detalhes', []),
-            "test_mode": test_mode,
+            "job_id": job_id,
+            "status": PENDENTE,
+            "status_url": f"/api/jobs/{job_id}",
+            "test_mode": bool(test_mode),
             "timestamp": datetime.now().isoformat()
         })
+        response.headers['Location'] = f"/api/jobs/{job_id}"
+        return response, 202
 
-    except ValueError as e:
+    except FilaCheia:
+        app.logger.warning("Fila de jobs cheia", extra={'request_id': g.request_id})
+        response = jsonify({
+            "success": False,
+            "error": "Job queue full",
+            "message": "Too many pending jobs. Try again later",
+            "request_id": g.request_id
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    except (ValueError, OSError) as e:
         app.logger.error(f"Erro de validação: {str(e)}", extra={'request_id': g.request_id})
         return jsonify({
             "success": False,
@@ -362,24 +620,196 @@ def organize_files():
             "request_id": g.request_id
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_api_key
+@rate_limit
+def get_job(job_id):
+    """Job status: progress counters, partial results and final summary
+
+    Results are paginated by cursor (pass next_cursor back as ?cursor=) or by
+    offset/limit; fields=arquivo_destino,sucesso returns only those keys.
+    """
+    try:
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(500, max(0, request.args.get('limit', 100, type=int)))
+        cursor = request.args.get('cursor', type=int)
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "request_id": g.request_id
+            }), 400
+
+        job = fila_jobs.obter(job_id, offset, limit, apos=cursor, campos=fields)
+        if job is None:
+            return jsonify({
+                "success": False,
+                "error": "Job not found",
+                "request_id": g.request_id
+            }), 404
+
+        return jsonify({
+            "success": True,
+            "request_id": g.request_id,
+            "job_id": job['id'],
+            "type": job['tipo'],
+            "status": job['estado'],
+            "progress": {
+                "total": job['total'],
+                "processados": job['processados'],
+                "sucessos": job['sucessos'],
+                "erros": job['erros']
+            },
+            "results": job['resultados'],
+            "results_offset": offset if cursor is None else None,
+            "next_cursor": job['cursor'],
+            "summary": job['resumo'],
+            "error": job['erro'],
+            "attempts": job['tentativas'],
+            "created_at": job['criado_em'],
+            "started_at": job['iniciado_em'],
+            "finished_at": job['concluido_em']
+        })
+
+    except Exception as e:
+        app.logger.error(f"Erro ao obter job: {str(e)}", exc_info=True, extra={'request_id': g.request_id})
+        return jsonify({
+            "success": False,
+            "error": "Internal server error",
+            "message": str(e) if app.debug else "An error occurred",
+            "request_id": g.request_id
+        }), 500
+
+def sse_event(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    """Formata um evento Server-Sent Events"""
+    linhas = [f"id: {event_id}"] if event_id is not None else []
+    linhas.append(f"event: {event}")
+    linhas.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(linhas) + "\n\n"
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@require_api_key
+@rate_limit
+def job_events(job_id):
+    """Stream job progress as SSE: 'progress' + 'result' per file, then 'done'
+
+    The id of each 'result' event is the result position in the store; reconnecting
+    with Last-Event-ID (header or last_event_id query) resumes after it.
+    """
+    if fila_jobs.obter(job_id, limite=0) is None:
+        return jsonify({
+            "success": False,
+            "error": "Job not found",
+            "request_id": g.request_id
+        }), 404
+
+    ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        ultimo_id = max(0, int(ultimo_id))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "Invalid Last-Event-ID",
+            "request_id": g.request_id
+        }), 400
+
+    repositorio = fila_jobs.repositorio
+    intervalo = 0.5
+    keepalive_s = 15
+
+    def gerar():
+        atual_id = ultimo_id
+        posicao = repositorio.posicao(job_id, atual_id) if atual_id else 0
+        ocioso = 0.0
+        yield "retry: 3000\n\n"
+
+        while True:
+            # Estado lido antes dos resultados: ao finalizar, todos já estão gravados
+            job = repositorio.obter(job_id, limite=0)
+            resultados = repositorio.resultados_desde(job_id, atual_id)
+
+            for atual_id, resultado in resultados:
+                posicao += 1
+                # Mesmos campos da tupla ('progress', idx, total, nome) da interface
+                yield sse_event('progress', {
+                    "atual": posicao,
+                    "total": max(posicao, job['total']),
+                    "arquivo": resultado.get('nome_original') or resultado.get('original')
+                })
+                yield sse_event('result', resultado, atual_id)
+
+            if resultados:
+                ocioso = 0.0
+                continue
+
+            if job['estado'] not in ATIVOS:
+                yield sse_event('done', {
+                    "status": job['estado'],
+                    "progress": {
+                        "total": job['total'],
+                        "processados": job['processados'],
+                        "sucessos": job['sucessos'],
+                        "erros": job['erros']
+                    },
+                    "summary": job['resumo'],
+                    "error": job['erro']
+                })
+                return
+
+            ocioso += intervalo
+            if ocioso >= keepalive_s:
+                ocioso = 0.0
+                yield ": keepalive\n\n"
+            time.sleep(intervalo)
+
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/upload', methods=['POST'])
 @require_api_key
 @rate_limit
 def upload_file():
-    """Upload bank statement files for processing"""
+    """Upload bank statement files for processing
+
+    Each file part is streamed to disk while its SHA-256 is computed. With
+    organize=true (query or form), files already in the archive (same hash) are
+    rejected and the rest are classified and moved to destination_directory in a
+    background job (202 + job id); test_mode defaults to true.
+    """
+    upload_dir = Path(app.config['UPLOAD_FOLDER']) / 'renomer_uploads' / g.request_id
     try:
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        # Deve ser definido antes do primeiro acesso a request.files/form
+        g.upload_dir = upload_dir
+
+        organize = parse_bool(request.values.get('organize'))
+        test_mode = parse_bool(request.values.get('test_mode'), default=True)
+        dest_dir = request.values.get('destination_directory', config.DIRETORIO_DESTINO_PADRAO)
+
         if 'files' not in request.files:
             return jsonify({
                 "success": False,
                 "error": "No files provided"
             }), 400
 
+        if organize:
+            valid_dest, msg = validate_directory(dest_dir)
+            if not valid_dest:
+                return jsonify({
+                    "success": False,
+                    "error": f"Invalid destination directory: {msg}"
+                }), 400
+
         files = request.files.getlist('files')
         uploaded_files = []
+        duplicates = []
         errors = []
-
-        upload_dir = Path(app.config['UPLOAD_FOLDER']) / 'renomer_uploads' / g.request_id
-        upload_dir.mkdir(parents=True, exist_ok=True)
+        hashes = {}
+        banco = get_banco() if organize else None
 
         for file in files:
             if file.filename == '':
@@ -395,29 +825,43 @@ def upload_file():
 
             # Secure filename
             filename = secure_filename(file.filename)
-            filepath = upload_dir / filename
+            stream = file.stream
 
             try:
-                file.save(str(filepath))
-
-                # Verifica tamanho
-                size = filepath.stat().st_size
-                if size > app.config['MAX_CONTENT_LENGTH']:
-                    filepath.unlink()
-                    errors.append({
-                        "filename": filename,
-                        "error": "File too large"
-                    })
-                    continue
-
+                # Parte já gravada e com hash calculado durante o parsing
+                stream.close()
+                content_hash = stream.sha256.hexdigest()
+                size = stream.size
+
+                if organize:
+                    existing = hashes.get(content_hash) or banco.hash_existente(content_hash)
+                    if existing:
+                        stream.path.unlink()
+                        duplicates.append({
+                            "filename": filename,
+                            "sha256": content_hash,
+                            "existing": str(existing)
+                        })
+                        continue
+
+                # Nome único na pasta do upload (renomeação, sem copiar o conteúdo)
+                filepath = upload_dir / filename
+                counter = 1
+                while filepath.exists():
+                    filepath = upload_dir / f"{Path(filename).stem}_{counter}{Path(filename).suffix}"
+                    counter += 1
+                os.replace(stream.path, filepath)
+
+                hashes[content_hash] = str(filepath)
                 uploaded_files.append({
-                    "filename": filename,
+                    "filename": filepath.name,
                     "size": size,
+                    "sha256": content_hash,
                     "path": str(filepath)
                 })
 
                 app.logger.info(
-                    f"Arquivo uploaded: {filename} ({size} bytes)",
+                    f"Arquivo uploaded: {filepath.name} ({size} bytes)",
                     extra={'request_id': g.request_id}
                 )
 
@@ -427,16 +871,55 @@ def upload_file():
                     "error": str(e)
                 })
 
-        return jsonify({
+        response = {
             "success": True,
             "request_id": g.request_id,
             "uploaded": len(uploaded_files),
+            "duplicates": len(duplicates),
             "errors": len(errors),
             "files": uploaded_files,
+            "duplicate_details": duplicates if duplicates else None,
             "error_details": errors if errors else None,
             "upload_directory": str(upload_dir)
+        }
+
+        if not organize or not uploaded_files:
+            return jsonify(response)
+
+        job_id = fila_jobs.enviar('upload', {
+            'upload_directory': str(upload_dir),
+            'destination_directory': dest_dir,
+            'test_mode': test_mode,
+            'hashes': {path: content_hash for content_hash, path in hashes.items()}
         })
 
+        app.logger.info(
+            f"Job {job_id} (upload) enfileirado - {len(uploaded_files)} arquivos, Dest: {dest_dir}, "
+            f"Test: {test_mode}",
+            extra={'request_id': g.request_id}
+        )
+
+        response.update({
+            "job_id": job_id,
+            "status": PENDENTE,
+            "status_url": f"/api/jobs/{job_id}",
+            "test_mode": test_mode
+        })
+        response = jsonify(response)
+        response.headers['Location'] = f"/api/jobs/{job_id}"
+        return response, 202
+
+    except FilaCheia:
+        app.logger.warning("Fila de jobs cheia", extra={'request_id': g.request_id})
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        response = jsonify({
+            "success": False,
+            "error": "Job queue full",
+            "message": "Too many pending jobs. Try again later",
+            "request_id": g.request_id
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 503
     except Exception as e:
         app.logger.error(f"Erro no upload: {str(e)}", exc_info=True, extra={'request_id': g.request_id})
         return jsonify({
@@ -445,6 +928,93 @@ def upload_file():
             "message": str(e),
             "request_id": g.request_id
         }), 500
+    finally:
+        # Partes não aproveitadas (erros, duplicatas, request interrompido)
+        for leftover in upload_dir.glob('.upload_*'):
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+        if upload_dir.exists() and not any(upload_dir.iterdir()):
+            upload_dir.rmdir()
+
+def analyze_name(detector, filename: str, folder_context: str = '') -> Dict:
+    """Detecta data e conta de um nome de arquivo (formato de resposta de /api/analyze)"""
+    deteccao_data = detector.detectar_data(filename, folder_context)
+    deteccao_conta = detector.detectar_conta(filename)
+
+    return {
+        "filename": filename,
+        "data": {
+            "mes": deteccao_data.get('mes'),
+            "ano": deteccao_data.get('ano'),
+            "encontrado": deteccao_data.get('encontrado', False)
+        },
+        "conta": {
+            "numero": deteccao_conta.get('conta'),
+            "metodo": deteccao_conta.get('metodo'),
+            "encontrado": deteccao_conta.get('encontrado', False)
+        }
+    }
+
+def analyze_names(detector, filenames: List[str], folder_contexts: List[str]) -> List[Dict]:
+    """analyze_name para vários nomes com uma única detecção em lote (colunas -> linhas)"""
+    colunas = detector.detectar_lote(filenames, folder_contexts)
+    return [
+        {
+            "filename": filename,
+            "data": {
+                "mes": colunas['mes'][i],
+                "ano": colunas['ano'][i],
+                "encontrado": colunas['data_encontrada'][i]
+            },
+            "conta": {
+                "numero": colunas['conta'][i],
+                "metodo": colunas['metodo'][i],
+                "encontrado": colunas['conta_encontrada'][i]
+            }
+        }
+        for i, filename in enumerate(filenames)
+    ]
+
+def parse_batch_items() -> List[Dict]:
+    """Itens de /api/analyze/batch (lidos uma vez por request)
+
+    Aceita um array JSON (ou {"items": [...]}) ou NDJSON, com cada item sendo um
+    nome ou {"filename": ..., "folder_context": ...}. Levanta ValueError se inválido.
+    """
+    if 'batch_items' in g:
+        return g.batch_items
+
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        corpo = request.get_data(as_text=True)
+        try:
+            items = [json.loads(linha) for linha in corpo.splitlines() if linha.strip()]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid NDJSON line: {e}")
+    else:
+        items = request.get_json(silent=True)
+        if isinstance(items, dict):
+            items = items.get('items')
+        if not isinstance(items, list):
+            raise ValueError("Body must be a JSON array, {\"items\": [...]} or NDJSON")
+
+    if len(items) > app.config['ANALYZE_BATCH_MAX']:
+        raise ValueError(f"Too many items (max {app.config['ANALYZE_BATCH_MAX']})")
+
+    g.batch_items = [
+        item if isinstance(item, dict) else {"filename": item}
+        for item in items
+    ]
+    return g.batch_items
+
+def batch_cost() -> int:
+    """Uma unidade de rate limit a cada ANALYZE_BATCH_UNIT nomes"""
+    try:
+        total = len(parse_batch_items())
+    except ValueError:
+        return 1
+    return max(1, math.ceil(total / app.config['ANALYZE_BATCH_UNIT']))
 
 @app.route('/api/analyze', methods=['POST'])
 @require_api_key
@@ -472,31 +1042,87 @@ def analyze_file():
 
         app.logger.info(f"Analisando arquivo: {filename}", extra={'request_id': g.request_id})
 
-        # Usa organizador para detectar
-        org = get_organizer()
+        result = analyze_name(get_detector(), filename, folder_context)
+
+        return jsonify(dict(
+            result,
+            success=True,
+            request_id=g.request_id,
+            timestamp=datetime.now().isoformat()
+        ))
+
+    except Exception as e:
+        app.logger.error(f"Erro na análise: {str(e)}", exc_info=True, extra={'request_id': g.request_id})
+        return jsonify({
+            "success": False,
+            "error": "Analysis failed",
+            "message": str(e),
+            "request_id": g.request_id
+        }), 500
+
+@app.route('/api/analyze/batch', methods=['POST'])
+@require_api_key
+@rate_limit(cost=batch_cost)
+def analyze_batch():
+    """Analyze many filenames in one request (results in input order)"""
+    try:
+        try:
+            items = parse_batch_items()
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "request_id": g.request_id
+            }), 400
+
+        results = []
+        validos = []  # posição em results dos itens válidos
+        filenames, folder_contexts = [], []
+
+        for item in items:
+            filename = item.get('filename')
+            folder_context = item.get('folder_context') or ''
+            if not isinstance(filename, str) or not filename.strip():
+                results.append({"filename": filename, "error": "Filename is required"})
+                continue
+            filename = filename.strip()
+            if len(filename) > 255:
+                results.append({"filename": filename, "error": "Filename too long"})
+                continue
+
+            validos.append(len(results))
+            results.append(None)
+            filenames.append(filename)
+            folder_contexts.append(str(folder_context))
+
+        # Detecção em lote: nomes e pastas repetidos são analisados uma vez
+        for posicao, resultado in zip(validos, analyze_names(get_detector(), filenames, folder_contexts)):
+            results[posicao] = resultado
 
-        deteccao_data = org.detectar_data(filename, folder_context)
-        deteccao_conta = org.detectar_conta(filename)
+        unicos = len(set(zip(filenames, folder_contexts)))
+        erros = len(results) - len(validos)
+        app.logger.info(
+            f"Lote analisado: {len(items)} nomes ({unicos} distintos, {erros} inválidos)",
+            extra={'request_id': g.request_id}
+        )
+
+        if 'application/x-ndjson' in request.headers.get('Accept', ''):
+            corpo = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in results)
+            return Response(corpo, mimetype='application/x-ndjson',
+                            headers={'X-Request-ID': g.request_id})
 
         return jsonify({
             "success": True,
             "request_id": g.request_id,
-            "filename": filename,
-            "data": {
-                "mes": deteccao_data.get('mes'),
-                "ano": deteccao_data.get('ano'),
-                "encontrado": deteccao_data.get('encontrado', False)
-            },
-            "conta": {
-                "numero": deteccao_conta.get('conta'),
-                "metodo": deteccao_conta.get('metodo'),
-                "encontrado": deteccao_conta.get('encontrado', False)
-            },
+            "count": len(results),
+            "unique": unicos,
+            "errors": erros,
+            "results": results,
             "timestamp": datetime.now().isoformat()
         })
 
     except Exception as e:
-        app.logger.error(f"Erro na análise: {str(e)}", exc_info=True, extra={'request_id': g.request_id})
+        app.logger.error(f"Erro na análise em lote: {str(e)}", exc_info=True, extra={'request_id': g.request_id})
         return jsonify({
             "success": False,
             "error": "Analysis failed",
@@ -607,7 +1233,7 @@ if __name__ == '__main__':
     print("")
     print("🔒 Security Features:")
     print("  ✓ API Key Authentication")
-    print("  ✓ Rate Limiting (60 req/min)")
+    print(f"  ✓ Rate Limiting ({rate_limiter.max_requests} req/min)")
     print("  ✓ Input Validation")
     print("  ✓ CORS Protection")
     print("  ✓ Request ID Tracking")
@@ -615,9 +1241,12 @@ if __name__ == '__main__':
     print("📋 Available Endpoints:")
     print("  GET  /api          - API Documentation")
     print("  GET  /api/health   - Health Check")
-    print("  POST /api/organize - Organize Files")
-    print("  POST /api/upload   - Upload Files")
+    print("  POST /api/organize - Organize Files (background job)")
+    print("  GET  /api/jobs/<id> - Job Status")
+    print("  GET  /api/jobs/<id>/events - Job Progress (SSE)")
+    print("  POST /api/upload   - Upload Files (organize=true: organiza em job)")
     print("  POST /api/analyze  - Analyze Filename")
+    print("  POST /api/analyze/batch - Analyze Many Filenames (JSON array or NDJSON)")
     print("  GET  /api/config   - Get Configuration")
     print("  PUT  /api/config   - Update Configuration")
     print("")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo Observador
+Organiza extratos assim que chegam na pasta de origem: inotify no Linux,
+varredura incremental (snapshot) nos demais sistemas
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+# Adiciona os diretórios utils e config ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utils'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'config'))
+from descoberta import descobrir_arquivos, EXTENSOES_EXTRATOS
+from snapshot_diretorios import SnapshotDiretorios
+
+logger = logging.getLogger(__name__)
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+EVENTO_INOTIFY = struct.Struct('iIII')
+
+
+class FonteInotify:
+    """Eventos de arquivos gravados ou movidos para a árvore (inotify via ctypes)"""
+
+    MASCARA = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, raiz: str, recursivo: bool = True):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+
+        self.recursivo = recursivo
+        self.pastas = {}  # descritor de observação -> pasta
+        self._observar_arvore(raiz)
+
+    @staticmethod
+    def disponivel() -> bool:
+        return sys.platform.startswith('linux')
+
+    def _observar(self, pasta: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(pasta), self.MASCARA)
+        if wd < 0:
+            erro = ctypes.get_errno()
+            if erro == errno.ENOSPC:
+                raise OSError(erro, "Limite de observações do inotify atingido (fs.inotify.max_user_watches)")
+            return  # Pasta removida ou sem permissão
+        self.pastas[wd] = pasta
+
+    def _observar_arvore(self, raiz: str):
+        self._observar(raiz)
+        if not self.recursivo:
+            return
+        for atual, subpastas, _ in os.walk(raiz):
+            subpastas[:] = [s for s in subpastas if not s.startswith('.')]
+            for subpasta in subpastas:
+                self._observar(os.path.join(atual, subpasta))
+
+    def ler(self, timeout: float) -> Tuple[List[str], bool]:
+        """Aguarda eventos; retorna (caminhos gravados/movidos, fila do kernel transbordou)"""
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return [], False
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        caminhos = []
+        transbordou = False
+        pos = 0
+        while pos < len(dados):
+            wd, mascara, _, tamanho = EVENTO_INOTIFY.unpack_from(dados, pos)
+            nome = dados[pos + EVENTO_INOTIFY.size:pos + EVENTO_INOTIFY.size + tamanho].rstrip(b'\0')
+            pos += EVENTO_INOTIFY.size + tamanho
+
+            if mascara & IN_Q_OVERFLOW:
+                transbordou = True
+                continue
+            if mascara & IN_IGNORED:
+                self.pastas.pop(wd, None)
+                continue
+
+            pasta = self.pastas.get(wd)
+            if pasta is None or not nome:
+                continue
+            caminho = os.path.join(pasta, os.fsdecode(nome))
+
+            if mascara & IN_ISDIR:
+                # Pasta nova: observa e inclui o que já foi gravado nela antes da observação
+                if self.recursivo and not os.path.basename(caminho).startswith('.'):
+                    self._observar_arvore(caminho)
+                    caminhos.extend(e.path for e in descobrir_arquivos(caminho, recursivo=True))
+            elif mascara & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                caminhos.append(caminho)
+
+        return caminhos, transbordou
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+class FonteVarredura:
+    """Varredura incremental periódica (pastas inalteradas não são relidas)"""
+
+    def __init__(self, varrer: Callable[[], List[str]], intervalo: float):
+        self.varrer = varrer
+        self.intervalo = intervalo
+        self._proxima = 0.0
+
+    def ler(self, timeout: float) -> Tuple[List[str], bool]:
+        agora = time.monotonic()
+        if agora < self._proxima:
+            time.sleep(min(timeout, self._proxima - agora))
+            return [], False
+        self._proxima = agora + self.intervalo
+        return self.varrer(), False
+
+    def fechar(self):
+        pass
+
+
+class ModoObservador:
+    """Observa a pasta de origem e processa cada extrato novo quando para de ser gravado"""
+
+    def __init__(self, pasta_origem, processar: Callable[[Path], bool], recursivo: bool = True,
+                 estabilidade: float = 2.0, intervalo: float = 5.0, usar_inotify: bool = None,
+                 processar_existentes: bool = False, espera_retentativa: float = 60.0):
+        """
+        Args:
+            pasta_origem: Pasta observada
+            processar: Callable(arquivo) -> bool; False pede nova tentativa mais tarde
+            recursivo: Observa subpastas
+            estabilidade: Segundos sem mudança de tamanho/mtime antes de processar
+            intervalo: Intervalo entre varreduras quando não há inotify
+            usar_inotify: Força (True) ou desativa (False) o inotify; None = automático
+            processar_existentes: Na primeira execução, processa os arquivos já presentes
+            espera_retentativa: Atraso antes de repetir arquivos com processar() == False
+        """
+        self.pasta_origem = Path(pasta_origem)
+        self.processar = processar
+        self.recursivo = recursivo
+        self.estabilidade = estabilidade
+        self.intervalo = intervalo
+        self.usar_inotify = FonteInotify.disponivel() if usar_inotify is None else usar_inotify
+        self.processar_existentes = processar_existentes
+        self.espera_retentativa = espera_retentativa
+
+        self.snapshot = SnapshotDiretorios(self.pasta_origem, 'observador')
+        self._candidatos = {}  # caminho -> [assinatura, desde]
+        self._parar = threading.Event()
+        self.stats = {'processados': 0, 'adiados': 0, 'erros': 0}
+
+    def parar(self):
+        self._parar.set()
+
+    def _varrer(self) -> List[str]:
+        """Varredura incremental: só pastas alteradas são relidas"""
+        caminhos = [e.path for e in descobrir_arquivos(self.pasta_origem, recursivo=self.recursivo,
+                                                        snapshot=self.snapshot)]
+        self.snapshot.consolidar()
+        return caminhos
+
+    def _adicionar_candidato(self, caminho: str):
+        nome = os.path.basename(caminho)
+        if nome.startswith('.') or not nome.lower().endswith(EXTENSOES_EXTRATOS):
+            return
+        self._candidatos.setdefault(caminho, [None, 0.0])
+
+    def _processar_estaveis(self):
+        """Processa candidatos cujo tamanho e mtime não mudam há 'estabilidade' segundos"""
+        agora = time.monotonic()
+        for caminho, estado in list(self._candidatos.items()):
+            try:
+                st = os.stat(caminho)
+            except OSError:
+                del self._candidatos[caminho]  # Removido ou renomeado antes de estabilizar
+                continue
+
+            assinatura = (st.st_size, st.st_mtime_ns)
+            if assinatura != estado[0]:
+                estado[0], estado[1] = assinatura, agora
+                continue
+            if agora - estado[1] < self.estabilidade:
+                continue
+
+            try:
+                concluido = self.processar(Path(caminho))
+            except Exception as e:
+                logger.error(f"ERRO: {caminho} - {e}", exc_info=True)
+                self.stats['erros'] += 1
+                concluido = True
+
+            if concluido:
+                del self._candidatos[caminho]
+                self.snapshot.confirmar(caminho)
+                self.stats['processados'] += 1
+            else:
+                estado[1] = agora + self.espera_retentativa
+                self.stats['adiados'] += 1
+
+    def executar(self):
+        """Observa até parar() ser chamado (ou Ctrl+C)"""
+        primeira_execucao = not self.snapshot.arquivo.exists()
+
+        # A observação começa antes da varredura inicial para não perder arquivos no intervalo
+        if self.usar_inotify:
+            fonte = FonteInotify(str(self.pasta_origem), self.recursivo)
+            logger.info(f"Observando {self.pasta_origem} (inotify, {len(fonte.pastas)} pastas)")
+        else:
+            fonte = FonteVarredura(self._varrer, self.intervalo)
+            logger.info(f"Observando {self.pasta_origem} (varredura a cada {self.intervalo}s)")
+
+        # Recupera o que chegou enquanto o observador estava parado
+        iniciais = self._varrer()
+        if primeira_execucao and not self.processar_existentes:
+            for caminho in iniciais:
+                self.snapshot.confirmar(caminho)
+            logger.info(f"Primeira execução: {len(iniciais)} arquivos existentes registrados sem processar")
+        else:
+            for caminho in iniciais:
+                self._adicionar_candidato(caminho)
+        self.snapshot.salvar()
+
+        ultimo_salvamento = time.monotonic()
+        espera = max(0.2, min(1.0, self.estabilidade / 2))
+        try:
+            while not self._parar.is_set():
+                caminhos, transbordou = fonte.ler(espera)
+                if transbordou:
+                    logger.warning("Fila de eventos do inotify transbordou; varrendo pastas alteradas")
+                    caminhos = caminhos + self._varrer()
+
+                for caminho in caminhos:
+                    self._adicionar_candidato(caminho)
+                self._processar_estaveis()
+
+                if time.monotonic() - ultimo_salvamento > 60:
+                    self.snapshot.salvar()
+                    ultimo_salvamento = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fonte.fechar()
+            self.snapshot.salvar()
+            logger.info(f"Observador encerrado: {self.stats}")
+
+
+def criar_processador_local(pasta_origem, pasta_destino, modo_teste: bool = False):
+    """Processa cada arquivo com OrganizadorLocalAvancado.processar_arquivo"""
+    from organizador_local_avancado import OrganizadorLocalAvancado
+
+    organizador = OrganizadorLocalAvancado(str(pasta_origem), str(pasta_destino))
+
+    def processar(arquivo: Path) -> bool:
+        organizador.processar_arquivo(arquivo, modo_teste)
+        return True
+
+    return processar
+
+
+def criar_processador_ia(pasta_origem, pasta_destino, api_key: str = None):
+    """Processa cada extrato com RenomerIA (cascata local → cache → Gemini) e copia para ANO/MES"""
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+    import config
+    from renomer_ia_v4 import RenomerIA
+    from cache_ia import CacheIA
+    from pool_requisicoes import LimiteDiarioExcedido
+
+    cache = None
+    if getattr(config, 'GEMINI_CACHE_ENABLED', False):
+        cache = CacheIA(config.GEMINI_CACHE_ARQUIVO, config.GEMINI_CACHE_MAX_MB)
+
+    renomer = RenomerIA(api_key or getattr(config, 'GEMINI_API_KEY', None), cache=cache)
+    renomer.preparar_deteccao_local(pasta_origem, pasta_destino)
+
+    def processar(arquivo: Path) -> bool:
+        try:
+            info = renomer.organizar_arquivo_extrato(arquivo, pasta_destino)
+        except LimiteDiarioExcedido as e:
+            logger.warning(f"{e}; {arquivo.name} será tentado novamente")
+            return False
+        logger.info(f"SUCESSO: {arquivo.name} -> {info['destino']} ({info['estagio']})")
+        return True
+
+    return processar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Organiza extratos conforme chegam na pasta de origem")
+    parser.add_argument('origem', help="Pasta observada")
+    parser.add_argument('destino', help="Pasta organizada")
+    parser.add_argument('--modo', choices=['local', 'ia'], default='local',
+                        help="local: OrganizadorLocalAvancado; ia: RenomerIA (Gemini)")
+    parser.add_argument('--estabilidade', type=float, default=2.0,
+                        help="Segundos sem alteração antes de processar um arquivo")
+    parser.add_argument('--intervalo', type=float, default=5.0, help="Intervalo da varredura sem inotify")
+    parser.add_argument('--polling', action='store_true', help="Usa varredura mesmo com inotify disponível")
+    parser.add_argument('--processar-existentes', action='store_true',
+                        help="Na primeira execução, processa os arquivos já presentes")
+    parser.add_argument('--simular', action='store_true', help="Modo local sem copiar arquivos")
+    args = parser.parse_args()
+
+    if args.modo == 'ia':
+        processar = criar_processador_ia(args.origem, args.destino)
+    else:
+        processar = criar_processador_local(args.origem, args.destino, args.simular)
+
+    # Handler próprio: o OrganizadorLocalAvancado já registra no console pelo seu logger
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    observador = ModoObservador(args.origem, processar, estabilidade=args.estabilidade,
+                                intervalo=args.intervalo, usar_inotify=False if args.polling else None,
+                                processar_existentes=args.processar_existentes)
+    observador.executar()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,19 +7,31 @@ Sistema de organização de arquivos com detecção inteligente e relatórios de
 
 import os
 import sys
-import re
 import shutil
 import json
 from datetime import datetime
 from pathlib import Path
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
 from functools import lru_cache
-import hashlib
+from itertools import chain
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Adiciona o diretório utils ao path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utils'))
 from relatorio_manager import relatorio_manager
+from banco_execucoes import BancoExecucoes
+from descoberta import descobrir_arquivos
+from snapshot_diretorios import SnapshotDiretorios
+from pool_requisicoes import mapear_em_ordem, coletar
+from regras_deteccao import MOTOR_LOCAL, NOMES_MESES, detectar_data_ofx
+
+# Logging do módulo configurado uma única vez por processo
+_logging_configurado = False
+_lock_logging = threading.Lock()
+
 
 class OrganizadorLocalAvancado:
     def __init__(self, diretorio_origem: str, diretorio_destino: str):
@@ -34,73 +46,19 @@ class OrganizadorLocalAvancado:
 
         self.setup_logging()
 
-        # Compila padrões regex uma vez para melhor performance
-        self._compilar_padroes()
-
-        # Mapeamento de meses
-        self.meses_nomes = {
-            'JANEIRO': '01', 'JAN': '01',
-            'FEVEREIRO': '02', 'FEV': '02',
-            'MARÇO': '03', 'MARCO': '03', 'MAR': '03',
-            'ABRIL': '04', 'ABR': '04',
-            'MAIO': '05', 'MAI': '05',
-            'JUNHO': '06', 'JUN': '06',
-            'JULHO': '07', 'JUL': '07',
-            'AGOSTO': '08', 'AGO': '08',
-            'SETEMBRO': '09', 'SET': '09',
-            'OUTUBRO': '10', 'OUT': '10',
-            'NOVEMBRO': '11', 'NOV': '11',
-            'DEZEMBRO': '12', 'DEZ': '12'
-        }
+        self.stats = self._novas_stats()
+        self._lock_stats = threading.Lock()
 
-        self.stats = {
-            'total_arquivos': 0,
+    @staticmethod
+    def _novas_stats(total_arquivos: int = 0) -> Dict:
+        return {
+            'total_arquivos': total_arquivos,
             'processados': 0,
             'erros': 0,
             'data_encontrada': 0,
             'conta_encontrada': 0
         }
 
-        # Cache para detecções
-        self._cache_deteccao = {}
-
-    def _compilar_padroes(self):
-        """Compila padrões regex para melhor performance"""
-        self.padroes = {
-            # Datas em vários formatos
-            'data_mm_yyyy': re.compile(r'(\d{1,2})[\/\-\.](\d{4})', re.IGNORECASE),
-            'data_mm_yy': re.compile(r'(\d{1,2})[\/\-\.](\d{2})', re.IGNORECASE),
-            'data_yyyy_mm': re.compile(r'(\d{4})[\/\-\.](\d{1,2})', re.IGNORECASE),
-            'data_yyyymm': re.compile(r'(\d{4})(\d{2})', re.IGNORECASE),
-            'data_timestamp': re.compile(r'(\d{4})-(\d{2})-(\d{2})', re.IGNORECASE),  # 2025-07-02
-
-            # Meses por nome
-            'mes_nome_completo': re.compile(r'(JANEIRO|FEVEREIRO|MARÇO|MARCO|ABRIL|MAIO|JUNHO|JULHO|AGOSTO|SETEMBRO|OUTUBRO|NOVEMBRO|DEZEMBRO)', re.IGNORECASE),
-            'mes_nome_abrev': re.compile(r'(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)', re.IGNORECASE),
-
-            # Contas bancárias - padrões diversos MELHORADOS
-            'conta_inicio_mes': re.compile(r'^(\d{4,8}[-]?[A-Z0-9])\s+(JANEIRO|FEVEREIRO|MARÇO|MARCO|ABRIL|MAIO|JUNHO|JULHO|AGOSTO|SETEMBRO|OUTUBRO|NOVEMBRO|DEZEMBRO)', re.IGNORECASE),  # 18417-9 ABRIL
-            'conta_inicio_mes_abrev': re.compile(r'^(\d{4,8}[-]?[A-Z0-9])\s+(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)', re.IGNORECASE),  # 28758-X MAIO
-            'conta_mes_inicio': re.compile(r'^(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)\s+(\d{4,8}[-]?[A-Z0-9])', re.IGNORECASE),  # FEV 28142-5
-            'conta_hifen': re.compile(r'(\d{3,8}[-]\d{1})', re.IGNORECASE),  # 12345-6
-            'conta_hifen_letra': re.compile(r'(\d{3,8}[-][A-Z0-9]{1})', re.IGNORECASE),  # 12345-X
-            'conta_hifen_espaco': re.compile(r'(\d{4,8}[-]\s*[A-Z0-9])', re.IGNORECASE),  # 22989- X
-            'conta_simples': re.compile(r'(?<![\d])(\d{4,8})(?![\d])', re.IGNORECASE),  # 123456
-            'conta_ext': re.compile(r'EXT\w*\s+\w*\s*(\d+[-]?\w*)', re.IGNORECASE),  # EXT ABRIL 12345-6
-            'conta_ext_simples': re.compile(r'^EXT\s+(\d+[-]?\w*)', re.IGNORECASE),  # EXT 4049-5
-            'conta_extrato': re.compile(r'[Ee]xtrato\s*(\d+)', re.IGNORECASE),  # Extrato123456
-            'conta_extrato_longo': re.compile(r'[Ee]xtrato(\d{8,})', re.IGNORECASE),  # Extrato6769113603
-            'conta_caixa': re.compile(r'CAIXA\w*\s+\w*\s+(\d+[-]?\w*)', re.IGNORECASE),  # CAIXA JAN 123-4
-            'conta_banco': re.compile(r'(?:BANCO|CONTA|CC|AG)\s*(\d+[-]?\w*)', re.IGNORECASE),
-            'conta_codigo_data': re.compile(r'(\d{8,12})(?=\d{4})', re.IGNORECASE),  # códigos seguidos de data
-            'conta_gfi': re.compile(r'GFI(\d+)', re.IGNORECASE),  # GFI625082025
-            'conta_timestamp_longo': re.compile(r'(\d{15,})', re.IGNORECASE),  # números muito longos em timestamps
-
-            # Anos
-            'ano_4digitos': re.compile(r'(20\d{2})', re.IGNORECASE),  # 2023, 2024, etc
-            'ano_2digitos': re.compile(r'(\d{2})(?=\D|$)', re.IGNORECASE),  # 23, 24
-        }
-
     def _validar_diretorio(self, caminho: str, tipo: str) -> Path:
         """Valida e sanitiza caminho de diretório"""
         if not caminho or not isinstance(caminho, str):
@@ -132,146 +90,55 @@ class OrganizadorLocalAvancado:
         return path_obj.resolve()  # Retorna caminho absoluto
 
     def setup_logging(self):
-        """Configura logging com rotação de arquivos"""
+        """Configura logging com rotação de arquivos (uma vez por processo)"""
         from logging.handlers import RotatingFileHandler
+        global _logging_configurado
 
-        # Remove handlers existentes para evitar duplicação
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
-
-        # Cria diretório de logs se não existir
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
-
-        # Handler com rotação (max 5MB, mantém 5 arquivos)
-        file_handler = RotatingFileHandler(
-            log_dir / 'organizador_local.log',
-            maxBytes=5*1024*1024,
-            backupCount=5,
-            encoding='utf-8'
-        )
-        file_handler.setLevel(logging.DEBUG)
-
-        # Handler para console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-
-        # Formato detalhado
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-
-        # Configura logger
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
 
-    def _gerar_cache_key(self, texto: str, contexto: str = "") -> str:
-        """Gera chave única para cache"""
-        conteudo = f"{texto}|{contexto}"
-        return hashlib.md5(conteudo.encode()).hexdigest()
+        with _lock_logging:
+            if _logging_configurado:
+                return
+
+            # Cria diretório de logs se não existir
+            log_dir = Path('logs')
+            log_dir.mkdir(exist_ok=True)
+
+            # Handler com rotação (max 5MB, mantém 5 arquivos)
+            file_handler = RotatingFileHandler(
+                log_dir / 'organizador_local.log',
+                maxBytes=5*1024*1024,
+                backupCount=5,
+                encoding='utf-8'
+            )
+            file_handler.setLevel(logging.DEBUG)
+
+            # Handler para console
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.INFO)
+
+            # Formato detalhado
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
+            file_handler.setFormatter(formatter)
+            console_handler.setFormatter(formatter)
+
+            # Configura logger (sem propagar: não duplica nos handlers da raiz, que são preservados)
+            self.logger.setLevel(logging.DEBUG)
+            self.logger.addHandler(file_handler)
+            self.logger.addHandler(console_handler)
+            self.logger.propagate = False
+            _logging_configurado = True
 
     def detectar_data(self, texto: str, caminho_completo: str = "", arquivo_path: str = "") -> Dict:
-        """Detecta mês e ano no texto usando múltiplos padrões com cache"""
-        # Verifica cache
-        cache_key = self._gerar_cache_key(texto, caminho_completo)
-        if cache_key in self._cache_deteccao:
-            cached = self._cache_deteccao[cache_key]
-            if 'data' in cached:
-                return cached['data']
-
+        """Detecta mês e ano no texto usando múltiplos padrões (com cache do motor)"""
         # Inclui todo o caminho para pegar ano da pasta pai
-        texto_completo = f"{texto} {caminho_completo}".upper()
-
-        mes = None
-        ano = None
-
-        # 1. Busca mês por nome
-        for padrao_nome in ['mes_nome_completo', 'mes_nome_abrev']:
-            match = self.padroes[padrao_nome].search(texto_completo)
-            if match:
-                nome_mes = match.group(1).upper()
-                mes = self.meses_nomes.get(nome_mes)
-                if mes:
-                    break
-
-        # 2. Busca ano
-        match = self.padroes['ano_4digitos'].search(texto_completo)
-        if match:
-            ano = match.group(1)
-
-        # 3. Busca datas numéricas (MM/YYYY, MM/YY, etc)
-        if not mes or not ano:
-            # MM/YYYY ou MM-YYYY
-            match = self.padroes['data_mm_yyyy'].search(texto_completo)
-            if match:
-                mes_num = match.group(1).zfill(2)
-                ano_encontrado = match.group(2)
-                if not mes and 1 <= int(mes_num) <= 12:
-                    mes = mes_num
-                if not ano:
-                    ano = ano_encontrado
-
-            # MM/YY
-            if not mes or not ano:
-                match = self.padroes['data_mm_yy'].search(texto_completo)
-                if match:
-                    mes_num = match.group(1).zfill(2)
-                    ano_curto = match.group(2)
-                    if not mes and 1 <= int(mes_num) <= 12:
-                        mes = mes_num
-                    if not ano:
-                        # Assume 20XX para anos curtos
-                        ano = f"20{ano_curto}"
-
-            # YYYY/MM
-            if not mes or not ano:
-                match = self.padroes['data_yyyy_mm'].search(texto_completo)
-                if match:
-                    ano_encontrado = match.group(1)
-                    mes_num = match.group(2).zfill(2)
-                    if not ano:
-                        ano = ano_encontrado
-                    if not mes and 1 <= int(mes_num) <= 12:
-                        mes = mes_num
-
-            # YYYYMM
-            if not mes or not ano:
-                match = self.padroes['data_yyyymm'].search(texto_completo)
-                if match:
-                    ano_encontrado = match.group(1)
-                    mes_num = match.group(2)
-                    if not ano:
-                        ano = ano_encontrado
-                    if not mes and 1 <= int(mes_num) <= 12:
-                        mes = mes_num
-
-            # Timestamp YYYY-MM-DD
-            if not mes or not ano:
-                match = self.padroes['data_timestamp'].search(texto_completo)
-                if match:
-                    ano_encontrado = match.group(1)
-                    mes_num = match.group(2)
-                    if not ano:
-                        ano = ano_encontrado
-                    if not mes and 1 <= int(mes_num) <= 12:
-                        mes = mes_num
-
-        # Validações
-        if mes and not (1 <= int(mes) <= 12):
-            mes = None
-
-        if ano and len(ano) == 2:
-            ano = f"20{ano}"
-
-        if ano and not (2020 <= int(ano) <= 2030):
-            ano = None
-
-        # 4. Se não encontrou data e é arquivo OFX, tenta analisar conteúdo
+        resultado = MOTOR_LOCAL.detectar_data(texto, caminho_completo)
+        mes, ano = resultado['mes'], resultado['ano']
+
+        # Se não encontrou data e é arquivo OFX, tenta analisar conteúdo (fora do cache: depende do arquivo)
         if (not mes or not ano) and arquivo_path and arquivo_path.lower().endswith('.ofx'):
             try:
                 data_ofx = self._analisar_conteudo_ofx(arquivo_path)
@@ -283,164 +150,47 @@ class OrganizadorLocalAvancado:
             except Exception as e:
                 self.logger.debug(f"Erro ao analisar conteúdo OFX {arquivo_path}: {e}")
 
-        resultado = {
+        if mes == resultado['mes'] and ano == resultado['ano']:
+            return resultado
+
+        return {
             'mes': mes,
             'ano': ano,
             'encontrado': bool(mes and ano)
         }
 
-        # Salva no cache
-        if cache_key not in self._cache_deteccao:
-            self._cache_deteccao[cache_key] = {}
-        self._cache_deteccao[cache_key]['data'] = resultado
-
-        return resultado
-
     def detectar_conta(self, texto: str) -> Dict:
-        """Detecta número da conta usando múltiplos padrões com cache"""
-        # Verifica cache
-        cache_key = self._gerar_cache_key(texto, "conta")
-        if cache_key in self._cache_deteccao:
-            cached = self._cache_deteccao[cache_key]
-            if 'conta' in cached:
-                return cached['conta']
-
-        texto_upper = texto.upper()
-        conta = None
-        metodo = None
-
-        # Lista de padrões em ordem de prioridade - MELHORADA
-        padroes_conta = [
-            ('conta_inicio_mes', 'INICIO_MES'),
-            ('conta_inicio_mes_abrev', 'INICIO_MES_ABREV'),
-            ('conta_mes_inicio', 'MES_INICIO'),
-            ('conta_ext_simples', 'EXT_SIMPLES'),
-            ('conta_ext', 'EXT'),
-            ('conta_caixa', 'CAIXA'),
-            ('conta_extrato_longo', 'EXTRATO_LONGO'),
-            ('conta_extrato', 'EXTRATO'),
-            ('conta_gfi', 'GFI'),
-            ('conta_banco', 'BANCO'),
-            ('conta_hifen_espaco', 'HIFEN_ESPACO'),
-            ('conta_hifen', 'HIFEN'),
-            ('conta_hifen_letra', 'HIFEN_LETRA'),
-            ('conta_timestamp_longo', 'TIMESTAMP_LONGO'),
-            ('conta_codigo_data', 'CODIGO_DATA'),
-            ('conta_simples', 'SIMPLES')
-        ]
-
-        for padrao_nome, metodo_nome in padroes_conta:
-            match = self.padroes[padrao_nome].search(texto_upper)
-            if match:
-                # Tratamento especial para diferentes padrões
-                if padrao_nome == 'conta_mes_inicio':
-                    conta_bruta = match.group(2)  # Conta está no segundo grupo
-                elif padrao_nome in ['conta_inicio_mes', 'conta_inicio_mes_abrev']:
-                    conta_bruta = match.group(1)  # Conta está no primeiro grupo
-                else:
-                    conta_bruta = match.group(1)
+        """Detecta número da conta usando múltiplos padrões (com cache do motor)"""
+        return MOTOR_LOCAL.detectar_conta(texto)
 
-                # Limpa a conta
-                conta = re.sub(r'[^\w]', '', conta_bruta)
-                metodo = metodo_nome
-                break
-
-        # Validações
-        if conta and len(conta) < 3:  # Conta muito curta
-            conta = None
-            metodo = None
-
-        resultado = {
-            'conta': conta,
-            'metodo': metodo,
-            'encontrado': bool(conta)
-        }
-
-        # Salva no cache
-        if cache_key not in self._cache_deteccao:
-            self._cache_deteccao[cache_key] = {}
-        self._cache_deteccao[cache_key]['conta'] = resultado
-
-        return resultado
+    def detectar_lote(self, nomes: List[str], caminhos: Optional[List[str]] = None) -> Dict[str, List]:
+        """Detecta data e conta de vários arquivos de uma vez, em colunas (ver MotorDeteccao.detectar_lote)"""
+        return MOTOR_LOCAL.detectar_lote(nomes, caminhos)
 
     def _analisar_conteudo_ofx(self, arquivo_path: str) -> Dict:
         """Analisa o conteúdo de um arquivo OFX para extrair informações de data"""
         try:
             with open(arquivo_path, 'r', encoding='utf-8', errors='ignore') as f:
                 conteudo = f.read(2048)  # Lê apenas os primeiros 2KB para performance
-            
-            mes = None
-            ano = None
-            
-            # Padrões específicos para arquivos OFX
-            padroes_ofx = {
-                # Data no formato YYYYMMDD (comum em OFX)
-                'dtstart': re.compile(r'<DTSTART>(\d{8})', re.IGNORECASE),
-                'dtend': re.compile(r'<DTEND>(\d{8})', re.IGNORECASE),
-                'dtserver': re.compile(r'<DTSERVER>(\d{8})', re.IGNORECASE),
-                'dtacctup': re.compile(r'<DTACCTUP>(\d{8})', re.IGNORECASE),
-                # Data no formato YYYYMMDDHHMMSS
-                'dtstart_full': re.compile(r'<DTSTART>(\d{4})(\d{2})(\d{2})\d{6}', re.IGNORECASE),
-                'dtend_full': re.compile(r'<DTEND>(\d{4})(\d{2})(\d{2})\d{6}', re.IGNORECASE),
-                'dtserver_full': re.compile(r'<DTSERVER>(\d{4})(\d{2})(\d{2})\d{6}', re.IGNORECASE),
-                # Período de extrato
-                'periodo': re.compile(r'(\d{1,2})[\/\-](\d{4})', re.IGNORECASE),
-                # Data em formato brasileiro
-                'data_br': re.compile(r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})', re.IGNORECASE),
-            }
-            
-            # Tenta extrair data dos campos OFX
-            for padrao_nome, padrao in padroes_ofx.items():
-                match = padrao.search(conteudo)
-                if match:
-                    if padrao_nome in ['dtstart', 'dtend', 'dtserver', 'dtacctup']:
-                        # Formato YYYYMMDD
-                        data_str = match.group(1)
-                        if len(data_str) == 8:
-                            ano_encontrado = data_str[:4]
-                            mes_encontrado = data_str[4:6]
-                            if 2020 <= int(ano_encontrado) <= 2030 and 1 <= int(mes_encontrado) <= 12:
-                                ano = ano_encontrado
-                                mes = mes_encontrado.zfill(2)
-                                break
-                    elif padrao_nome in ['dtstart_full', 'dtend_full', 'dtserver_full']:
-                        # Formato YYYYMMDDHHMMSS
-                        ano_encontrado = match.group(1)
-                        mes_encontrado = match.group(2)
-                        if 2020 <= int(ano_encontrado) <= 2030 and 1 <= int(mes_encontrado) <= 12:
-                            ano = ano_encontrado
-                            mes = mes_encontrado.zfill(2)
-                            break
-                    elif padrao_nome == 'periodo':
-                        # MM/YYYY
-                        mes_encontrado = match.group(1).zfill(2)
-                        ano_encontrado = match.group(2)
-                        if 1 <= int(mes_encontrado) <= 12 and 2020 <= int(ano_encontrado) <= 2030:
-                            mes = mes_encontrado
-                            ano = ano_encontrado
-                            break
-                    elif padrao_nome == 'data_br':
-                        # DD/MM/YYYY
-                        dia = match.group(1)
-                        mes_encontrado = match.group(2).zfill(2)
-                        ano_encontrado = match.group(3)
-                        if 1 <= int(mes_encontrado) <= 12 and 2020 <= int(ano_encontrado) <= 2030:
-                            mes = mes_encontrado
-                            ano = ano_encontrado
-                            break
-            
-            return {
-                'mes': mes,
-                'ano': ano,
-                'encontrado': bool(mes and ano)
-            }
-            
+            return detectar_data_ofx(conteudo)
         except Exception as e:
             self.logger.debug(f"Erro ao analisar conteúdo OFX: {e}")
             return {}
 
     def processar_arquivo(self, arquivo: Path, modo_teste: bool = True) -> Dict:
         """Processa um arquivo individual com validações robustas"""
+        self.logger.info(f"Processando: {arquivo.name}")
+
+        resultado = self._detectar_arquivo(arquivo)
+        if not resultado['erro']:
+            self._definir_destino(resultado)
+            self._copiar_arquivo(arquivo, resultado, modo_teste)
+
+        self._concluir_arquivo(arquivo, resultado, modo_teste)
+        return resultado
+
+    def _detectar_arquivo(self, arquivo: Path) -> Dict:
+        """Valida o arquivo e detecta data e conta (sem alterar stats; pode rodar em outro processo)"""
         resultado = {
             'arquivo_original': str(arquivo),
             'nome_original': arquivo.name,
@@ -467,8 +217,6 @@ class OrganizadorLocalAvancado:
             if not os.access(arquivo, os.R_OK):
                 raise PermissionError(f"Sem permissão de leitura: {arquivo}")
 
-            self.logger.info(f"Processando: {arquivo.name}")
-
             # Detecta data - passa caminho completo para detectar ano
             deteccao_data = self.detectar_data(arquivo.name, str(arquivo.parent), str(arquivo))
 
@@ -486,102 +234,193 @@ class OrganizadorLocalAvancado:
             if not deteccao_conta['encontrado']:
                 raise Exception("Conta não identificada")
 
-            # Gera nome padronizado
-            mes = deteccao_data['mes']
-            ano = deteccao_data['ano']
-            conta = deteccao_conta['conta']
-
-            tipo = "PDF" if arquivo.suffix.lower() == ".pdf" else "OFX"
-            nome_novo = f"{ano}-{mes}_{conta}_{tipo}{arquivo.suffix.lower()}"
+        except Exception as e:
+            resultado['erro'] = self._descrever_erro(e)
 
-            # Define estrutura CONTA/ANO_MES
-            meses_nomes = {
-                '01': 'JANEIRO', '02': 'FEVEREIRO', '03': 'MARÇO',
-                '04': 'ABRIL', '05': 'MAIO', '06': 'JUNHO',
-                '07': 'JULHO', '08': 'AGOSTO', '09': 'SETEMBRO',
-                '10': 'OUTUBRO', '11': 'NOVEMBRO', '12': 'DEZEMBRO'
-            }
+        return resultado
 
-            pasta_conta = f"CONTA_{conta}"
-            pasta_data = f"{ano}_{mes}_{meses_nomes.get(mes, 'DESCONHECIDO')}"
-            destino_final = self.diretorio_destino / pasta_conta / pasta_data / nome_novo
-
-            # Verifica duplicatas
-            contador = 1
-            destino_original = destino_final
-            while destino_final.exists():
-                nome_base = destino_original.stem
-                extensao = destino_original.suffix
-                destino_final = destino_original.parent / f"{nome_base}_v{contador:02d}{extensao}"
-                contador += 1
-
-            resultado['arquivo_destino'] = str(destino_final)
-            resultado['estrutura'] = f"{pasta_conta}/{pasta_data}"
-
-            if not modo_teste:
-                try:
-                    # Cria diretórios com tratamento de erro
-                    destino_final.parent.mkdir(parents=True, exist_ok=True)
-
-                    # Verifica espaço em disco
-                    stat = os.statvfs(destino_final.parent) if hasattr(os, 'statvfs') else None
-                    if stat:
-                        espaco_livre = stat.f_bavail * stat.f_frsize / (1024 * 1024 * 1024)
-                        if espaco_livre < 1:
-                            raise IOError(f"Espaço em disco insuficiente: {espaco_livre:.2f}GB")
-
-                    # Copia arquivo (preserva original) com verificação
-                    shutil.copy2(str(arquivo), str(destino_final))
-
-                    # Verifica integridade da cópia
-                    if arquivo.stat().st_size != destino_final.stat().st_size:
-                        destino_final.unlink()  # Remove cópia defeituosa
-                        raise IOError("Falha na verificação de integridade da cópia")
-
-                    resultado['acao'] = 'copiado'
-                    resultado['tamanho_bytes'] = arquivo.stat().st_size
-
-                except (OSError, IOError, PermissionError) as e:
-                    raise Exception(f"Erro ao copiar arquivo: {str(e)}")
+    def _descrever_erro(self, erro: Exception) -> str:
+        """Mensagem de erro registrada no resultado do arquivo"""
+        if isinstance(erro, FileNotFoundError):
+            return f"Arquivo não encontrado: {str(erro)}"
+        if isinstance(erro, PermissionError):
+            return f"Sem permissão: {str(erro)}"
+        if isinstance(erro, ValueError):
+            return f"Valor inválido: {str(erro)}"
+        return str(erro)
+
+    def _definir_destino(self, resultado: Dict, reservados: Optional[set] = None):
+        """Gera nome padronizado e caminho final, resolvendo duplicatas
+
+        reservados: destinos já atribuídos nesta execução e ainda não copiados; deve
+        ser consultado em ordem determinística (serialmente) para que execuções
+        paralelas produzam a mesma árvore que a sequencial.
+        """
+        arquivo = Path(resultado['arquivo_original'])
+        mes = resultado['detalhes']['data']['mes']
+        ano = resultado['detalhes']['data']['ano']
+        conta = resultado['detalhes']['conta']['conta']
+
+        tipo = "PDF" if arquivo.suffix.lower() == ".pdf" else "OFX"
+        nome_novo = f"{ano}-{mes}_{conta}_{tipo}{arquivo.suffix.lower()}"
+
+        # Define estrutura CONTA/ANO_MES
+        pasta_conta = f"CONTA_{conta}"
+        pasta_data = f"{ano}_{mes}_{NOMES_MESES.get(mes, 'DESCONHECIDO')}"
+        destino_final = self.diretorio_destino / pasta_conta / pasta_data / nome_novo
+
+        # Verifica duplicatas
+        reservados = reservados if reservados is not None else set()
+        contador = 1
+        destino_original = destino_final
+        while destino_final in reservados or destino_final.exists():
+            nome_base = destino_original.stem
+            extensao = destino_original.suffix
+            destino_final = destino_original.parent / f"{nome_base}_v{contador:02d}{extensao}"
+            contador += 1
+        reservados.add(destino_final)
+
+        resultado['arquivo_destino'] = str(destino_final)
+        resultado['estrutura'] = f"{pasta_conta}/{pasta_data}"
+
+    def _copiar_arquivo(self, arquivo: Path, resultado: Dict, modo_teste: bool, mover: bool = False) -> Dict:
+        """Copia o arquivo para o destino definido (ou apenas simula)
+
+        mover=True move em vez de copiar (ex.: uploads temporários); na mesma
+        partição é só uma renomeação, sem reler o conteúdo.
+        """
+        if modo_teste:
+            resultado['acao'] = 'simulado'
+            return resultado
+
+        destino_final = Path(resultado['arquivo_destino'])
+        try:
+            # Cria diretórios com tratamento de erro
+            destino_final.parent.mkdir(parents=True, exist_ok=True)
+
+            # Verifica espaço em disco
+            stat = os.statvfs(destino_final.parent) if hasattr(os, 'statvfs') else None
+            if stat:
+                espaco_livre = stat.f_bavail * stat.f_frsize / (1024 * 1024 * 1024)
+                if espaco_livre < 1:
+                    raise IOError(f"Espaço em disco insuficiente: {espaco_livre:.2f}GB")
+
+            tamanho = arquivo.stat().st_size
+            if mover:
+                shutil.move(str(arquivo), str(destino_final))
+                if tamanho != destino_final.stat().st_size:
+                    raise IOError("Falha na verificação de integridade do arquivo movido")
             else:
-                resultado['acao'] = 'simulado'
-
-            resultado['sucesso'] = True
-            self.stats['processados'] += 1
-            self.stats['data_encontrada'] += 1
-            self.stats['conta_encontrada'] += 1
-
-            self.logger.info(f"SUCESSO: {arquivo.name}")
-            self.logger.info(f"  -> {pasta_conta}/{pasta_data}/{nome_novo}")
-            self.logger.info(f"  Data: {mes}/{ano} | Conta: {conta}")
-            if not modo_teste:
-                self.logger.info(f"  Arquivo COPIADO (original preservado)")
-
-            # Log avisos se existirem
-            for aviso in resultado['avisos']:
-                self.logger.warning(f"  AVISO: {aviso}")
-
-        except FileNotFoundError as e:
-            resultado['erro'] = f"Arquivo não encontrado: {str(e)}"
-            self.stats['erros'] += 1
-            self.logger.error(f"ERRO FileNotFound: {arquivo.name} - {str(e)}")
-        except PermissionError as e:
-            resultado['erro'] = f"Sem permissão: {str(e)}"
-            self.stats['erros'] += 1
-            self.logger.error(f"ERRO Permission: {arquivo.name} - {str(e)}")
-        except ValueError as e:
-            resultado['erro'] = f"Valor inválido: {str(e)}"
-            self.stats['erros'] += 1
-            self.logger.error(f"ERRO ValueError: {arquivo.name} - {str(e)}")
-        except Exception as e:
-            resultado['erro'] = str(e)
-            self.stats['erros'] += 1
-            self.logger.error(f"ERRO: {arquivo.name} - {str(e)}", exc_info=True)
+                # Copia arquivo (preserva original) com verificação
+                shutil.copy2(str(arquivo), str(destino_final))
+
+                # Verifica integridade da cópia
+                if tamanho != destino_final.stat().st_size:
+                    destino_final.unlink()  # Remove cópia defeituosa
+                    raise IOError("Falha na verificação de integridade da cópia")
+
+            resultado['acao'] = 'movido' if mover else 'copiado'
+            resultado['tamanho_bytes'] = tamanho
+
+        except (OSError, IOError, PermissionError) as e:
+            resultado['erro'] = f"Erro ao copiar arquivo: {str(e)}"
 
         return resultado
 
-    def organizar_arquivos(self, modo_teste: bool = True, max_workers: int = 4) -> Dict:
-        """Organiza todos os arquivos com processamento paralelo opcional"""
+    def _concluir_arquivo(self, arquivo: Path, resultado: Dict, modo_teste: bool,
+                          stats: Optional[Dict] = None):
+        """Atualiza stats (as da instância, se não informadas) e registra no log o resultado final do arquivo"""
+        stats = self.stats if stats is None else stats
+        if resultado['erro']:
+            with self._lock_stats:
+                stats['erros'] += 1
+            self.logger.error(f"ERRO: {arquivo.name} - {resultado['erro']}")
+            return
+
+        resultado['sucesso'] = True
+        with self._lock_stats:
+            stats['processados'] += 1
+            stats['data_encontrada'] += 1
+            stats['conta_encontrada'] += 1
+
+        data = resultado['detalhes']['data']
+        self.logger.info(f"SUCESSO: {arquivo.name}")
+        self.logger.info(f"  -> {resultado['estrutura']}/{Path(resultado['arquivo_destino']).name}")
+        self.logger.info(f"  Data: {data['mes']}/{data['ano']} | Conta: {resultado['detalhes']['conta']['conta']}")
+        if resultado.get('acao') == 'movido':
+            self.logger.info("  Arquivo MOVIDO")
+        elif not modo_teste:
+            self.logger.info(f"  Arquivo COPIADO (original preservado)")
+
+        # Log avisos se existirem
+        for aviso in resultado['avisos']:
+            self.logger.warning(f"  AVISO: {aviso}")
+
+    def _registrar_resultado(self, banco_execucoes: BancoExecucoes, execucao_id: int,
+                             arquivo: Path, resultado: Dict, hash_conteudo: Optional[str] = None):
+        """Registra o resultado de um arquivo no banco de execuções (hash_conteudo: já calculado)"""
+        data = resultado['detalhes'].get('data', {})
+        conta = resultado['detalhes'].get('conta', {})
+        deteccao = {
+            'conta': conta.get('conta'),
+            'metodo_conta': conta.get('metodo'),
+            'mes': data.get('mes'),
+            'ano': data.get('ano')
+        }
+        banco_execucoes.registrar_arquivo(
+            execucao_id, arquivo,
+            'OK' if resultado['sucesso'] else 'ERRO',
+            deteccao,
+            resultado.get('arquivo_destino'),
+            resultado.get('erro'),
+            calcular_conteudo=resultado['sucesso'],
+            hash_conteudo=hash_conteudo
+        )
+
+    def organizar_arquivos(self, modo_teste: bool = True, max_workers: int = 4, retomar: bool = False,
+                           banco_execucoes: Optional[BancoExecucoes] = None,
+                           usar_processos: bool = False, incremental: bool = False,
+                           completo: bool = False) -> Dict:
+        """Organiza todos os arquivos com processamento paralelo opcional
+
+        Detecção em max_workers threads (ou processos, com usar_processos=True, para
+        execuções dominadas pelas regras de detecção), destinos definidos em série na
+        ordem dos caminhos e cópias em max_workers threads. O resultado é idêntico
+        ao de max_workers=1.
+
+        Com banco_execucoes, execuções reais são registradas no histórico SQLite e
+        retomar=True ignora arquivos já registrados (consulta indexada por caminho).
+
+        incremental=True usa o snapshot da origem: pastas inalteradas não são relidas
+        e só arquivos novos ou alterados são processados; completo=True ignora o
+        snapshot anterior e o reconstrói.
+        """
+        detalhes, relatorio = coletar(self.organizar_arquivos_iter(
+            modo_teste, max_workers, retomar, banco_execucoes, usar_processos, incremental, completo))
+        relatorio['detalhes'] = detalhes
+        return relatorio
+
+    def organizar_arquivos_iter(self, modo_teste: bool = True, max_workers: int = 4, retomar: bool = False,
+                                banco_execucoes: Optional[BancoExecucoes] = None,
+                                usar_processos: bool = False, incremental: bool = False,
+                                completo: bool = False,
+                                ignorar: Optional[Callable[[Path], bool]] = None,
+                                mover: bool = False,
+                                hashes: Optional[Dict[str, str]] = None,
+                                ao_definir_total: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        """Como organizar_arquivos, mas gera o resultado de cada arquivo assim que é concluído
+
+        Os estágios são encadeados sob demanda (no máximo alguns resultados por
+        worker em memória). O relatório, sem 'detalhes', é o valor de retorno do gerador.
+
+        ignorar: arquivos para os quais retorna True não são processados (ex.: retomada de um job)
+        mover: move os arquivos para o destino em vez de copiá-los (origem temporária)
+        hashes: {caminho: sha256} já calculados, registrados no banco sem reler os arquivos
+        ao_definir_total: chamado com o total de arquivos assim que a lista é conhecida
+
+        As stats são próprias de cada execução (relatorio['stats']): execuções
+        simultâneas na mesma instância não se misturam.
+        """
         self.logger.info("=== ORGANIZACAO LOCAL AVANCADA ===")
         self.logger.info(f"Origem: {self.diretorio_origem}")
         self.logger.info(f"Destino: {self.diretorio_destino}")
@@ -589,41 +428,102 @@ class OrganizadorLocalAvancado:
 
         # Encontra arquivos com progress
         self.logger.info("Buscando arquivos...")
-        arquivos = []
-        extensoes = ['*.pdf', '*.ofx', '*.PDF', '*.OFX']
-        for ext in extensoes:
-            encontrados = list(self.diretorio_origem.rglob(ext))
+        snapshot = SnapshotDiretorios(self.diretorio_origem, 'local', completo) if incremental else None
+
+        # Ordem fixa: a resolução de duplicatas depende da ordem de processamento
+        arquivos = sorted(Path(entrada.path) for entrada in descobrir_arquivos(self.diretorio_origem,
+                                                                               snapshot=snapshot))
+        if snapshot:
+            self.logger.info(f"Incremental: {snapshot.contagem['arquivos_inalterados']} arquivos inalterados ignorados")
+        for ext in ('.pdf', '.ofx'):
+            encontrados = sum(1 for a in arquivos if a.suffix.lower() == ext)
             if encontrados:
-                self.logger.info(f"  Encontrados {len(encontrados)} arquivos {ext}")
-            arquivos.extend(encontrados)
+                self.logger.info(f"  Encontrados {encontrados} arquivos {ext}")
+
+        if retomar and banco_execucoes:
+            total_encontrado = len(arquivos)
+            arquivos = [a for a in arquivos if not banco_execucoes.arquivo_processado(a)]
+            self.logger.info(f"Retomando: {total_encontrado - len(arquivos)} arquivos já processados")
 
-        self.stats['total_arquivos'] = len(arquivos)
+        if ignorar:
+            arquivos = [a for a in arquivos if not ignorar(a)]
+
+        stats = self._novas_stats(len(arquivos))
         self.logger.info(f"Total de arquivos: {len(arquivos)}")
+        if ao_definir_total:
+            ao_definir_total(len(arquivos))
+
+        registrar = banco_execucoes is not None and not modo_teste
+        execucao_id = None
+        if registrar:
+            execucao_id = banco_execucoes.iniciar_execucao(self.diretorio_origem, self.diretorio_destino,
+                                                           'LOCAL_AVANCADO')
 
         relatorio = {
             'total_arquivos': len(arquivos),
             'processados_com_sucesso': 0,
             'erros': 0,
-            'detalhes': [],
             'modo_teste': modo_teste,
             'metodo': 'LOCAL_AVANCADO',
             'inicio': datetime.now().isoformat()
         }
 
-        # Processa arquivos
-        for i, arquivo in enumerate(arquivos, 1):
-            self.logger.info(f"=== {i}/{len(arquivos)} ===")
+        max_workers = max(1, max_workers or 1)
+
+        # 2. Destinos (serial, em ordem)
+        def posicionar(resultados):
+            reservados = set()
+            for arquivo, resultado in zip(arquivos, resultados):
+                if not resultado['erro']:
+                    self._definir_destino(resultado, reservados)
+                yield arquivo, resultado
+
+        # 3. Cópias (paralelas)
+        def copiar(par):
+            arquivo, resultado = par
+            if not resultado['erro']:
+                self._copiar_arquivo(arquivo, resultado, modo_teste, mover)
+            return resultado
+
+        with ExitStack() as pilha:
+            # 1. Detecção (paralela)
+            resultados = self._detectar_em_paralelo(arquivos, max_workers, usar_processos, pilha)
+
+            pares = posicionar(resultados)
+            if max_workers > 1 and not modo_teste:
+                executor = pilha.enter_context(ThreadPoolExecutor(max_workers=max_workers))
+                resultados = mapear_em_ordem(executor, copiar, pares, max_workers * 2)
+            else:
+                resultados = map(copiar, pares)
+
+            # 4. Stats, log, relatório e banco (em ordem)
+            for i, (arquivo, resultado) in enumerate(zip(arquivos, resultados), 1):
+                self.logger.info(f"=== {i}/{len(arquivos)} ===")
+                self.logger.info(f"Processando: {arquivo.name}")
+                self._concluir_arquivo(arquivo, resultado, modo_teste, stats)
+
+                if resultado['sucesso']:
+                    relatorio['processados_com_sucesso'] += 1
+                    if snapshot and not modo_teste:
+                        snapshot.confirmar(arquivo)
+                else:
+                    relatorio['erros'] += 1
 
-            resultado = self.processar_arquivo(arquivo, modo_teste)
-            relatorio['detalhes'].append(resultado)
+                if registrar:
+                    self._registrar_resultado(banco_execucoes, execucao_id, arquivo, resultado,
+                                              (hashes or {}).get(str(arquivo)))
 
-            if resultado['sucesso']:
-                relatorio['processados_com_sucesso'] += 1
-            else:
-                relatorio['erros'] += 1
+                yield resultado
+
+        if registrar:
+            banco_execucoes.finalizar_execucao(execucao_id)
+
+        if snapshot:
+            snapshot.salvar()
+            relatorio['snapshot'] = snapshot.obter_estatisticas()
 
         relatorio['fim'] = datetime.now().isoformat()
-        relatorio['stats'] = self.stats
+        relatorio['stats'] = stats
 
         self.logger.info("=== ORGANIZACAO CONCLUIDA ===")
         self.logger.info(f"Sucessos: {relatorio['processados_com_sucesso']}")
@@ -631,6 +531,49 @@ class OrganizadorLocalAvancado:
 
         return relatorio
 
+    def analisar_arquivo(self, arquivo: Path) -> Dict:
+        """Detecta data e conta de um arquivo, sem definir destino nem copiar"""
+        return self._detectar_arquivo(Path(arquivo))
+
+    def _detectar_em_paralelo(self, arquivos: List[Path], max_workers: int,
+                              usar_processos: bool, pilha: ExitStack) -> Iterator[Dict]:
+        """Gera _detectar_arquivo de cada arquivo na ordem, sob demanda (pools fechados pela pilha)"""
+        if max_workers <= 1 or len(arquivos) <= 1:
+            return map(self._detectar_arquivo, arquivos)
+
+        if usar_processos:
+            # Lotes por tarefa para diluir o custo de comunicação entre processos
+            tamanho = max(1, min(256, len(arquivos) // (max_workers * 4)))
+            lotes = (arquivos[i:i + tamanho] for i in range(0, len(arquivos), tamanho))
+            executor = pilha.enter_context(
+                ProcessPoolExecutor(max_workers=max_workers, initializer=_inicializar_processo_deteccao))
+            return chain.from_iterable(mapear_em_ordem(executor, _detectar_lote_em_processo,
+                                                       lotes, max_workers * 2))
+
+        executor = pilha.enter_context(ThreadPoolExecutor(max_workers=max_workers))
+        return mapear_em_ordem(executor, self._detectar_arquivo, arquivos, max_workers * 4)
+
+    @classmethod
+    def somente_deteccao(cls, logger: Optional[logging.Logger] = None) -> 'OrganizadorLocalAvancado':
+        """Instância apenas para detecção (sem pastas nem logging em arquivo)"""
+        detector = cls.__new__(cls)
+        detector.logger = logger or logging.getLogger(__name__)
+        return detector
+
+
+# Detector de cada processo do pool (criado pelo initializer, sem logging em arquivo)
+_detector_processo = None
+
+
+def _inicializar_processo_deteccao():
+    global _detector_processo
+    _detector_processo = OrganizadorLocalAvancado.somente_deteccao()
+
+
+def _detectar_lote_em_processo(arquivos: List[Path]) -> List[Dict]:
+    return [_detector_processo._detectar_arquivo(arquivo) for arquivo in arquivos]
+
+
 def main():
     """Função principal para teste"""
     import sys
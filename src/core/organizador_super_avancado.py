@@ -11,13 +11,14 @@ import json
 import shutil
 from datetime import datetime
 from pathlib import Path
-import re
 import logging
 from typing import Dict, List, Optional
 
 # Adiciona o diretório utils ao path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utils'))
 from relatorio_manager import relatorio_manager
+from descoberta import descobrir_arquivos
+from regras_deteccao import MOTOR_SUPER, NOMES_MESES, detectar_banco, detectar_tipo_conta
 
 class OrganizadorSuperAvancado:
     def __init__(self, diretorio_origem: str, diretorio_destino: str):
@@ -26,92 +27,6 @@ class OrganizadorSuperAvancado:
         self.diretorio_destino = Path(diretorio_destino)
         self.setup_logging()
 
-        # Padrões SUPER AVANÇADOS baseados em dados reais
-        self.padroes = {
-            # === DATAS ===
-            'data_mm_yyyy': re.compile(r'(\d{1,2})[\/\-\.](\d{4})', re.IGNORECASE),
-            'data_mm_yy': re.compile(r'(\d{1,2})[\/\-\.](\d{2})', re.IGNORECASE),
-            'data_yyyy_mm': re.compile(r'(\d{4})[\/\-\.](\d{1,2})', re.IGNORECASE),
-            'data_yyyymm': re.compile(r'(\d{4})(\d{2})', re.IGNORECASE),
-            'data_timestamp': re.compile(r'(\d{4})-(\d{2})-(\d{2})', re.IGNORECASE),
-            'data_timestamp_completo': re.compile(r'(\d{4})-(\d{2})-(\d{2})-\d{2}-\d{2}-\d{2}', re.IGNORECASE),
-
-            # === MESES ===
-            'mes_nome_completo': re.compile(r'(JANEIRO|FEVEREIRO|MARÇO|MARCO|ABRIL|MAIO|JUNHO|JULHO|AGOSTO|SETEMBRO|OUTUBRO|NOVEMBRO|DEZEMBRO)', re.IGNORECASE),
-            'mes_nome_abrev': re.compile(r'(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)', re.IGNORECASE),
-
-            # === CONTAS BANCÁRIAS - SUPER EXPANDIDAS ===
-            'conta_inicio_mes': re.compile(r'^(\d{4,8}[-]?[A-Z0-9])\s+(JANEIRO|FEVEREIRO|MARÇO|MARCO|ABRIL|MAIO|JUNHO|JULHO|AGOSTO|SETEMBRO|OUTUBRO|NOVEMBRO|DEZEMBRO)', re.IGNORECASE),
-            'conta_inicio_mes_abrev': re.compile(r'^(\d{4,8}[-]?[A-Z0-9])\s+(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)', re.IGNORECASE),
-            'conta_mes_inicio': re.compile(r'^(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)\s+(\d{4,8}[-]?[A-Z0-9])', re.IGNORECASE),
-            'conta_ext_simples': re.compile(r'^EXT\s+(\d+[-]?\w*)', re.IGNORECASE),
-            'conta_ext': re.compile(r'EXT\w*\s+\w*\s*(\d+[-]?\w*)', re.IGNORECASE),
-            'conta_hifen': re.compile(r'(\d{3,8}[-]\d{1})', re.IGNORECASE),
-            'conta_hifen_letra': re.compile(r'(\d{3,8}[-][A-Z0-9]{1})', re.IGNORECASE),
-            'conta_hifen_espaco': re.compile(r'(\d{4,8}[-]\s*[A-Z0-9])', re.IGNORECASE),
-            'conta_extrato': re.compile(r'[Ee]xtrato\s*(\d+)', re.IGNORECASE),
-            'conta_extrato_longo': re.compile(r'[Ee]xtrato(\d{8,})', re.IGNORECASE),
-            'conta_caixa': re.compile(r'CAIXA\w*\s+\w*\s+(\d+[-]?\w*)', re.IGNORECASE),
-            'conta_banco': re.compile(r'(?:BANCO|CONTA|CC|AG)\s*(\d+[-]?\w*)', re.IGNORECASE),
-            'conta_gfi': re.compile(r'GFI(\d+)', re.IGNORECASE),
-            'conta_timestamp_longo': re.compile(r'(\d{15,})', re.IGNORECASE),
-            'conta_codigo_data': re.compile(r'(\d{8,12})(?=\d{4})', re.IGNORECASE),
-            'conta_simples': re.compile(r'(?<![\d])(\d{4,8})(?![\d])', re.IGNORECASE),
-
-            # === NOVOS PADRÕES AVANÇADOS ===
-            'conta_prefixo_037': re.compile(r'(\d{21})', re.IGNORECASE),  # 037550146000729800451
-            'conta_prefixo_375': re.compile(r'(375\d{13})', re.IGNORECASE),  # 3755000600647051
-
-            # === TIPOS DE CONTA ===
-            'tipo_investimento': re.compile(r'(INVEST|INEST)', re.IGNORECASE),
-            'tipo_poupanca': re.compile(r'(POUP|POUPANÇA)', re.IGNORECASE),
-            'tipo_corrente': re.compile(r'(CORRENTE|CC)', re.IGNORECASE),
-
-            # === BANCOS ===
-            'banco_caixa': re.compile(r'(CAIXA)', re.IGNORECASE),
-            'banco_bb': re.compile(r'(BANCO.DO.BRASIL|BB)', re.IGNORECASE),
-            'banco_itau': re.compile(r'(ITAU|ITAÚ)', re.IGNORECASE),
-            'banco_bradesco': re.compile(r'(BRADESCO)', re.IGNORECASE),
-            'banco_santander': re.compile(r'(SANTANDER)', re.IGNORECASE),
-
-            # === ANOS ===
-            'ano_4digitos': re.compile(r'(20\d{2})', re.IGNORECASE),
-            'ano_2digitos': re.compile(r'(\d{2})(?=\D|$)', re.IGNORECASE),
-        }
-
-        # Mapeamento de meses
-        self.meses_nomes = {
-            'JANEIRO': '01', 'JAN': '01',
-            'FEVEREIRO': '02', 'FEV': '02',
-            'MARÇO': '03', 'MARCO': '03', 'MAR': '03',
-            'ABRIL': '04', 'ABR': '04',
-            'MAIO': '05', 'MAI': '05',
-            'JUNHO': '06', 'JUN': '06',
-            'JULHO': '07', 'JUL': '07',
-            'AGOSTO': '08', 'AGO': '08',
-            'SETEMBRO': '09', 'SET': '09',
-            'OUTUBRO': '10', 'OUT': '10',
-            'NOVEMBRO': '11', 'NOV': '11',
-            'DEZEMBRO': '12', 'DEZ': '12'
-        }
-
-        # Bancos conhecidos
-        self.bancos_conhecidos = {
-            'CAIXA': 'CAIXA',
-            'BB': 'BANCO_DO_BRASIL',
-            'ITAU': 'ITAU',
-            'BRADESCO': 'BRADESCO',
-            'SANTANDER': 'SANTANDER'
-        }
-
-        # Tipos de conta
-        self.tipos_conta = {
-            'INVEST': 'INVESTIMENTO',
-            'INEST': 'INVESTIMENTO',
-            'POUP': 'POUPANCA',
-            'CC': 'CORRENTE'
-        }
-
         self.stats = {
             'total_arquivos': 0,
             'processados': 0,
@@ -136,158 +51,23 @@ class OrganizadorSuperAvancado:
 
     def detectar_banco(self, texto: str) -> Dict:
         """Detecta banco/instituição financeira"""
-        texto_upper = texto.upper()
-
-        for padrao_nome in ['banco_caixa', 'banco_bb', 'banco_itau', 'banco_bradesco', 'banco_santander']:
-            match = self.padroes[padrao_nome].search(texto_upper)
-            if match:
-                banco_detectado = match.group(1)
-                banco_padronizado = self.bancos_conhecidos.get(banco_detectado.upper(), banco_detectado)
-                return {
-                    'banco': banco_padronizado,
-                    'original': banco_detectado,
-                    'encontrado': True
-                }
-
-        return {'banco': None, 'original': None, 'encontrado': False}
+        return detectar_banco(texto)
 
     def detectar_tipo_conta(self, texto: str) -> Dict:
         """Detecta tipo de conta (corrente, poupança, investimento)"""
-        texto_upper = texto.upper()
-
-        for padrao_nome in ['tipo_investimento', 'tipo_poupanca', 'tipo_corrente']:
-            match = self.padroes[padrao_nome].search(texto_upper)
-            if match:
-                tipo_detectado = match.group(1)
-                tipo_padronizado = self.tipos_conta.get(tipo_detectado.upper(), tipo_detectado)
-                return {
-                    'tipo': tipo_padronizado,
-                    'original': tipo_detectado,
-                    'encontrado': True
-                }
-
-        return {'tipo': 'PADRAO', 'original': None, 'encontrado': False}
+        return detectar_tipo_conta(texto)
 
     def detectar_data(self, texto: str, caminho_completo: str = "") -> Dict:
         """Detecta mês e ano no texto usando múltiplos padrões"""
-        texto_completo = f"{texto} {caminho_completo}".upper()
-
-        mes = None
-        ano = None
-
-        # 1. Busca mês por nome
-        for padrao_nome in ['mes_nome_completo', 'mes_nome_abrev']:
-            match = self.padroes[padrao_nome].search(texto_completo)
-            if match:
-                nome_mes = match.group(1).upper()
-                mes = self.meses_nomes.get(nome_mes)
-                if mes:
-                    break
-
-        # 2. Busca ano
-        match = self.padroes['ano_4digitos'].search(texto_completo)
-        if match:
-            ano = match.group(1)
-
-        # 3. Busca datas numéricas e timestamps
-        padroes_data = [
-            ('data_timestamp_completo', [1, 2]),  # YYYY-MM-DD-HH-MM-SS
-            ('data_timestamp', [1, 2]),           # YYYY-MM-DD
-            ('data_mm_yyyy', [2, 1]),             # MM/YYYY
-            ('data_yyyy_mm', [1, 2]),             # YYYY/MM
-            ('data_yyyymm', [1, 2]),              # YYYYMM
-            ('data_mm_yy', [2, 1])                # MM/YY
-        ]
-
-        for padrao_nome, indices in padroes_data:
-            if mes and ano:
-                break
-
-            match = self.padroes[padrao_nome].search(texto_completo)
-            if match:
-                ano_idx, mes_idx = indices
-
-                if not ano and len(match.groups()) >= ano_idx:
-                    ano_candidato = match.group(ano_idx)
-                    if len(ano_candidato) == 2:
-                        ano_candidato = f"20{ano_candidato}"
-                    ano = ano_candidato
-
-                if not mes and len(match.groups()) >= mes_idx:
-                    mes_candidato = match.group(mes_idx).zfill(2)
-                    if 1 <= int(mes_candidato) <= 12:
-                        mes = mes_candidato
-
-        # Validações
-        if mes and not (1 <= int(mes) <= 12):
-            mes = None
-
-        if ano and len(ano) == 2:
-            ano = f"20{ano}"
-
-        if ano and not (2020 <= int(ano) <= 2030):
-            ano = None
-
-        return {
-            'mes': mes,
-            'ano': ano,
-            'encontrado': bool(mes and ano)
-        }
+        return MOTOR_SUPER.detectar_data(texto, caminho_completo)
 
     def detectar_conta(self, texto: str) -> Dict:
         """Detecta número da conta usando múltiplos padrões"""
-        texto_upper = texto.upper()
-        conta = None
-        metodo = None
-
-        # Lista de padrões em ordem de prioridade - SUPER EXPANDIDA
-        padroes_conta = [
-            ('conta_prefixo_037', 'PREFIXO_037'),
-            ('conta_prefixo_375', 'PREFIXO_375'),
-            ('conta_inicio_mes', 'INICIO_MES'),
-            ('conta_inicio_mes_abrev', 'INICIO_MES_ABREV'),
-            ('conta_mes_inicio', 'MES_INICIO'),
-            ('conta_ext_simples', 'EXT_SIMPLES'),
-            ('conta_ext', 'EXT'),
-            ('conta_caixa', 'CAIXA'),
-            ('conta_extrato_longo', 'EXTRATO_LONGO'),
-            ('conta_extrato', 'EXTRATO'),
-            ('conta_gfi', 'GFI'),
-            ('conta_banco', 'BANCO'),
-            ('conta_hifen_espaco', 'HIFEN_ESPACO'),
-            ('conta_hifen', 'HIFEN'),
-            ('conta_hifen_letra', 'HIFEN_LETRA'),
-            ('conta_timestamp_longo', 'TIMESTAMP_LONGO'),
-            ('conta_codigo_data', 'CODIGO_DATA'),
-            ('conta_simples', 'SIMPLES')
-        ]
-
-        for padrao_nome, metodo_nome in padroes_conta:
-            match = self.padroes[padrao_nome].search(texto_upper)
-            if match:
-                # Tratamento especial para diferentes padrões
-                if padrao_nome == 'conta_mes_inicio':
-                    conta_bruta = match.group(2)
-                elif padrao_nome in ['conta_inicio_mes', 'conta_inicio_mes_abrev']:
-                    conta_bruta = match.group(1)
-                else:
-                    conta_bruta = match.group(1)
-
-                # Limpa a conta
-                conta = re.sub(r'[^\w]', '', conta_bruta)
-                metodo = metodo_nome
-                break
-
-        # Validações
-        if conta and len(conta) < 3:
-            conta = None
-            metodo = None
+        return MOTOR_SUPER.detectar_conta(texto)
 
-        return {
-            'conta': conta,
-            'metodo': metodo,
-            'encontrado': bool(conta)
-        }
+    def detectar_lote(self, nomes: List[str], caminhos: Optional[List[str]] = None) -> Dict[str, List]:
+        """Detecta data e conta de vários arquivos de uma vez, em colunas (ver MotorDeteccao.detectar_lote)"""
+        return MOTOR_SUPER.detectar_lote(nomes, caminhos)
 
     def classificar_arquivo(self, arquivo: Path, deteccoes: Dict) -> Dict:
         """Classifica o arquivo com informações avançadas"""
@@ -394,13 +174,7 @@ class OrganizadorSuperAvancado:
                 pasta_conta = f"{classificacao['banco']['banco']}_{pasta_conta}"
 
             # Pasta por data
-            meses_nomes = {
-                '01': 'JANEIRO', '02': 'FEVEREIRO', '03': 'MARÇO',
-                '04': 'ABRIL', '05': 'MAIO', '06': 'JUNHO',
-                '07': 'JULHO', '08': 'AGOSTO', '09': 'SETEMBRO',
-                '10': 'OUTUBRO', '11': 'NOVEMBRO', '12': 'DEZEMBRO'
-            }
-            pasta_data = f"{ano}_{mes}_{meses_nomes.get(mes, 'DESCONHECIDO')}"
+            pasta_data = f"{ano}_{mes}_{NOMES_MESES.get(mes, 'DESCONHECIDO')}"
 
             # Se detectou tipo, cria subpasta
             if classificacao['tipo_conta']['encontrado'] and classificacao['tipo_conta']['tipo'] != 'PADRAO':
@@ -461,9 +235,7 @@ class OrganizadorSuperAvancado:
         self.logger.info(f"Modo teste: {modo_teste}")
 
         # Encontra arquivos
-        arquivos = []
-        for ext in ['*.pdf', '*.ofx']:
-            arquivos.extend(self.diretorio_origem.rglob(ext))
+        arquivos = [Path(entrada.path) for entrada in descobrir_arquivos(self.diretorio_origem)]
 
         self.stats['total_arquivos'] = len(arquivos)
         self.logger.info(f"Total de arquivos: {len(arquivos)}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Banco de Execuções (SQLite)
+Histórico opcional de execuções para retomada indexada e consultas entre execuções
+"""
+
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origem TEXT NOT NULL,
+    destino TEXT,
+    metodo TEXT,
+    iniciada_em TEXT NOT NULL,
+    finalizada_em TEXT
+);
+
+CREATE TABLE IF NOT EXISTS arquivos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    execucao_id INTEGER NOT NULL REFERENCES execucoes(id),
+    caminho TEXT NOT NULL,
+    tamanho INTEGER,
+    mtime REAL,
+    hash TEXT,
+    banco TEXT,
+    conta TEXT,
+    mes TEXT,
+    ano TEXT,
+    deteccao TEXT,
+    destino TEXT,
+    status TEXT NOT NULL,
+    erro TEXT,
+    processado_em TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_arquivos_caminho ON arquivos(caminho);
+CREATE INDEX IF NOT EXISTS idx_arquivos_hash ON arquivos(hash);
+CREATE INDEX IF NOT EXISTS idx_arquivos_conta_ano ON arquivos(conta, ano, mes);
+"""
+
+
+def calcular_hash(caminho, tamanho_bloco: int = 1024 * 1024) -> str:
+    """Calcula SHA-256 do conteúdo do arquivo"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class BancoExecucoes:
+    """Armazena execuções e arquivos processados em SQLite (modo WAL)"""
+
+    def __init__(self, caminho_banco: str, tamanho_lote: int = 200):
+        self.caminho_banco = Path(caminho_banco)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        self.tamanho_lote = tamanho_lote
+
+        self._lock = threading.Lock()
+        self._pendentes = []
+        # Índices dos registros pendentes: as consultas por caminho/hash não forçam a gravação do lote
+        self._caminhos_pendentes = set()
+        self._hashes_pendentes = {}  # hash -> destino (apenas status OK)
+
+        self.conexao = sqlite3.connect(str(self.caminho_banco), check_same_thread=False)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.executescript(ESQUEMA)
+        self.conexao.commit()
+
+    def iniciar_execucao(self, origem, destino=None, metodo: str = None) -> int:
+        """Registra o início de uma execução e retorna seu id"""
+        with self._lock:
+            cursor = self.conexao.execute(
+                'INSERT INTO execucoes (origem, destino, metodo, iniciada_em) VALUES (?, ?, ?, ?)',
+                (str(origem), str(destino) if destino else None, metodo, datetime.now().isoformat())
+            )
+            self.conexao.commit()
+            return cursor.lastrowid
+
+    def finalizar_execucao(self, execucao_id: int):
+        """Grava registros pendentes e marca o fim da execução"""
+        with self._lock:
+            self._gravar_pendentes()
+            self.conexao.execute(
+                'UPDATE execucoes SET finalizada_em = ? WHERE id = ?',
+                (datetime.now().isoformat(), execucao_id)
+            )
+            self.conexao.commit()
+
+    def registrar_arquivo(self, execucao_id: int, caminho, status: str, deteccao: Dict = None,
+                          destino=None, erro: str = None, calcular_conteudo: bool = True,
+                          hash_conteudo: Optional[str] = None):
+        """Registra o resultado de um arquivo (gravado em lotes)
+
+        hash_conteudo: SHA-256 já calculado (ex.: durante o upload); evita reler o
+        arquivo. Se o original não existe mais (movido), usa o stat do destino.
+        """
+        caminho = Path(caminho)
+        deteccao = deteccao or {}
+
+        tamanho = mtime = None
+        for alvo in (caminho, destino):
+            if not alvo:
+                continue
+            try:
+                stat = Path(alvo).stat()
+                tamanho, mtime = stat.st_size, stat.st_mtime
+                if calcular_conteudo and hash_conteudo is None:
+                    hash_conteudo = calcular_hash(alvo)
+                break
+            except OSError:
+                pass
+
+        registro = (
+            execucao_id, str(caminho), tamanho, mtime, hash_conteudo,
+            deteccao.get('banco'), deteccao.get('conta'), deteccao.get('mes'), deteccao.get('ano'),
+            json.dumps(deteccao, ensure_ascii=False, default=str),
+            str(destino) if destino else None, status, erro, datetime.now().isoformat()
+        )
+
+        with self._lock:
+            self._pendentes.append(registro)
+            self._caminhos_pendentes.add(str(caminho))
+            if hash_conteudo and status == 'OK':
+                self._hashes_pendentes.setdefault(hash_conteudo, registro[10])
+            if len(self._pendentes) >= self.tamanho_lote:
+                self._gravar_pendentes()
+
+    def _gravar_pendentes(self):
+        """Grava registros pendentes em uma única transação"""
+        if not self._pendentes:
+            return
+        with self.conexao:
+            self.conexao.executemany(
+                'INSERT INTO arquivos (execucao_id, caminho, tamanho, mtime, hash, banco, conta, mes, ano, '
+                'deteccao, destino, status, erro, processado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                self._pendentes
+            )
+        self._pendentes = []
+        self._caminhos_pendentes = set()
+        self._hashes_pendentes = {}
+
+    def arquivo_processado(self, caminho) -> bool:
+        """Verifica (via índice) se o arquivo já foi processado em alguma execução"""
+        caminho = str(caminho)
+        with self._lock:
+            if caminho in self._caminhos_pendentes:
+                return True
+            linha = self.conexao.execute(
+                'SELECT 1 FROM arquivos WHERE caminho = ? LIMIT 1', (caminho,)
+            ).fetchone()
+        return linha is not None
+
+    def hash_existente(self, hash_conteudo: str) -> Optional[str]:
+        """Retorna o destino de um arquivo já organizado com o mesmo conteúdo"""
+        with self._lock:
+            linha = self.conexao.execute(
+                "SELECT destino FROM arquivos WHERE hash = ? AND status = 'OK' LIMIT 1", (hash_conteudo,)
+            ).fetchone()
+            if linha:
+                return linha[0]
+            return self._hashes_pendentes.get(hash_conteudo)
+
+    def meses_faltantes(self, conta: str, ano: str) -> List[str]:
+        """Lista os meses sem extrato organizado para a conta no ano"""
+        with self._lock:
+            self._gravar_pendentes()
+            linhas = self.conexao.execute(
+                "SELECT DISTINCT mes FROM arquivos WHERE conta = ? AND ano = ? AND status = 'OK'",
+                (str(conta), str(ano))
+            ).fetchall()
+        encontrados = {linha[0] for linha in linhas}
+        return [f"{m:02d}" for m in range(1, 13) if f"{m:02d}" not in encontrados]
+
+    def historico_arquivo(self, caminho) -> List[Dict]:
+        """Retorna todos os registros de um arquivo, do mais recente ao mais antigo"""
+        with self._lock:
+            self._gravar_pendentes()
+            cursor = self.conexao.execute(
+                'SELECT execucao_id, status, banco, conta, mes, ano, destino, erro, processado_em '
+                'FROM arquivos WHERE caminho = ? ORDER BY id DESC', (str(caminho),)
+            )
+            colunas = [c[0] for c in cursor.description]
+            return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+    def fechar(self):
+        """Grava pendências e fecha a conexão"""
+        with self._lock:
+            self._gravar_pendentes()
+            self.conexao.close()
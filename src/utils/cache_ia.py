@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de Análises da IA
+Cache persistente (SQLite) endereçado pelo conteúdo do arquivo, com remoção LRU
+limitada por tamanho
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from banco_execucoes import calcular_hash
+
+
+class CacheIA:
+    """Guarda o JSON interpretado das respostas da IA por hash do arquivo"""
+
+    def __init__(self, caminho_banco: str, tamanho_max_mb: float = 50):
+        self.caminho_banco = Path(caminho_banco)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        self.tamanho_max = int(tamanho_max_mb * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self.stats = {'acertos': 0, 'falhas': 0, 'removidos': 0}
+
+        self.conexao = sqlite3.connect(str(self.caminho_banco), check_same_thread=False)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'chave TEXT PRIMARY KEY, valor TEXT NOT NULL, tamanho INTEGER NOT NULL, acessado_em REAL NOT NULL)'
+        )
+        self.conexao.execute('CREATE INDEX IF NOT EXISTS idx_cache_acessado ON cache(acessado_em)')
+        self.conexao.commit()
+
+        self.tamanho_atual = self.conexao.execute('SELECT COALESCE(SUM(tamanho), 0) FROM cache').fetchone()[0]
+
+    @staticmethod
+    def gerar_chave(caminho, tipo: str, versao_prompt, modelo: str) -> str:
+        """Chave = hash do conteúdo + tipo de análise + versão do prompt + modelo"""
+        identificacao = f"{calcular_hash(caminho)}|{tipo}|{versao_prompt}|{modelo}"
+        return hashlib.sha256(identificacao.encode('utf-8')).hexdigest()
+
+    def obter(self, chave: str) -> Optional[Dict]:
+        """Retorna a análise guardada (e marca como usada recentemente)"""
+        with self._lock:
+            linha = self.conexao.execute('SELECT valor FROM cache WHERE chave = ?', (chave,)).fetchone()
+            if linha is None:
+                self.stats['falhas'] += 1
+                return None
+
+            self.conexao.execute('UPDATE cache SET acessado_em = ? WHERE chave = ?', (time.time(), chave))
+            self.conexao.commit()
+            self.stats['acertos'] += 1
+            return json.loads(linha[0])
+
+    def guardar(self, chave: str, valor: Dict):
+        """Guarda uma análise, removendo as menos usadas se passar do limite"""
+        texto = json.dumps(valor, ensure_ascii=False)
+        tamanho = len(texto.encode('utf-8'))
+
+        with self._lock:
+            anterior = self.conexao.execute('SELECT tamanho FROM cache WHERE chave = ?', (chave,)).fetchone()
+            self.conexao.execute(
+                'INSERT OR REPLACE INTO cache (chave, valor, tamanho, acessado_em) VALUES (?, ?, ?, ?)',
+                (chave, texto, tamanho, time.time())
+            )
+            self.tamanho_atual += tamanho - (anterior[0] if anterior else 0)
+            self._remover_excedente()
+            self.conexao.commit()
+
+    def _remover_excedente(self):
+        """Remove entradas menos recentemente usadas até caber no limite"""
+        if self.tamanho_atual <= self.tamanho_max:
+            return
+
+        cursor = self.conexao.execute('SELECT chave, tamanho FROM cache ORDER BY acessado_em')
+        remover = []
+        for chave, tamanho in cursor:
+            if self.tamanho_atual <= self.tamanho_max:
+                break
+            remover.append((chave,))
+            self.tamanho_atual -= tamanho
+
+        self.conexao.executemany('DELETE FROM cache WHERE chave = ?', remover)
+        self.stats['removidos'] += len(remover)
+
+    def obter_estatisticas(self) -> Dict:
+        """Retorna acertos, falhas, remoções e ocupação do cache"""
+        with self._lock:
+            return dict(self.stats, tamanho_bytes=self.tamanho_atual, tamanho_max_bytes=self.tamanho_max)
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self.conexao.execute('DELETE FROM cache')
+            self.conexao.commit()
+            self.tamanho_atual = 0
+
+    def fechar(self):
+        with self._lock:
+            self.conexao.close()
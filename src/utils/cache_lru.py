@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache LRU
+Cache em memória limitado por número de entradas, com remoção da entrada menos
+recentemente usada e contadores de acertos, falhas e remoções
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class CacheLRU:
+    """Cache thread-safe de valores por chave (a própria entrada, ex.: uma tupla)"""
+
+    def __init__(self, max_entradas: int = 50000):
+        self.max_entradas = max(1, max_entradas)
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'acertos': 0, 'falhas': 0, 'removidos': 0}
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        """Retorna o valor guardado (e marca como usado recentemente); None se ausente"""
+        with self._lock:
+            valor = self._itens.get(chave)
+            if valor is None:
+                self.stats['falhas'] += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.stats['acertos'] += 1
+            return valor
+
+    def guardar(self, chave: Hashable, valor: Any):
+        """Guarda um valor (não None), removendo os menos usados se passar do limite"""
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            self._remover_excedente()
+
+    def redimensionar(self, max_entradas: int):
+        """Altera o limite de entradas, removendo o excedente"""
+        with self._lock:
+            self.max_entradas = max(1, max_entradas)
+            self._remover_excedente()
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._itens.clear()
+
+    def _remover_excedente(self):
+        while len(self._itens) > self.max_entradas:
+            self._itens.popitem(last=False)
+            self.stats['removidos'] += 1
+
+    def obter_estatisticas(self) -> Dict:
+        """Retorna acertos, falhas, remoções e ocupação do cache"""
+        with self._lock:
+            consultas = self.stats['acertos'] + self.stats['falhas']
+            return dict(self.stats, entradas=len(self._itens), max=self.max_entradas,
+                        taxa_acerto=round(self.stats['acertos'] / consultas, 4) if consultas else None)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Descoberta de Arquivos
+Percorre a árvore uma única vez com os.scandir, filtrando extensões sem
+diferenciar maiúsculas/minúsculas e respeitando as opções de config.py
+"""
+
+import os
+import sys
+import stat
+from typing import Iterable, Iterator
+
+# Adiciona o diretório config ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'config'))
+import config
+
+EXTENSOES_EXTRATOS = ('.pdf', '.ofx')
+
+
+def _oculto(entrada: os.DirEntry) -> bool:
+    """Arquivo/pasta oculto (prefixo '.' ou atributo oculto no Windows)"""
+    if entrada.name.startswith('.'):
+        return True
+    if os.name != 'nt':
+        return False
+    # No Windows o stat vem da própria listagem do diretório (sem chamada extra)
+    return bool(entrada.stat(follow_symlinks=False).st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN)
+
+
+def descobrir_arquivos(raiz, extensoes: Iterable[str] = EXTENSOES_EXTRATOS, recursivo: bool = None,
+                       ignorar_ocultos: bool = None, limite_mb: float = None,
+                       snapshot=None) -> Iterator[os.DirEntry]:
+    """
+    Gera os arquivos encontrados sob raiz à medida que são lidos
+
+    Args:
+        raiz: Pasta inicial
+        extensoes: Extensões aceitas (com ponto, qualquer caixa)
+        recursivo: Desce em subpastas (padrão: config.PROCESSAR_SUBDIRETORIOS)
+        ignorar_ocultos: Ignora arquivos e pastas ocultos (padrão: config.IGNORAR_ARQUIVOS_OCULTOS)
+        limite_mb: Ignora arquivos maiores que o limite; 0 = sem limite
+            (padrão: config.LIMITE_TAMANHO_ARQUIVO_MB)
+        snapshot: SnapshotDiretorios opcional; pastas inalteradas não são relidas
+            e só arquivos novos ou alterados são gerados
+
+    Yields:
+        os.DirEntry: Entradas de arquivo (o stat fica em cache na própria entrada)
+    """
+    extensoes = tuple(e.lower() for e in extensoes)
+    # getattr: o módulo config pode ter sido resolvido para a pasta config/ (namespace)
+    if recursivo is None:
+        recursivo = getattr(config, 'PROCESSAR_SUBDIRETORIOS', True)
+    if ignorar_ocultos is None:
+        ignorar_ocultos = getattr(config, 'IGNORAR_ARQUIVOS_OCULTOS', True)
+    if limite_mb is None:
+        limite_mb = getattr(config, 'LIMITE_TAMANHO_ARQUIVO_MB', 0)
+    limite_bytes = limite_mb * 1024 * 1024 if limite_mb else 0
+
+    pendentes = [(os.fspath(raiz), None)]  # (pasta, mtime_ns quando já conhecido)
+    while pendentes:
+        pasta, mtime = pendentes.pop()
+
+        if snapshot is not None:
+            try:
+                mtime = mtime if mtime is not None else os.stat(pasta).st_mtime_ns
+            except OSError:
+                continue
+            gravadas = snapshot.subpastas_inalteradas(pasta, mtime)
+            if gravadas is not None:
+                if recursivo:
+                    pendentes.extend((os.path.join(pasta, nome), None) for nome in reversed(gravadas))
+                continue
+
+        try:
+            entradas = os.scandir(pasta)
+        except OSError:
+            continue  # Pasta sem permissão ou removida durante a varredura
+
+        with entradas:
+            subpastas = []
+            for entrada in entradas:
+                try:
+                    if ignorar_ocultos and _oculto(entrada):
+                        continue
+
+                    # Links para pastas não são seguidos (evita ciclos), como em Path.rglob
+                    if entrada.is_dir(follow_symlinks=False):
+                        subpastas.append(entrada)
+                        continue
+
+                    if not entrada.name.lower().endswith(extensoes) or not entrada.is_file():
+                        continue
+
+                    if limite_bytes and entrada.stat().st_size > limite_bytes:
+                        continue
+
+                    if snapshot is not None and not snapshot.arquivo_novo(entrada):
+                        continue
+                except OSError:
+                    continue
+
+                yield entrada
+
+        if snapshot is not None:
+            snapshot.registrar_diretorio(pasta, mtime, [e.name for e in subpastas])
+
+        # Visita as subpastas na ordem em que apareceram
+        if recursivo:
+            for entrada in reversed(subpastas):
+                try:
+                    mtime = entrada.stat(follow_symlinks=False).st_mtime_ns if snapshot is not None else None
+                except OSError:
+                    continue
+                pendentes.append((entrada.path, mtime))
+
+    if snapshot is not None:
+        snapshot.varredura_concluida = True
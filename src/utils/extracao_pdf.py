@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extração de Texto em Processos
+Extrai o texto da primeira página de PDFs em um pool de processos, com limite de
+tempo (e de CPU, onde suportado) por arquivo
+"""
+
+import time
+import multiprocessing
+from collections import deque
+
+try:
+    import PyPDF2
+    PYPDF2_DISPONIVEL = True
+except ImportError:
+    PYPDF2_DISPONIVEL = False
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def extrair_texto(caminho, max_chars: int = 2000, limite_cpu: float = None) -> str:
+    """Extrai o texto da primeira página (executado no processo trabalhador)"""
+    if resource and limite_cpu:
+        # O limite é relativo ao tempo de CPU já consumido pelo processo; ao
+        # estourar, o sistema encerra o trabalhador e o arquivo conta como timeout
+        uso = resource.getrusage(resource.RUSAGE_SELF)
+        _, maximo = resource.getrlimit(resource.RLIMIT_CPU)
+        suave = int(uso.ru_utime + uso.ru_stime + limite_cpu) + 1
+        if maximo == resource.RLIM_INFINITY or suave <= maximo:
+            resource.setrlimit(resource.RLIMIT_CPU, (suave, maximo))
+
+    if not PYPDF2_DISPONIVEL:
+        return ""
+
+    with open(caminho, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        if len(reader.pages) > 0:
+            return (reader.pages[0].extract_text() or "")[:max_chars]
+    return ""
+
+
+class ExtratorPDF:
+    """Pool de processos para extração de texto com timeout por arquivo"""
+
+    def __init__(self, processos: int = None, timeout: float = 20.0, limite_cpu: float = None,
+                 max_chars: int = 2000):
+        self.processos = processos or multiprocessing.cpu_count()
+        self.timeout = timeout
+        self.limite_cpu = limite_cpu
+        self.max_chars = max_chars
+        self.problematicos = []  # (caminho, motivo)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+    def _obter_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.processos)
+        return self._pool
+
+    def _reiniciar_pool(self):
+        """Mata os trabalhadores (inclusive o travado) e recria o pool"""
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+    def _enviar(self, caminho):
+        tarefa = self._obter_pool().apply_async(extrair_texto, (str(caminho), self.max_chars, self.limite_cpu))
+        return [caminho, tarefa, time.monotonic() + self.timeout]
+
+    def extrair(self, caminhos, filtro=None):
+        """
+        Extrai textos mantendo no máximo um arquivo por processo em andamento
+
+        Args:
+            caminhos: Iterável de caminhos
+            filtro: Callable opcional; arquivos para os quais retorna False são
+                repassados (com texto None) sem passar pelo pool
+
+        Yields:
+            tuple: (caminho, texto, erro) na ordem de entrada; erro é None em caso de sucesso
+        """
+        caminhos = iter(caminhos)
+        andamento = deque()
+
+        def completar():
+            while len(andamento) < self.processos:
+                try:
+                    caminho = next(caminhos)
+                except StopIteration:
+                    return
+                if filtro and not filtro(caminho):
+                    andamento.append([caminho, None, None])
+                else:
+                    andamento.append(self._enviar(caminho))
+
+        completar()
+        while andamento:
+            caminho, tarefa, prazo = andamento[0]
+            if tarefa is None:
+                andamento.popleft()
+                yield caminho, None, None
+                completar()
+                continue
+            try:
+                texto = tarefa.get(timeout=max(0.0, prazo - time.monotonic()))
+                andamento.popleft()
+                yield caminho, texto, None
+            except multiprocessing.TimeoutError:
+                andamento.popleft()
+                motivo = f"Tempo limite de {self.timeout}s excedido na extração"
+                self.problematicos.append((str(caminho), motivo))
+                self._reiniciar_pool()
+                # Os demais arquivos em andamento são reenviados ao novo pool
+                pendentes = list(andamento)
+                andamento.clear()
+                andamento.extend(item if item[1] is None else self._enviar(item[0]) for item in pendentes)
+                yield caminho, "", motivo
+            except Exception as e:
+                andamento.popleft()
+                yield caminho, "", str(e)
+            completar()
+
+    def fechar(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila de Jobs
+Execução em segundo plano de operações longas da API, com estado, progresso e
+resultados parciais persistidos em SQLite (jobs sobrevivem a reinícios do servidor)
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Operador -> do SQLite (3.38+): projeção dos resultados sem decodificar o JSON completo
+PROJECAO_SQL = sqlite3.sqlite_version_info >= (3, 38, 0)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    processados INTEGER NOT NULL DEFAULT 0,
+    sucessos INTEGER NOT NULL DEFAULT 0,
+    erros INTEGER NOT NULL DEFAULT 0,
+    resumo TEXT,
+    erro TEXT,
+    dono TEXT,
+    renovado_em REAL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    criado_em TEXT NOT NULL,
+    iniciado_em TEXT,
+    concluido_em TEXT
+);
+
+CREATE TABLE IF NOT EXISTS job_resultados (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    caminho TEXT,
+    sucesso INTEGER NOT NULL,
+    dados TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_estado ON jobs(estado, renovado_em);
+CREATE INDEX IF NOT EXISTS idx_job_resultados_job ON job_resultados(job_id, id);
+"""
+
+# Estados de um job
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+FALHOU = 'falhou'
+ATIVOS = (PENDENTE, EXECUTANDO)
+
+
+class FilaCheia(Exception):
+    """Limite de jobs aguardando execução atingido"""
+
+
+class RepositorioJobs:
+    """Estado dos jobs e seus resultados por arquivo (SQLite em modo WAL)"""
+
+    def __init__(self, caminho_banco: str, tamanho_lote: int = 50, intervalo_gravacao: float = 1.0):
+        self.caminho_banco = Path(caminho_banco)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_gravacao = intervalo_gravacao
+
+        self._lock = threading.Lock()
+        self._pendentes = []  # resultados ainda não gravados: (job_id, caminho, sucesso, dados)
+        self._ultima_gravacao = time.monotonic()
+
+        self.conexao = sqlite3.connect(str(self.caminho_banco), check_same_thread=False)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.executescript(ESQUEMA)
+        self.conexao.commit()
+
+    def criar(self, tipo: str, parametros: Dict, dono: str) -> str:
+        """Registra um job pendente e retorna seu id"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.conexao.execute(
+                'INSERT INTO jobs (id, tipo, estado, parametros, dono, renovado_em, criado_em) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, tipo, PENDENTE, json.dumps(parametros, ensure_ascii=False), dono,
+                 time.time(), datetime.now().isoformat())
+            )
+            self.conexao.commit()
+        return job_id
+
+    def iniciar(self, job_id: str):
+        with self._lock:
+            self.conexao.execute(
+                'UPDATE jobs SET estado = ?, tentativas = tentativas + 1, '
+                'iniciado_em = COALESCE(iniciado_em, ?) WHERE id = ?',
+                (EXECUTANDO, datetime.now().isoformat(), job_id)
+            )
+            self.conexao.commit()
+
+    def definir_total(self, job_id: str, total: int):
+        with self._lock:
+            self.conexao.execute('UPDATE jobs SET total = ? WHERE id = ?', (total, job_id))
+            self.conexao.commit()
+
+    def registrar_resultado(self, job_id: str, caminho, dados: Dict, sucesso: bool):
+        """Registra o resultado de um arquivo (gravado em lotes, junto com os contadores)"""
+        registro = (job_id, str(caminho) if caminho else None, int(bool(sucesso)),
+                    json.dumps(dados, ensure_ascii=False, default=str))
+        with self._lock:
+            self._pendentes.append(registro)
+            if (len(self._pendentes) >= self.tamanho_lote or
+                    time.monotonic() - self._ultima_gravacao >= self.intervalo_gravacao):
+                self._gravar_pendentes()
+
+    def _gravar_pendentes(self):
+        """Grava resultados pendentes e atualiza os contadores em uma única transação"""
+        self._ultima_gravacao = time.monotonic()
+        if not self._pendentes:
+            return
+
+        contadores = {}
+        for job_id, _, sucesso, _ in self._pendentes:
+            processados, sucessos = contadores.get(job_id, (0, 0))
+            contadores[job_id] = (processados + 1, sucessos + sucesso)
+
+        with self.conexao:
+            self.conexao.executemany(
+                'INSERT INTO job_resultados (job_id, caminho, sucesso, dados) VALUES (?, ?, ?, ?)',
+                self._pendentes
+            )
+            self.conexao.executemany(
+                'UPDATE jobs SET processados = processados + ?, sucessos = sucessos + ?, '
+                'erros = erros + ? WHERE id = ?',
+                [(p, s, p - s, job_id) for job_id, (p, s) in contadores.items()]
+            )
+        self._pendentes = []
+
+    def finalizar(self, job_id: str, estado: str, resumo: Dict = None, erro: str = None):
+        """Grava pendências e encerra o job como concluído ou com falha"""
+        with self._lock:
+            self._gravar_pendentes()
+            self.conexao.execute(
+                'UPDATE jobs SET estado = ?, resumo = ?, erro = ?, dono = NULL, concluido_em = ? WHERE id = ?',
+                (estado, json.dumps(resumo, ensure_ascii=False, default=str) if resumo is not None else None,
+                 erro, datetime.now().isoformat(), job_id)
+            )
+            self.conexao.commit()
+
+    def renovar(self, dono: str):
+        """Confirma que os jobs ativos do dono continuam em andamento"""
+        with self._lock:
+            self._gravar_pendentes()
+            self.conexao.execute(
+                'UPDATE jobs SET renovado_em = ? WHERE dono = ? AND estado IN (?, ?)',
+                (time.time(), dono) + ATIVOS
+            )
+            self.conexao.commit()
+
+    def assumir_abandonados(self, dono: str, validade_s: float, limite: int) -> List[Dict]:
+        """
+        Assume jobs ativos sem renovação há mais de validade_s (servidor reiniciado
+        ou processo encerrado) para que sejam retomados por este dono
+        """
+        if limite <= 0:
+            return []
+
+        assumidos = []
+        with self._lock:
+            linhas = self.conexao.execute(
+                'SELECT id, dono, renovado_em FROM jobs WHERE estado IN (?, ?) AND '
+                '(renovado_em IS NULL OR renovado_em < ?) ORDER BY criado_em LIMIT ?',
+                ATIVOS + (time.time() - validade_s, limite)
+            ).fetchall()
+
+            for job_id, dono_anterior, renovado_em in linhas:
+                # Troca condicional: outro processo pode ter assumido o mesmo job
+                cursor = self.conexao.execute(
+                    'UPDATE jobs SET dono = ?, renovado_em = ?, estado = ? '
+                    'WHERE id = ? AND dono IS ? AND renovado_em IS ?',
+                    (dono, time.time(), PENDENTE, job_id, dono_anterior, renovado_em)
+                )
+                if cursor.rowcount:
+                    assumidos.append(job_id)
+            self.conexao.commit()
+
+        return [self.obter(job_id, limite=0) for job_id in assumidos]
+
+    def liberar(self, job_id: str):
+        """Devolve um job assumido que não pôde ser enfileirado"""
+        with self._lock:
+            self.conexao.execute('UPDATE jobs SET dono = NULL, renovado_em = NULL WHERE id = ?', (job_id,))
+            self.conexao.commit()
+
+    def caminhos_concluidos(self, job_id: str) -> set:
+        """Caminhos já registrados no job (ignorados ao retomar)"""
+        with self._lock:
+            self._gravar_pendentes()
+            linhas = self.conexao.execute(
+                'SELECT caminho FROM job_resultados WHERE job_id = ? AND caminho IS NOT NULL', (job_id,)
+            ).fetchall()
+        return {linha[0] for linha in linhas}
+
+    def obter(self, job_id: str, desde: int = 0, limite: int = 100, apos: Optional[int] = None,
+              campos: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Estado do job com até 'limite' resultados a partir da posição 'desde'
+
+        apos: cursor (id do último resultado recebido); se informado, substitui
+              'desde' e a página é lida pelo índice, sem percorrer as anteriores
+        campos: devolve apenas estas chaves de cada resultado
+
+        'cursor' no retorno é o id do último resultado da página (ou o próprio
+        'apos' se não houver novos).
+        """
+        with self._lock:
+            self._gravar_pendentes()
+            cursor = self.conexao.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+            linha = cursor.fetchone()
+            if linha is None:
+                return None
+            job = dict(zip([c[0] for c in cursor.description], linha))
+
+            linhas = []
+            if limite > 0:
+                coluna, parametros = self._projecao(campos)
+                if apos is not None:
+                    linhas = self.conexao.execute(
+                        f'SELECT id, {coluna} FROM job_resultados WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?',
+                        (*parametros, job_id, apos, limite)
+                    ).fetchall()
+                else:
+                    linhas = self.conexao.execute(
+                        f'SELECT id, {coluna} FROM job_resultados WHERE job_id = ? ORDER BY id LIMIT ? OFFSET ?',
+                        (*parametros, job_id, limite, desde)
+                    ).fetchall()
+
+        resultados = [json.loads(dados) for _, dados in linhas]
+        if campos and not PROJECAO_SQL:
+            resultados = [{campo: r.get(campo) for campo in campos} for r in resultados]
+
+        job['parametros'] = json.loads(job['parametros'])
+        job['resumo'] = json.loads(job['resumo']) if job['resumo'] else None
+        job['resultados'] = resultados
+        job['cursor'] = linhas[-1][0] if linhas else apos
+        return job
+
+    @staticmethod
+    def _projecao(campos: Optional[List[str]]) -> Tuple[str, tuple]:
+        """Expressão SQL (e parâmetros) que lê os resultados, projetados em 'campos' se possível"""
+        if not campos or not PROJECAO_SQL:
+            return 'dados', ()
+        expressao = 'json_object(' + ', '.join('?, dados -> ?' for _ in campos) + ')'
+        parametros = []
+        for campo in campos:
+            parametros += [campo, '$."' + campo.replace('"', '') + '"']
+        return expressao, tuple(parametros)
+
+    def resultados_desde(self, job_id: str, ultimo_id: int = 0, limite: int = 200) -> List[Tuple[int, Dict]]:
+        """Resultados gravados após o resultado ultimo_id: [(id, dados)] em ordem"""
+        with self._lock:
+            self._gravar_pendentes()
+            linhas = self.conexao.execute(
+                'SELECT id, dados FROM job_resultados WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?',
+                (job_id, ultimo_id, limite)
+            ).fetchall()
+        return [(id_resultado, json.loads(dados)) for id_resultado, dados in linhas]
+
+    def posicao(self, job_id: str, ultimo_id: int) -> int:
+        """Quantidade de resultados do job até ultimo_id (inclusive)"""
+        with self._lock:
+            return self.conexao.execute(
+                'SELECT COUNT(*) FROM job_resultados WHERE job_id = ? AND id <= ?', (job_id, ultimo_id)
+            ).fetchone()[0]
+
+    def fechar(self):
+        """Grava pendências e fecha a conexão"""
+        with self._lock:
+            self._gravar_pendentes()
+            self.conexao.close()
+
+
+class Job:
+    """Job em execução, entregue à função executora do seu tipo"""
+
+    def __init__(self, repositorio: RepositorioJobs, dados: Dict, retomado: bool):
+        self.repositorio = repositorio
+        self.id = dados['id']
+        self.tipo = dados['tipo']
+        self.parametros = dados['parametros']
+        self.retomado = retomado
+        # Em uma retomada, arquivos já registrados não são reprocessados
+        self.anteriores = repositorio.caminhos_concluidos(self.id) if retomado else set()
+        self._total = None
+
+    def ja_processado(self, caminho) -> bool:
+        return str(caminho) in self.anteriores
+
+    def definir_total(self, total: int):
+        """Total de arquivos do job (incluindo os já processados antes de uma retomada)"""
+        total += len(self.anteriores)
+        if total != self._total:
+            self._total = total
+            self.repositorio.definir_total(self.id, total)
+
+    def registrar(self, caminho, dados: Dict, sucesso: bool):
+        self.repositorio.registrar_resultado(self.id, caminho, dados, sucesso)
+
+
+class FilaJobs:
+    """
+    Executa jobs em um número fixo de threads, com fila limitada
+
+    executores: {tipo: funcao(job) -> resumo}. Jobs deste processo são renovados
+    periodicamente; jobs ativos sem renovação por validade_s (ex.: servidor
+    reiniciado) são assumidos e retomados.
+    """
+
+    def __init__(self, repositorio: RepositorioJobs, executores: Dict[str, Callable[[Job], Dict]],
+                 max_simultaneos: int = 2, max_pendentes: int = 50, validade_s: float = 60.0):
+        self.repositorio = repositorio
+        self.executores = executores
+        self.validade_s = validade_s
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._fila = queue.Queue(maxsize=max(1, max_pendentes))
+        self._encerrar = threading.Event()
+
+        self._threads = [threading.Thread(target=self._trabalhar, name=f'job-{i}', daemon=True)
+                         for i in range(max(1, max_simultaneos))]
+        self._threads.append(threading.Thread(target=self._manter, name='job-manutencao', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def enviar(self, tipo: str, parametros: Dict) -> str:
+        """Cria e enfileira um job; FilaCheia se o limite de pendentes foi atingido"""
+        if tipo not in self.executores:
+            raise ValueError(f"Tipo de job desconhecido: {tipo}")
+        if self._fila.full():
+            raise FilaCheia("Fila de jobs cheia")
+
+        job_id = self.repositorio.criar(tipo, parametros, self.dono)
+        try:
+            self._fila.put_nowait((job_id, False))
+        except queue.Full:
+            self.repositorio.finalizar(job_id, FALHOU, erro="Fila de jobs cheia")
+            raise FilaCheia("Fila de jobs cheia")
+        return job_id
+
+    def obter(self, job_id: str, desde: int = 0, limite: int = 100, apos: Optional[int] = None,
+              campos: Optional[List[str]] = None) -> Optional[Dict]:
+        return self.repositorio.obter(job_id, desde, limite, apos, campos)
+
+    def _trabalhar(self):
+        while not self._encerrar.is_set():
+            try:
+                job_id, retomado = self._fila.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._executar(job_id, retomado)
+            finally:
+                self._fila.task_done()
+
+    def _executar(self, job_id: str, retomado: bool):
+        dados = self.repositorio.obter(job_id, limite=0)
+        if dados is None or dados['estado'] not in ATIVOS:
+            return
+
+        self.repositorio.iniciar(job_id)
+        try:
+            job = Job(self.repositorio, dados, retomado)
+            resumo = self.executores[job.tipo](job)
+        except Exception as e:
+            logger.error(f"Job {job_id} falhou: {e}", exc_info=True)
+            self.repositorio.finalizar(job_id, FALHOU, erro=str(e))
+            return
+        self.repositorio.finalizar(job_id, CONCLUIDO, resumo)
+
+    def _manter(self):
+        """Renova os jobs deste processo e retoma os abandonados"""
+        while not self._encerrar.is_set():
+            try:
+                self.repositorio.renovar(self.dono)
+                vagas = self._fila.maxsize - self._fila.qsize()
+                for dados in self.repositorio.assumir_abandonados(self.dono, self.validade_s, vagas):
+                    try:
+                        self._fila.put_nowait((dados['id'], True))
+                    except queue.Full:
+                        self.repositorio.liberar(dados['id'])
+                        continue
+                    logger.info(f"Retomando job {dados['id']} ({dados['tipo']})")
+            except Exception as e:
+                logger.error(f"Erro na manutenção dos jobs: {e}")
+            self._encerrar.wait(self.validade_s / 4)
+
+    def encerrar(self):
+        """Para as threads (jobs em andamento são retomados no próximo início)"""
+        self._encerrar.set()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limite de Requisições
+Contador de janela deslizante (janela atual + anterior ponderada) com custo O(1)
+por requisição e memória fixa por identificador; identificadores ociosos são
+removidos em segundo plano. O estado fica em memória ou em SQLite (compartilhado
+entre os processos do servidor, ex.: workers do gunicorn)
+"""
+
+import math
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def avaliar_janela(janela_gravada: int, atual: int, anterior: int, janela_agora: int) -> Tuple[int, int]:
+    """Contagens (atual, anterior) vistas a partir da janela janela_agora"""
+    if janela_gravada == janela_agora:
+        return atual, anterior
+    if janela_gravada == janela_agora - 1:
+        return 0, atual
+    return 0, 0
+
+
+def decidir(atual: int, anterior: int, decorrido: float, custo: int,
+            limite: int) -> Tuple[bool, Optional[float]]:
+    """
+    Aplica o contador de janela deslizante
+
+    decorrido: fração (0-1) já passada da janela atual
+
+    Returns:
+        (permitido, espera em frações de janela até ser permitido; None se o custo excede o limite)
+    """
+    if custo > limite:
+        return False, None
+
+    estimado = anterior * (1.0 - decorrido) + atual
+    if estimado + custo <= limite:
+        return True, 0.0
+
+    # Ainda nesta janela, o peso da anterior diminui com o tempo
+    if anterior and atual + custo <= limite:
+        return False, (1.0 - (limite - atual - custo) / anterior) - decorrido
+
+    # Na próxima janela, a atual passa a ser a anterior
+    return False, (1.0 - decorrido) + max(0.0, 1.0 - (limite - custo) / atual)
+
+
+class BackendMemoria:
+    """Contadores no próprio processo: {chave: [janela, atual, anterior]}"""
+
+    def __init__(self):
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, chave: str, custo: int, limite: int, janela_agora: int,
+                 decorrido: float) -> Tuple[bool, Optional[float]]:
+        with self._lock:
+            registro = self._contadores.get(chave)
+            atual, anterior = avaliar_janela(*registro, janela_agora) if registro else (0, 0)
+            permitido, espera = decidir(atual, anterior, decorrido, custo, limite)
+            if permitido:
+                atual += custo
+            self._contadores[chave] = [janela_agora, atual, anterior]
+            return permitido, espera
+
+    def remover_ociosos(self, janela_agora: int) -> int:
+        """Remove chaves sem requisições nesta janela nem na anterior"""
+        with self._lock:
+            ociosas = [chave for chave, (janela, _, _) in self._contadores.items() if janela < janela_agora - 1]
+            for chave in ociosas:
+                del self._contadores[chave]
+            return len(ociosas)
+
+    def tamanho(self) -> int:
+        with self._lock:
+            return len(self._contadores)
+
+
+class BackendSQLite:
+    """Contadores em SQLite, compartilhados entre processos da mesma máquina"""
+
+    def __init__(self, caminho_banco: str):
+        self.caminho_banco = Path(caminho_banco)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conexao = sqlite3.connect(str(self.caminho_banco), timeout=5, isolation_level=None,
+                                       check_same_thread=False)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS limites ('
+            'chave TEXT PRIMARY KEY, janela INTEGER NOT NULL, atual INTEGER NOT NULL, anterior INTEGER NOT NULL)'
+        )
+        self.conexao.execute('CREATE INDEX IF NOT EXISTS idx_limites_janela ON limites(janela)')
+
+    def consumir(self, chave: str, custo: int, limite: int, janela_agora: int,
+                 decorrido: float) -> Tuple[bool, Optional[float]]:
+        with self._lock:
+            # BEGIN IMMEDIATE: leitura e escrita atômicas entre processos
+            self.conexao.execute('BEGIN IMMEDIATE')
+            try:
+                registro = self.conexao.execute(
+                    'SELECT janela, atual, anterior FROM limites WHERE chave = ?', (chave,)
+                ).fetchone()
+                atual, anterior = avaliar_janela(*registro, janela_agora) if registro else (0, 0)
+                permitido, espera = decidir(atual, anterior, decorrido, custo, limite)
+                if permitido:
+                    atual += custo
+                self.conexao.execute(
+                    'INSERT OR REPLACE INTO limites (chave, janela, atual, anterior) VALUES (?, ?, ?, ?)',
+                    (chave, janela_agora, atual, anterior)
+                )
+                self.conexao.execute('COMMIT')
+            except Exception:
+                self.conexao.execute('ROLLBACK')
+                raise
+            return permitido, espera
+
+    def remover_ociosos(self, janela_agora: int) -> int:
+        with self._lock:
+            cursor = self.conexao.execute('DELETE FROM limites WHERE janela < ?', (janela_agora - 1,))
+            return cursor.rowcount
+
+    def tamanho(self) -> int:
+        with self._lock:
+            return self.conexao.execute('SELECT COUNT(*) FROM limites').fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            self.conexao.close()
+
+
+class LimitadorJanelaDeslizante:
+    """
+    Até 'limite' unidades por identificador a cada 'janela_s' segundos
+
+    A contagem estimada é anterior * (fração restante da janela) + atual, o que
+    suaviza o limite entre janelas sem guardar o horário de cada requisição.
+    """
+
+    def __init__(self, backend=None, limite: int = 60, janela_s: float = 60.0,
+                 intervalo_limpeza: Optional[float] = None):
+        self.backend = backend or BackendMemoria()
+        self.limite = limite
+        self.janela_s = janela_s
+        self.removidos = 0
+
+        self._encerrar = threading.Event()
+        self._limpeza = threading.Thread(target=self._limpar, args=(intervalo_limpeza or janela_s,),
+                                         name='limite-limpeza', daemon=True)
+        self._limpeza.start()
+
+    def permitir(self, chave: str, custo: int = 1) -> Tuple[bool, Optional[float]]:
+        """
+        Consome 'custo' unidades se couberem no limite
+
+        Returns:
+            (permitido, segundos até haver espaço; None se o custo excede o limite)
+        """
+        agora = time.time() / self.janela_s
+        janela_agora = math.floor(agora)
+        permitido, espera = self.backend.consumir(chave, custo, self.limite, janela_agora, agora - janela_agora)
+        return permitido, (espera * self.janela_s if espera is not None else None)
+
+    def _limpar(self, intervalo: float):
+        while not self._encerrar.wait(intervalo):
+            try:
+                self.removidos += self.backend.remover_ociosos(math.floor(time.time() / self.janela_s))
+            except Exception as e:
+                logger.error(f"Erro ao remover identificadores ociosos: {e}")
+
+    def obter_estatisticas(self):
+        return {'identificadores': self.backend.tamanho(), 'removidos': self.removidos,
+                'limite': self.limite, 'janela_s': self.janela_s}
+
+    def encerrar(self):
+        self._encerrar.set()
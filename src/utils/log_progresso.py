@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log de Progresso em Journal
+Registra o progresso do processamento em JSON Lines (um registro por arquivo)
+para permitir retomada sem reescrever o log inteiro a cada arquivo
+"""
+
+import os
+import json
+from datetime import datetime
+from pathlib import Path
+
+
+class LogProgresso:
+    """Gerencia log de progresso para retomada (append-only, indexado em memória)"""
+
+    NOME_JOURNAL = '.renomer_progress.jsonl'
+    NOME_LEGADO = '.renomer_progress.json'
+
+    def __init__(self, pasta_origem):
+        self.pasta_origem = Path(pasta_origem)
+        self.arquivo_log = self.pasta_origem / self.NOME_JOURNAL
+        self.arquivo_legado = self.pasta_origem / self.NOME_LEGADO
+        self.carregar()
+
+    def _estado_vazio(self):
+        self.processados = set()
+        self.erros = set()
+        self.iniciado_em = None
+        self.ultima_atualizacao = None
+        self.linhas = 0
+
+    def carregar(self):
+        """Carrega journal existente, migrando o log JSON antigo se necessário"""
+        self._estado_vazio()
+
+        if not self.arquivo_log.exists() and self.arquivo_legado.exists():
+            self._migrar_legado()
+
+        if not self.arquivo_log.exists():
+            return
+
+        try:
+            with open(self.arquivo_log, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    linha = linha.strip()
+                    if not linha:
+                        continue
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        # Linha truncada (ex: interrupção durante escrita)
+                        continue
+                    self._aplicar(registro)
+                    self.linhas += 1
+        except OSError as e:
+            print(f"Erro ao carregar log: {e}")
+            return
+
+        if self.precisa_compactar():
+            try:
+                self.compactar()
+            except OSError as e:
+                print(f"Erro ao compactar log: {e}")
+
+    def _aplicar(self, registro):
+        """Aplica um registro do journal ao índice em memória"""
+        tipo = registro.get('tipo')
+        if tipo == 'inicio':
+            if not self.iniciado_em:
+                self.iniciado_em = registro.get('iniciado_em')
+        elif tipo == 'sucesso':
+            self.erros.discard(registro['arquivo'])
+            self.processados.add(registro['arquivo'])
+        elif tipo == 'erro':
+            if registro['arquivo'] not in self.processados:
+                self.erros.add(registro['arquivo'])
+
+        if registro.get('processado_em'):
+            self.ultima_atualizacao = registro['processado_em']
+
+    def _anexar(self, registro):
+        """Anexa um registro ao final do journal"""
+        self._aplicar(registro)
+        try:
+            with open(self.arquivo_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            self.linhas += 1
+        except OSError as e:
+            print(f"Erro ao salvar log: {e}")
+
+    def _migrar_legado(self):
+        """Converte o .renomer_progress.json antigo para o journal"""
+        try:
+            with open(self.arquivo_legado, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        registros = []
+        if dados.get('iniciado_em'):
+            registros.append({'tipo': 'inicio', 'iniciado_em': dados['iniciado_em']})
+        for item in dados.get('processados', []):
+            if isinstance(item, dict):
+                registros.append(dict(item, tipo='sucesso'))
+            else:
+                registros.append({'tipo': 'sucesso', 'arquivo': str(item)})
+        for item in dados.get('erros', []):
+            registros.append(dict(item, tipo='erro'))
+
+        self._reescrever(registros)
+        try:
+            self.arquivo_legado.unlink()
+        except OSError:
+            pass
+
+    def _reescrever(self, registros):
+        """Reescreve o journal de forma atômica"""
+        temporario = self.arquivo_log.with_name(self.arquivo_log.name + '.tmp')
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        os.replace(temporario, self.arquivo_log)
+
+    def iniciar(self):
+        """Marca início do processamento"""
+        if not self.iniciado_em:
+            self._anexar({'tipo': 'inicio', 'iniciado_em': datetime.now().isoformat()})
+
+    def arquivo_processado(self, caminho):
+        """Verifica se arquivo já foi processado (sucesso ou erro)"""
+        caminho_str = str(caminho)
+        return caminho_str in self.processados or caminho_str in self.erros
+
+    def adicionar_sucesso(self, caminho, info):
+        """Registra arquivo processado com sucesso"""
+        self._anexar({
+            'tipo': 'sucesso',
+            'arquivo': str(caminho),
+            'novo_nome': info['novo_nome'],
+            'pasta_destino': info.get('pasta_destino'),
+            'processado_em': datetime.now().isoformat()
+        })
+
+    def adicionar_erro(self, caminho, erro):
+        """Registra erro no processamento"""
+        self._anexar({
+            'tipo': 'erro',
+            'arquivo': str(caminho),
+            'erro': str(erro),
+            'processado_em': datetime.now().isoformat()
+        })
+
+    def precisa_compactar(self):
+        """Indica se o journal passou do dobro dos registros vivos (um por arquivo, mais o início)"""
+        return self.linhas > 2 * (len(self.processados) + len(self.erros) + 1)
+
+    def compactar(self):
+        """Reescreve o journal mantendo apenas o último registro de cada arquivo"""
+        if not self.arquivo_log.exists():
+            return
+
+        inicio = None
+        ultimos = {}
+        with open(self.arquivo_log, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    continue
+                if registro.get('tipo') == 'inicio':
+                    inicio = inicio or registro
+                elif registro.get('arquivo'):
+                    if registro['tipo'] == 'erro' and registro['arquivo'] in self.processados:
+                        continue
+                    ultimos.pop(registro['arquivo'], None)
+                    ultimos[registro['arquivo']] = registro
+
+        registros = ([inicio] if inicio else []) + list(ultimos.values())
+        self._reescrever(registros)
+        self.linhas = len(registros)
+
+    def obter_estatisticas(self):
+        """Retorna estatísticas do log"""
+        return {
+            'total_processados': len(self.processados),
+            'total_erros': len(self.erros),
+            'iniciado_em': self.iniciado_em,
+            'ultima_atualizacao': self.ultima_atualizacao
+        }
+
+    def limpar(self):
+        """Limpa o log"""
+        # O journal é truncado no lugar: remover e recriar a entrada alteraria o mtime
+        # da pasta de origem, que a varredura incremental trataria como modificada
+        if self.arquivo_log.exists():
+            open(self.arquivo_log, 'w').close()
+        if self.arquivo_legado.exists():
+            self.arquivo_legado.unlink()
+        self._estado_vazio()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de Requisições
+Limitador de taxa (token bucket por minuto + cota diária), execução concorrente
+limitada para chamadas à API do Gemini e estágios de pipeline com filas limitadas
+"""
+
+import time
+import queue
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class LimiteDiarioExcedido(Exception):
+    """Cota diária de requisições esgotada"""
+
+
+class UsoDiarioSQLite:
+    """Requisições usadas por dia em SQLite, compartilhadas entre execuções e processos"""
+
+    def __init__(self, caminho_banco: str):
+        self.caminho_banco = Path(caminho_banco)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        self.conexao = sqlite3.connect(str(self.caminho_banco), timeout=5, isolation_level=None,
+                                       check_same_thread=False)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS uso_diario (dia TEXT PRIMARY KEY, usadas INTEGER NOT NULL)'
+        )
+
+    def usadas(self, dia: date) -> int:
+        linha = self.conexao.execute('SELECT usadas FROM uso_diario WHERE dia = ?', (dia.isoformat(),)).fetchone()
+        return linha[0] if linha else 0
+
+    def consumir(self, dia: date, limite: int) -> int:
+        """Soma uma requisição ao dia e retorna o total; levanta LimiteDiarioExcedido se já no limite"""
+        # BEGIN IMMEDIATE: leitura e escrita atômicas entre processos
+        self.conexao.execute('BEGIN IMMEDIATE')
+        try:
+            usadas = self.usadas(dia)
+            if limite and usadas >= limite:
+                raise LimiteDiarioExcedido(f"Limite diário de {limite} requisições atingido")
+            self.conexao.execute(
+                'INSERT INTO uso_diario (dia, usadas) VALUES (?, 1) '
+                'ON CONFLICT(dia) DO UPDATE SET usadas = usadas + 1', (dia.isoformat(),)
+            )
+            self.conexao.execute('COMMIT')
+        except Exception:
+            self.conexao.execute('ROLLBACK')
+            raise
+        return usadas + 1
+
+
+class LimitadorTaxa:
+    """Token bucket em requisições por minuto com cota de requisições por dia"""
+
+    def __init__(self, requisicoes_por_minuto: float = 15, requisicoes_por_dia: int = 1500,
+                 rajada: int = None, arquivo_uso: str = None):
+        """
+        arquivo_uso: SQLite onde a contagem diária é persistida (sem ele, a cota
+            recomeça a cada execução)
+        """
+        self._lock = threading.Lock()
+        self.requisicoes_por_dia = requisicoes_por_dia
+        self._dia = date.today()
+        self.uso = UsoDiarioSQLite(arquivo_uso) if arquivo_uso else None
+        self.usadas_hoje = self.uso.usadas(self._dia) if self.uso else 0
+        self.configurar(requisicoes_por_minuto, rajada)
+
+    def configurar(self, requisicoes_por_minuto: float, rajada: int = None):
+        """Ajusta a taxa (e o tamanho da rajada) do bucket"""
+        with self._lock:
+            self.requisicoes_por_minuto = max(0.1, float(requisicoes_por_minuto))
+            self.taxa = self.requisicoes_por_minuto / 60.0  # tokens por segundo
+            self.capacidade = max(1, int(rajada if rajada else self.requisicoes_por_minuto // 4))
+            self.tokens = float(self.capacidade)
+            self._atualizado_em = time.monotonic()
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self._atualizado_em) * self.taxa)
+        self._atualizado_em = agora
+
+        hoje = date.today()
+        if hoje != self._dia:
+            self._dia = hoje
+            self.usadas_hoje = self.uso.usadas(hoje) if self.uso else 0
+
+    def aguardar(self):
+        """Reserva uma requisição, bloqueando até haver token disponível"""
+        with self._lock:
+            self._reabastecer()
+
+            if self.uso:
+                self.usadas_hoje = self.uso.consumir(self._dia, self.requisicoes_por_dia)
+            else:
+                if self.requisicoes_por_dia and self.usadas_hoje >= self.requisicoes_por_dia:
+                    raise LimiteDiarioExcedido(
+                        f"Limite diário de {self.requisicoes_por_dia} requisições atingido"
+                    )
+                self.usadas_hoje += 1
+
+            # Reserva o token mesmo que fique negativo; o tempo de espera é proporcional à dívida
+            self.tokens -= 1
+            espera = -self.tokens / self.taxa if self.tokens < 0 else 0.0
+
+        if espera > 0:
+            time.sleep(espera)
+
+    def obter_estatisticas(self):
+        """Retorna uso atual do limitador"""
+        with self._lock:
+            return {
+                'requisicoes_por_minuto': self.requisicoes_por_minuto,
+                'requisicoes_por_dia': self.requisicoes_por_dia,
+                'usadas_hoje': self.uso.usadas(self._dia) if self.uso else self.usadas_hoje
+            }
+
+
+def executar_em_paralelo(funcao, itens, max_workers: int = 4, cancelado=None):
+    """
+    Executa funcao(item) em um pool de threads mantendo no máximo
+    max_workers * 2 tarefas enviadas ao mesmo tempo
+
+    Args:
+        funcao: Função aplicada a cada item
+        itens: Iterável de itens
+        max_workers: Número de requisições simultâneas
+        cancelado: Callable opcional; quando retorna True, nenhum item novo é enviado
+
+    Yields:
+        tuple: (item, resultado, erro) na ordem de conclusão
+    """
+    itens = iter(itens)
+    limite_envio = max(1, max_workers) * 2
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pendentes = {}
+
+        def enviar():
+            while len(pendentes) < limite_envio:
+                if cancelado and cancelado():
+                    return
+                try:
+                    item = next(itens)
+                except StopIteration:
+                    return
+                pendentes[executor.submit(funcao, item)] = item
+
+        enviar()
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                item = pendentes.pop(futuro)
+                erro = futuro.exception()
+                yield item, (None if erro else futuro.result()), erro
+            enviar()
+
+
+def em_segundo_plano(itens, tamanho_fila: int = 64, cancelado=None):
+    """
+    Consome o iterável em uma thread própria, entregando os itens por uma fila
+    limitada (estágio de pipeline com backpressure)
+
+    Args:
+        itens: Iterável consumido pela thread produtora
+        tamanho_fila: Máximo de itens aguardando o próximo estágio
+        cancelado: Callable opcional; quando retorna True, a produção é interrompida
+
+    Yields:
+        Os itens na ordem produzida; exceções do produtor são relançadas aqui
+    """
+    fila = queue.Queue(maxsize=max(1, tamanho_fila))
+    fim = object()
+    falha = []
+    encerrado = threading.Event()
+
+    def colocar(item):
+        while not (encerrado.is_set() or (cancelado and cancelado())):
+            try:
+                fila.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produtor():
+        iterador = iter(itens)
+        try:
+            for item in iterador:
+                if not colocar(item):
+                    return
+        except Exception as e:
+            falha.append(e)
+        finally:
+            # Geradores interrompidos liberam seus recursos (pools, arquivos) já aqui
+            fechar = getattr(iterador, 'close', None)
+            if fechar:
+                fechar()
+            colocar(fim)
+
+    thread = threading.Thread(target=produtor, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            try:
+                item = fila.get(timeout=0.5)
+            except queue.Empty:
+                # Cancelado: o produtor encerra sem conseguir enfileirar o marcador de fim
+                if not thread.is_alive() and fila.empty():
+                    break
+                continue
+            if item is fim:
+                break
+            yield item
+    finally:
+        # Consumidor abandonou o estágio: libera o produtor
+        encerrado.set()
+
+    if falha:
+        raise falha[0]
+
+
+def mapear_em_ordem(executor, funcao, itens, janela: int):
+    """
+    Como executor.map, mas com no máximo 'janela' tarefas enviadas por vez
+    (os itens são consumidos sob demanda)
+
+    Yields:
+        Resultados de funcao(item) na ordem dos itens
+    """
+    itens = iter(itens)
+    pendentes = deque()
+
+    for item in itens:
+        pendentes.append(executor.submit(funcao, item))
+        if len(pendentes) >= max(1, janela):
+            break
+
+    while pendentes:
+        resultado = pendentes.popleft().result()
+        for item in itens:
+            pendentes.append(executor.submit(funcao, item))
+            break
+        yield resultado
+
+
+def consumir(gerador, funcao):
+    """
+    Chama funcao(item) para cada item de um gerador que produz itens e retorna um resumo
+
+    Returns:
+        Valor de retorno do gerador
+    """
+    while True:
+        try:
+            item = next(gerador)
+        except StopIteration as fim:
+            return fim.value
+        funcao(item)
+
+
+def coletar(gerador):
+    """
+    Consome um gerador que produz itens e retorna um resumo
+
+    Returns:
+        (lista dos itens gerados, valor de retorno do gerador)
+    """
+    itens = []
+    return itens, consumir(gerador, itens.append)
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regras de Detecção
+Regras declarativas de data, conta, banco e tipo de conta por nome de arquivo,
+compiladas uma única vez por processo e compartilhadas pelos organizadores e
+pela API
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from cache_lru import CacheLRU
+
+# Mapeamento de meses (nome ou abreviação -> número)
+MESES_NOMES = {
+    'JANEIRO': '01', 'JAN': '01',
+    'FEVEREIRO': '02', 'FEV': '02',
+    'MARÇO': '03', 'MARCO': '03', 'MAR': '03',
+    'ABRIL': '04', 'ABR': '04',
+    'MAIO': '05', 'MAI': '05',
+    'JUNHO': '06', 'JUN': '06',
+    'JULHO': '07', 'JUL': '07',
+    'AGOSTO': '08', 'AGO': '08',
+    'SETEMBRO': '09', 'SET': '09',
+    'OUTUBRO': '10', 'OUT': '10',
+    'NOVEMBRO': '11', 'NOV': '11',
+    'DEZEMBRO': '12', 'DEZ': '12'
+}
+
+# Nome da pasta de cada mês (número -> nome)
+NOMES_MESES = {
+    '01': 'JANEIRO', '02': 'FEVEREIRO', '03': 'MARÇO',
+    '04': 'ABRIL', '05': 'MAIO', '06': 'JUNHO',
+    '07': 'JULHO', '08': 'AGOSTO', '09': 'SETEMBRO',
+    '10': 'OUTUBRO', '11': 'NOVEMBRO', '12': 'DEZEMBRO'
+}
+
+BANCOS_CONHECIDOS = {
+    'CAIXA': 'CAIXA',
+    'BB': 'BANCO_DO_BRASIL',
+    'ITAU': 'ITAU',
+    'BRADESCO': 'BRADESCO',
+    'SANTANDER': 'SANTANDER'
+}
+
+TIPOS_CONTA = {
+    'INVEST': 'INVESTIMENTO',
+    'INEST': 'INVESTIMENTO',
+    'POUP': 'POUPANCA',
+    'CC': 'CORRENTE'
+}
+
+
+class RegraConta(NamedTuple):
+    """Padrão de conta; a conta está em 'grupo' e a menor prioridade vence"""
+    nome: str
+    padrao: str
+    grupo: int
+    prioridade: int
+    metodo: str
+
+
+class RegraData(NamedTuple):
+    """Data numérica; as regras são tentadas na ordem da lista"""
+    nome: str
+    padrao: str
+    grupo_ano: int
+    grupo_mes: int
+
+
+class PistasData(NamedTuple):
+    """Grupos do primeiro match de cada padrão de data em um texto (None se não casou)"""
+    meses: Tuple[Optional[Tuple[str, ...]], ...]  # mês por nome: completo, abreviado
+    ano: Optional[Tuple[str, ...]]
+    datas: Tuple[Optional[Tuple[str, ...]], ...]  # uma por regra de data, na ordem do motor
+
+
+class RegraRotulo(NamedTuple):
+    """Rótulo (banco, tipo de conta) reconhecido pelo grupo 1 e padronizado pela tabela"""
+    nome: str
+    padrao: str
+
+
+MES_NOME_COMPLETO = r'(JANEIRO|FEVEREIRO|MARÇO|MARCO|ABRIL|MAIO|JUNHO|JULHO|AGOSTO|SETEMBRO|OUTUBRO|NOVEMBRO|DEZEMBRO)'
+MES_NOME_ABREV = r'(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)'
+
+# Contas bancárias - padrões diversos MELHORADOS
+REGRAS_CONTA = [
+    RegraConta('conta_inicio_mes', r'^(\d{4,8}[-]?[A-Z0-9])\s+' + MES_NOME_COMPLETO, 1, 10, 'INICIO_MES'),  # 18417-9 ABRIL
+    RegraConta('conta_inicio_mes_abrev', r'^(\d{4,8}[-]?[A-Z0-9])\s+' + MES_NOME_ABREV, 1, 20, 'INICIO_MES_ABREV'),  # 28758-X MAIO
+    RegraConta('conta_mes_inicio', '^' + MES_NOME_ABREV + r'\s+(\d{4,8}[-]?[A-Z0-9])', 2, 30, 'MES_INICIO'),  # FEV 28142-5
+    RegraConta('conta_ext_simples', r'^EXT\s+(\d+[-]?\w*)', 1, 40, 'EXT_SIMPLES'),  # EXT 4049-5
+    RegraConta('conta_ext', r'EXT\w*\s+\w*\s*(\d+[-]?\w*)', 1, 50, 'EXT'),  # EXT ABRIL 12345-6
+    RegraConta('conta_caixa', r'CAIXA\w*\s+\w*\s+(\d+[-]?\w*)', 1, 60, 'CAIXA'),  # CAIXA JAN 123-4
+    RegraConta('conta_extrato_longo', r'[Ee]xtrato(\d{8,})', 1, 70, 'EXTRATO_LONGO'),  # Extrato6769113603
+    RegraConta('conta_extrato', r'[Ee]xtrato\s*(\d+)', 1, 80, 'EXTRATO'),  # Extrato123456
+    RegraConta('conta_gfi', r'GFI(\d+)', 1, 90, 'GFI'),  # GFI625082025
+    RegraConta('conta_banco', r'(?:BANCO|CONTA|CC|AG)\s*(\d+[-]?\w*)', 1, 100, 'BANCO'),
+    RegraConta('conta_hifen_espaco', r'(\d{4,8}[-]\s*[A-Z0-9])', 1, 110, 'HIFEN_ESPACO'),  # 22989- X
+    RegraConta('conta_hifen', r'(\d{3,8}[-]\d{1})', 1, 120, 'HIFEN'),  # 12345-6
+    RegraConta('conta_hifen_letra', r'(\d{3,8}[-][A-Z0-9]{1})', 1, 130, 'HIFEN_LETRA'),  # 12345-X
+    RegraConta('conta_timestamp_longo', r'(\d{15,})', 1, 140, 'TIMESTAMP_LONGO'),  # números muito longos em timestamps
+    RegraConta('conta_codigo_data', r'(\d{8,12})(?=\d{4})', 1, 150, 'CODIGO_DATA'),  # códigos seguidos de data
+    RegraConta('conta_simples', r'(?<![\d])(\d{4,8})(?![\d])', 1, 160, 'SIMPLES'),  # 123456
+]
+
+# Prefixos de contas reais, antes de todas as outras regras (organizador super)
+REGRAS_CONTA_PREFIXOS = [
+    RegraConta('conta_prefixo_037', r'(\d{21})', 1, 1, 'PREFIXO_037'),  # 037550146000729800451
+    RegraConta('conta_prefixo_375', r'(375\d{13})', 1, 2, 'PREFIXO_375'),  # 3755000600647051
+]
+
+# Datas numéricas (organizador local)
+REGRAS_DATA = [
+    RegraData('data_mm_yyyy', r'(\d{1,2})[\/\-\.](\d{4})', 2, 1),  # MM/YYYY ou MM-YYYY
+    RegraData('data_mm_yy', r'(\d{1,2})[\/\-\.](\d{2})', 2, 1),  # MM/YY (ano 20YY)
+    RegraData('data_yyyy_mm', r'(\d{4})[\/\-\.](\d{1,2})', 1, 2),  # YYYY/MM
+    RegraData('data_yyyymm', r'(\d{4})(\d{2})', 1, 2),  # YYYYMM
+    RegraData('data_timestamp', r'(\d{4})-(\d{2})-(\d{2})', 1, 2),  # 2025-07-02
+]
+
+# Datas numéricas e timestamps (organizador super)
+REGRAS_DATA_SUPER = [
+    RegraData('data_timestamp_completo', r'(\d{4})-(\d{2})-(\d{2})-\d{2}-\d{2}-\d{2}', 1, 2),  # YYYY-MM-DD-HH-MM-SS
+    RegraData('data_timestamp', r'(\d{4})-(\d{2})-(\d{2})', 1, 2),  # YYYY-MM-DD
+    RegraData('data_mm_yyyy', r'(\d{1,2})[\/\-\.](\d{4})', 2, 1),  # MM/YYYY
+    RegraData('data_yyyy_mm', r'(\d{4})[\/\-\.](\d{1,2})', 1, 2),  # YYYY/MM
+    RegraData('data_yyyymm', r'(\d{4})(\d{2})', 1, 2),  # YYYYMM
+    RegraData('data_mm_yy', r'(\d{1,2})[\/\-\.](\d{2})', 2, 1),  # MM/YY
+]
+
+# Campos de data no início de arquivos OFX (vale a primeira regra com mês e ano válidos)
+REGRAS_OFX = [
+    # Data no formato YYYYMMDD (comum em OFX)
+    RegraData('dtstart', r'<DTSTART>(\d{4})(\d{2})\d{2}', 1, 2),
+    RegraData('dtend', r'<DTEND>(\d{4})(\d{2})\d{2}', 1, 2),
+    RegraData('dtserver', r'<DTSERVER>(\d{4})(\d{2})\d{2}', 1, 2),
+    RegraData('dtacctup', r'<DTACCTUP>(\d{4})(\d{2})\d{2}', 1, 2),
+    # Data no formato YYYYMMDDHHMMSS
+    RegraData('dtstart_full', r'<DTSTART>(\d{4})(\d{2})(\d{2})\d{6}', 1, 2),
+    RegraData('dtend_full', r'<DTEND>(\d{4})(\d{2})(\d{2})\d{6}', 1, 2),
+    RegraData('dtserver_full', r'<DTSERVER>(\d{4})(\d{2})(\d{2})\d{6}', 1, 2),
+    # Período de extrato (MM/YYYY)
+    RegraData('periodo', r'(\d{1,2})[\/\-](\d{4})', 2, 1),
+    # Data em formato brasileiro (DD/MM/YYYY)
+    RegraData('data_br', r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})', 3, 2),
+]
+
+REGRAS_BANCO = [
+    RegraRotulo('banco_caixa', r'(CAIXA)'),
+    RegraRotulo('banco_bb', r'(BANCO.DO.BRASIL|BB)'),
+    RegraRotulo('banco_itau', r'(ITAU|ITAÚ)'),
+    RegraRotulo('banco_bradesco', r'(BRADESCO)'),
+    RegraRotulo('banco_santander', r'(SANTANDER)'),
+]
+
+REGRAS_TIPO_CONTA = [
+    RegraRotulo('tipo_investimento', r'(INVEST|INEST)'),
+    RegraRotulo('tipo_poupanca', r'(POUP|POUPANÇA)'),
+    RegraRotulo('tipo_corrente', r'(CORRENTE|CC)'),
+]
+
+# Padrões fixos, compilados uma vez
+_MESES_POR_NOME = [re.compile(MES_NOME_COMPLETO, re.IGNORECASE), re.compile(MES_NOME_ABREV, re.IGNORECASE)]
+_ANO_4DIGITOS = re.compile(r'(20\d{2})', re.IGNORECASE)  # 2023, 2024, etc
+_NAO_PALAVRA = re.compile(r'[^\w]')
+
+
+def _compilar(regras) -> List[Tuple]:
+    return [(regra, re.compile(regra.padrao, re.IGNORECASE)) for regra in regras]
+
+
+def _grupos(padrao, texto: str) -> Optional[Tuple[str, ...]]:
+    match = padrao.search(texto)
+    return match.groups() if match else None
+
+
+# Colunas de MotorDeteccao.detectar_lote
+COLUNAS_LOTE = ('mes', 'ano', 'data_encontrada', 'conta', 'metodo', 'conta_encontrada')
+
+
+class MotorDeteccao:
+    """Detecção de data e conta com um conjunto de regras compiladas"""
+
+    def __init__(self, nome: str, regras_data: List[RegraData], regras_conta: List[RegraConta],
+                 cache: Optional[CacheLRU] = None, max_pastas: int = 4096):
+        """
+        Args:
+            nome: identifica o motor nas chaves do cache (o cache pode ser compartilhado)
+            cache: resultados por entrada bruta; None desativa o cache
+            max_pastas: pastas com pistas de data memorizadas (muitos arquivos por pasta)
+        """
+        self.nome = nome
+        self.cache = cache
+        self.pistas_pastas = CacheLRU(max_pastas)
+        self.regras_data = _compilar(regras_data)
+        self.regras_conta = _compilar(sorted(regras_conta, key=lambda regra: regra.prioridade))
+
+    def detectar_data(self, texto: str, caminho_completo: str = "") -> Dict:
+        """Detecta mês e ano no nome (e no caminho, para pegar o ano da pasta pai)"""
+        return self._com_cache((self.nome, 'data', texto, caminho_completo),
+                               self._detectar_data, texto, caminho_completo)
+
+    def detectar_conta(self, texto: str) -> Dict:
+        """Detecta número da conta pela regra de maior prioridade presente no texto"""
+        return self._com_cache((self.nome, 'conta', texto), self._detectar_conta, texto)
+
+    def _com_cache(self, chave: Tuple, detectar, *args) -> Dict:
+        """Resultado guardado para a chave ou detecta e guarda (a chave é a própria entrada, sem hash)"""
+        if self.cache is None:
+            return detectar(*args)
+        resultado = self.cache.obter(chave)
+        if resultado is None:
+            resultado = detectar(*args)
+            self.cache.guardar(chave, resultado)
+        return resultado
+
+    def detectar_lote(self, nomes: List[str], caminhos: Optional[List[str]] = None) -> Dict[str, List]:
+        """
+        Detecta data e conta de vários arquivos, com o resultado em colunas
+
+        Cada nome distinto é convertido para maiúsculas e analisado uma única
+        vez, e as pistas de data de uma pasta (ex.: 2024/ABRIL) vêm da memória
+        de pastas do motor, extraídas uma vez para todos os arquivos dela.
+
+        Args:
+            nomes: nomes dos arquivos
+            caminhos: pasta de cada arquivo (mesmo tamanho de nomes); None = sem pasta
+
+        Returns:
+            {coluna: [valor de cada arquivo, na ordem de nomes]} com as colunas de COLUNAS_LOTE
+        """
+        if caminhos is None:
+            caminhos = [''] * len(nomes)
+        elif len(caminhos) != len(nomes):
+            raise ValueError("nomes e caminhos devem ter o mesmo tamanho")
+
+        maiusculas = {}  # nome -> nome em maiúsculas
+        datas = {}  # (nome, caminho) -> resultado
+        contas = {}  # nome -> resultado
+
+        def data_no_lote(nome: str, caminho: str) -> Dict:
+            return self._data_com_pistas(maiusculas[nome], self._pistas_da_pasta(caminho))
+
+        colunas = {coluna: [] for coluna in COLUNAS_LOTE}
+        for nome, caminho in zip(nomes, caminhos):
+            if nome not in maiusculas:
+                maiusculas[nome] = nome.upper()
+                contas[nome] = self._com_cache((self.nome, 'conta', nome), self._conta_em_maiusculas,
+                                               maiusculas[nome])
+            data = datas.get((nome, caminho))
+            if data is None:
+                data = datas[(nome, caminho)] = self._com_cache((self.nome, 'data', nome, caminho),
+                                                                data_no_lote, nome, caminho)
+            conta = contas[nome]
+
+            colunas['mes'].append(data['mes'])
+            colunas['ano'].append(data['ano'])
+            colunas['data_encontrada'].append(data['encontrado'])
+            colunas['conta'].append(conta['conta'])
+            colunas['metodo'].append(conta['metodo'])
+            colunas['conta_encontrada'].append(conta['encontrado'])
+
+        return colunas
+
+    def _pistas_data(self, texto_upper: str) -> PistasData:
+        """Aplica todos os padrões de data ao texto (usado para pastas, compartilhadas por vários arquivos)"""
+        return PistasData(
+            meses=tuple(_grupos(padrao, texto_upper) for padrao in _MESES_POR_NOME),
+            ano=_grupos(_ANO_4DIGITOS, texto_upper),
+            datas=tuple(_grupos(padrao, texto_upper) for _, padrao in self.regras_data)
+        )
+
+    def _pistas_da_pasta(self, caminho: str) -> PistasData:
+        """Pistas de data da pasta, extraídas uma vez por pasta e memorizadas"""
+        pistas = self.pistas_pastas.obter(caminho)
+        if pistas is None:
+            pistas = self._pistas_data(caminho.upper())
+            self.pistas_pastas.guardar(caminho, pistas)
+        return pistas
+
+    def _detectar_data(self, texto: str, caminho_completo: str) -> Dict:
+        # Só o nome é varrido a cada arquivo; a pasta (caminho_completo) vem memorizada
+        return self._data_com_pistas(texto.upper(), self._pistas_da_pasta(caminho_completo))
+
+    def _data_com_pistas(self, nome_upper: str, pistas_pasta: PistasData) -> Dict:
+        """
+        Detecta a data em "nome pasta" buscando cada padrão no nome e, se não
+        casar, usando o resultado já extraído da pasta
+
+        Equivale à busca no texto concatenado: nenhum padrão de data casa
+        espaços, então o primeiro match está no nome quando existe nele.
+        """
+        mes = None
+        ano = None
+
+        # 1. Busca mês por nome
+        for padrao, pista in zip(_MESES_POR_NOME, pistas_pasta.meses):
+            grupos = _grupos(padrao, nome_upper) or pista
+            if grupos:
+                mes = MESES_NOMES.get(grupos[0].upper())
+                if mes:
+                    break
+
+        # 2. Busca ano
+        grupos = _grupos(_ANO_4DIGITOS, nome_upper) or pistas_pasta.ano
+        if grupos:
+            ano = grupos[0]
+
+        # 3. Busca datas numéricas, completando apenas o que falta
+        for (regra, padrao), pista in zip(self.regras_data, pistas_pasta.datas):
+            if mes and ano:
+                break
+
+            grupos = _grupos(padrao, nome_upper) or pista
+            if grupos:
+                if not ano:
+                    ano = grupos[regra.grupo_ano - 1]
+                    if len(ano) == 2:
+                        ano = f"20{ano}"  # Assume 20XX para anos curtos
+
+                if not mes:
+                    mes_candidato = grupos[regra.grupo_mes - 1].zfill(2)
+                    if 1 <= int(mes_candidato) <= 12:
+                        mes = mes_candidato
+
+        return self._validar_data(mes, ano)
+
+    @staticmethod
+    def _validar_data(mes: Optional[str], ano: Optional[str]) -> Dict:
+        # Validações
+        if ano and not (2020 <= int(ano) <= 2030):
+            ano = None
+
+        return {
+            'mes': mes,
+            'ano': ano,
+            'encontrado': bool(mes and ano)
+        }
+
+    def _detectar_conta(self, texto: str) -> Dict:
+        return self._conta_em_maiusculas(texto.upper())
+
+    def _conta_em_maiusculas(self, texto_upper: str) -> Dict:
+        conta = None
+        metodo = None
+
+        # Regras em ordem de prioridade: vale a primeira que encontrar algo
+        for regra, padrao in self.regras_conta:
+            match = padrao.search(texto_upper)
+            if match:
+                conta = _NAO_PALAVRA.sub('', match.group(regra.grupo))
+                metodo = regra.metodo
+                break
+
+        # Validações
+        if conta and len(conta) < 3:  # Conta muito curta
+            conta = None
+            metodo = None
+
+        return {
+            'conta': conta,
+            'metodo': metodo,
+            'encontrado': bool(conta)
+        }
+
+
+def _detectar_rotulo(regras_compiladas, tabela: Dict, texto: str) -> Optional[Tuple[str, str]]:
+    """(rótulo padronizado, texto original) da primeira regra que casa"""
+    texto_upper = texto.upper()
+    for _, padrao in regras_compiladas:
+        match = padrao.search(texto_upper)
+        if match:
+            original = match.group(1)
+            return tabela.get(original.upper(), original), original
+    return None
+
+
+_REGRAS_OFX = _compilar(REGRAS_OFX)
+_REGRAS_BANCO = _compilar(REGRAS_BANCO)
+_REGRAS_TIPO_CONTA = _compilar(REGRAS_TIPO_CONTA)
+
+
+def detectar_data_ofx(conteudo: str) -> Dict:
+    """Detecta mês e ano nos campos de data do conteúdo de um OFX"""
+    for regra, padrao in _REGRAS_OFX:
+        match = padrao.search(conteudo)
+        if match:
+            ano = match.group(regra.grupo_ano)
+            mes = match.group(regra.grupo_mes).zfill(2)
+            if 2020 <= int(ano) <= 2030 and 1 <= int(mes) <= 12:
+                return {'mes': mes, 'ano': ano, 'encontrado': True}
+
+    return {'mes': None, 'ano': None, 'encontrado': False}
+
+
+def detectar_banco(texto: str) -> Dict:
+    """Detecta banco/instituição financeira"""
+    encontrado = _detectar_rotulo(_REGRAS_BANCO, BANCOS_CONHECIDOS, texto)
+    if encontrado:
+        return {'banco': encontrado[0], 'original': encontrado[1], 'encontrado': True}
+    return {'banco': None, 'original': None, 'encontrado': False}
+
+
+def detectar_tipo_conta(texto: str) -> Dict:
+    """Detecta tipo de conta (corrente, poupança, investimento)"""
+    encontrado = _detectar_rotulo(_REGRAS_TIPO_CONTA, TIPOS_CONTA, texto)
+    if encontrado:
+        return {'tipo': encontrado[0], 'original': encontrado[1], 'encontrado': True}
+    return {'tipo': 'PADRAO', 'original': None, 'encontrado': False}
+
+
+# Cache de detecções compartilhado pelos motores do processo (limite ajustável com redimensionar)
+CACHE_DETECCAO_MAX = 50000
+CACHE_DETECCAO = CacheLRU(CACHE_DETECCAO_MAX)
+
+# Motores compartilhados (um por processo)
+MOTOR_LOCAL = MotorDeteccao('local', REGRAS_DATA, REGRAS_CONTA, CACHE_DETECCAO)
+MOTOR_SUPER = MotorDeteccao('super', REGRAS_DATA_SUPER, REGRAS_CONTA_PREFIXOS + REGRAS_CONTA, CACHE_DETECCAO)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Snapshot de Diretórios
+Índice persistido da pasta de origem (mtime por pasta; tamanho/mtime/inode por
+arquivo) para varreduras incrementais que ignoram pastas inalteradas
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Adiciona o diretório config ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'config'))
+import config
+
+
+class SnapshotDiretorios:
+    """
+    Estado da última varredura da pasta de origem
+
+    Pastas cujo mtime não mudou não são relidas (apenas suas subpastas gravadas
+    são visitadas). Arquivos alterados no lugar, sem criar/renomear/remover
+    entradas, não mudam o mtime da pasta: use completo=True para reindexar tudo.
+    """
+
+    VERSAO = 1
+
+    def __init__(self, pasta_origem, nome: str = 'extratos', completo: bool = False,
+                 diretorio: Optional[str] = None):
+        self.pasta_origem = Path(pasta_origem)
+        # Gravado fora da árvore varrida: salvar dentro da origem alteraria o mtime
+        # da raiz e a faria ser relida em toda execução
+        diretorio = Path(diretorio or getattr(config, 'SNAPSHOT_DIRETORIO',
+                                              os.path.join(config.BASE_DIR, 'dados', 'snapshots')))
+        chave = hashlib.sha1(os.path.abspath(self.pasta_origem).encode('utf-8')).hexdigest()[:16]
+        self.arquivo = diretorio / f'{nome}_{chave}.json'
+        self.arquivo_legado = self.pasta_origem / f'.renomer_snapshot_{nome}.json'
+        self.carregado = False  # True se havia um snapshot anterior válido
+
+        self._lock = threading.Lock()
+        self.diretorios = {}  # pasta -> {'mtime': ns, 'subpastas': [nomes]}
+        self.arquivos = {}  # caminho -> [tamanho, mtime_ns, inode]
+
+        # Estado da varredura atual
+        self._novos_diretorios = {}
+        self._inalterados = set()
+        self._presentes = set()
+        self._pendentes = {}  # arquivos novos/alterados ainda não confirmados
+        self.varredura_concluida = False  # definido pela descoberta ao percorrer a árvore toda
+        self.contagem = {'arquivos_novos': 0, 'arquivos_inalterados': 0,
+                         'pastas_inalteradas': 0, 'pastas_relidas': 0}
+
+        if not completo:
+            self.carregar()
+
+    def carregar(self):
+        """Carrega o snapshot anterior (ignorado se ausente, corrompido ou de outra versão)"""
+        arquivo = self.arquivo if self.arquivo.exists() else self.arquivo_legado
+        try:
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if dados.get('versao') == self.VERSAO:
+            self.diretorios = dados.get('diretorios', {})
+            self.arquivos = dados.get('arquivos', {})
+            self.carregado = True
+
+    def subpastas_inalteradas(self, pasta: str, mtime_ns: int) -> Optional[List[str]]:
+        """Subpastas gravadas se a pasta não mudou desde o snapshot; None se precisa ser relida"""
+        registro = self.diretorios.get(pasta)
+        if not registro or registro['mtime'] != mtime_ns:
+            return None
+
+        with self._lock:
+            self._inalterados.add(pasta)
+            self._novos_diretorios[pasta] = registro
+        return registro['subpastas']
+
+    def registrar_diretorio(self, pasta: str, mtime_ns: int, subpastas: List[str]):
+        """Registra uma pasta relida por completo"""
+        with self._lock:
+            self._novos_diretorios[pasta] = {'mtime': mtime_ns, 'subpastas': subpastas}
+
+    def arquivo_novo(self, entrada: os.DirEntry) -> bool:
+        """Verifica (pelo stat em cache da entrada) se o arquivo é novo ou foi alterado"""
+        st = entrada.stat()
+        assinatura = [st.st_size, st.st_mtime_ns, st.st_ino]
+
+        with self._lock:
+            if self.arquivos.get(entrada.path) == assinatura:
+                self._presentes.add(entrada.path)
+                self.contagem['arquivos_inalterados'] += 1
+                return False
+            self._pendentes[entrada.path] = assinatura
+            self.contagem['arquivos_novos'] += 1
+            return True
+
+    def confirmar(self, caminho):
+        """Marca um arquivo novo/alterado como processado com sucesso"""
+        caminho = os.fspath(caminho)
+        with self._lock:
+            assinatura = self._pendentes.pop(caminho, None)
+        if assinatura is None:
+            # Arquivo conhecido por outra via (ex.: evento do inotify), fora da varredura
+            try:
+                st = os.stat(caminho)
+            except OSError:
+                return
+            assinatura = [st.st_size, st.st_mtime_ns, st.st_ino]
+
+        with self._lock:
+            self.arquivos[caminho] = assinatura
+            self._presentes.add(caminho)
+
+    def salvar(self):
+        """
+        Grava o snapshot da varredura atual (escrita atômica)
+
+        Arquivos não confirmados (erros, simulação, cancelamento) não entram no
+        índice e a pasta deles fica marcada como alterada, para serem
+        reprocessados na próxima execução.
+        """
+        dados = self.consolidar()
+
+        self.arquivo.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.arquivo.with_suffix('.tmp')
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+        os.replace(temporario, self.arquivo)
+
+        # Snapshot de versões anteriores, gravado dentro da pasta de origem
+        try:
+            self.arquivo_legado.unlink()
+        except OSError:
+            pass
+
+    def consolidar(self) -> Dict:
+        """Incorpora a varredura atual ao índice em memória e prepara a próxima"""
+        with self._lock:
+            diretorios = dict(self._novos_diretorios)
+            for caminho in self._pendentes:
+                pasta = os.path.dirname(caminho)
+                if pasta in diretorios:
+                    diretorios[pasta] = dict(diretorios[pasta], mtime=None)
+
+            # Varredura interrompida: pastas não visitadas mantêm o registro anterior
+            if not self.varredura_concluida:
+                for pasta, registro in self.diretorios.items():
+                    diretorios.setdefault(pasta, registro)
+
+            # Mantém apenas arquivos ainda existentes: vistos nesta varredura ou em pastas não relidas
+            arquivos = {}
+            for caminho, assinatura in self.arquivos.items():
+                pasta = os.path.dirname(caminho)
+                if (caminho in self._presentes or pasta in self._inalterados or
+                        (not self.varredura_concluida and pasta not in self._novos_diretorios)):
+                    arquivos[caminho] = assinatura
+
+            self.contagem['pastas_inalteradas'] += len(self._inalterados)
+            self.contagem['pastas_relidas'] += len(self._novos_diretorios) - len(self._inalterados)
+
+            self.diretorios, self.arquivos = diretorios, arquivos
+            self._novos_diretorios = {}
+            self._inalterados = set()
+            self._presentes = set()
+            self._pendentes = {}
+            self.varredura_concluida = False
+
+            return {'versao': self.VERSAO, 'diretorios': diretorios, 'arquivos': arquivos}
+
+    def obter_estatisticas(self) -> Dict:
+        """Arquivos e pastas novos/inalterados nas varreduras já consolidadas"""
+        with self._lock:
+            return dict(self.contagem)